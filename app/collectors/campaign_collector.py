@@ -2,133 +2,498 @@
 統合キャンペーン収集マネージャー
 すべてのソースからキャンペーンを収集・統合
 """
-from typing import List, Dict
+from typing import List, Dict, Callable, Mapping, Optional, Sequence, Tuple
+from types import MappingProxyType
+from functools import partial
+import asyncio
 import json
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
 
-from app.collectors.rakuten_collector import collect_rakuten_campaigns
-from app.collectors.vpoint_collector import collect_vpoint_campaigns
-from app.collectors.dpoint_collector import collect_dpoint_campaigns
+from app.collectors.rakuten_collector import RakutenCollector
+from app.collectors.vpoint_collector import VPointCollector
+from app.collectors.dpoint_collector import DPointCollector
+from app.collectors.configured_collector import load_configured_collectors
+from app.collectors.collection_engine import collect_concurrently, CollectionResult
+from app.collectors.serialization import encode_campaign, decode_campaign
+from app.collectors.refresh_scheduler import RefreshScheduler, get_refresh_throttle
+from app.collectors.dedup import deduplicate
+from app.collectors.snapshot_cache import SnapshotSlice, get_snapshot_cache, freeze_campaigns
+from app.collectors.snapshot_format import is_binary_snapshot, read_binary_snapshot, write_binary_snapshot
+from app.utils.campaign_store import AsyncCampaignStore, CampaignStore, upsert_campaigns
+from app.utils.file_io import FileLock, atomic_write
+
+
+# スナップショットの保存先（db: Campaign テーブル / file: data/campaigns_cache.json）
+DEFAULT_STORE = "db"
+
+# ファイル保存時の形式（json: 従来のJSON / binary: 固定長レコード＋文字列表、mmapで読み込み）
+DEFAULT_SNAPSHOT_FORMAT = "json"
+SNAPSHOT_FILES = {
+    'json': "data/campaigns_cache.json",
+    'binary': "data/campaigns_cache.bin",
+}
+
+# コールドスタート（スナップショットなし）時に収集完了を待つ最大秒数
+COLD_START_WAIT = 10.0
+
+# 他プロセスの収集完了を待つ最大秒数（収集の締切＋保存の余裕）
+REFRESH_LOCK_TIMEOUT = 60.0
+
+# 専用実装のコレクター（キー → コレクタークラス）
+SOURCE_COLLECTORS = {
+    'rakuten': RakutenCollector,
+    'vpoint': VPointCollector,
+    'dpoint': DPointCollector,
+}
+
+
+def build_collectors(config_file: str = None) -> Dict:
+    """
+    収集対象のコレクターを生成
+    
+    専用実装のコレクターに、config/sources.yml の scrape 設定から生成した
+    汎用コレクターを加える
+    
+    Returns:
+        ソースキー → コレクター（urls / source_name / _scrape_url を持つ）
+    """
+    collectors = {key: collector_class() for key, collector_class in SOURCE_COLLECTORS.items()}
+    
+    for key, collector in load_configured_collectors(config_file).items():
+        if key in collectors:
+            print(f"情報源設定エラー: collector '{key}' は専用実装と重複")
+            continue
+        collectors[key] = collector
+    
+    return collectors
 
 
 class CampaignCollector:
     """キャンペーン収集の統合管理"""
     
-    def __init__(self, cache_file: str = None):
-        self.cache_file = cache_file or "data/campaigns_cache.json"
+    def __init__(self, cache_file: str = None, source_timeout: float = 20.0, deadline: float = 30.0,
+                 store: str = None, snapshot_format: str = None):
+        self.snapshot_format = snapshot_format or os.getenv("SNAPSHOT_FORMAT", DEFAULT_SNAPSHOT_FORMAT)
+        self.cache_file = cache_file or SNAPSHOT_FILES.get(self.snapshot_format, SNAPSHOT_FILES['json'])
+        self.store_mode = store or os.getenv("CAMPAIGN_STORE", DEFAULT_STORE)
+        self.store = CampaignStore() if self.store_mode == "db" else None
+        self.async_store = AsyncCampaignStore() if self.store_mode == "db" else None
+        self.source_timeout = source_timeout  # ソースごとのタイムアウト（秒）
+        self.deadline = deadline  # 収集全体の締切（秒）
+        self.last_result: Optional[CollectionResult] = None
+        self.last_duplicates: List[Dict] = []  # 直近の収集で統合した重複クラスタ
+        self.collectors = build_collectors()
+        self.scheduler = RefreshScheduler(list(self.collectors))
+        self.throttle = get_refresh_throttle()  # バックグラウンド再収集の起動間隔
+        # 収集のプロセス間ロック（形式によらずスナップショットごとに1つ）
+        self.lock_file = str(Path(self.cache_file).with_suffix('.lock'))
     
-    def collect_all(self) -> List[Dict]:
+    def _collection_lock(self) -> FileLock:
+        return FileLock(self.lock_file, timeout=REFRESH_LOCK_TIMEOUT)
+    
+    def collect_all(self, sources: Optional[List[str]] = None) -> List[Dict]:
         """
-        全ソースからキャンペーンを収集
+        ソースからキャンペーンを並行収集
+        
+        全URLを同時に取得するため、所要時間は最も遅いソースで決まる。
+        対象外・タイムアウト・全URL失敗のソースは前回スナップショットの内容を引き継ぐ。
+        収集〜保存はプロセス間ロック内で行い、同時に走る収集は順番に実行する。
+        ロック待ちがタイムアウトした場合は収集せず、現在のスナップショットを返す
+        
+        Args:
+            sources: 収集するソースキー（省略時は全ソース）
         
         Returns:
             統合されたキャンペーンリスト
         """
-        all_campaigns = []
+        lock = self._collection_lock()
+        if not lock.acquire():
+            print("⚠️  他プロセスの収集待ちがタイムアウト: 現在のスナップショットを返します")
+            snapshot = self._load_snapshot()
+            return list(snapshot['campaigns']) if snapshot else []
+        
+        try:
+            return self._collect(sources)
+        finally:
+            lock.release()
+    
+    def _collect(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """収集してスナップショットを保存（呼び出し元がロックを持つこと）"""
+        targets = [key for key in self.collectors if sources is None or key in sources]
         
         print("📊 キャンペーン収集開始...")
         
-        # 楽天
-        print("  - 楽天ポイント収集中...")
+        result = collect_concurrently(
+            self._build_tasks(targets),
+            source_timeout=self.source_timeout,
+            deadline=self.deadline
+        )
+        self.last_result = result
+        
+        for key in targets:
+            label = self.collectors[key].source_name
+            if key in result.timed_out:
+                print(f"  - {label}: ⏱️ タイムアウト")
+            elif key in result.errors:
+                print(f"  - {label}: ❌ エラー: {'; '.join(result.errors[key])}")
+            else:
+                print(f"  - {label}: ✅ {len(result.by_source.get(key, []))}件")
+        
+        print(f"\n✅ {len(result.campaigns)}件のキャンペーンを収集（{result.elapsed:.1f}秒）")
+        
+        # 今回収集できなかったソースは前回スナップショットから補完
+        previous = self._load_snapshot()
+        refreshed_at = dict(previous['refreshed_at']) if previous else {}
+        now = datetime.now()
+        
+        all_campaigns = []
+        refreshed = []
+        for key, collector in self.collectors.items():
+            fresh = result.by_source.get(key)
+            if fresh is not None and (fresh or key not in result.errors):
+                all_campaigns.extend(fresh)
+                refreshed_at[key] = now
+                refreshed.append(key)
+            elif previous:
+                all_campaigns.extend(
+                    camp for camp in previous['campaigns']
+                    if camp.get('source') == collector.source_name
+                )
+        self.throttle.record(refreshed, [key for key in targets if key not in refreshed])
+        
+        # 重複排除
+        all_campaigns = self._deduplicate(all_campaigns)
+        print(f"   重複排除後: {len(all_campaigns)}件")
+        
+        # スナップショット保存
+        self._save_cache(all_campaigns, refreshed_at)
+        
+        return all_campaigns
+    
+    def refresh_stale(self) -> Sequence[Mapping]:
+        """
+        鮮度切れのソースだけを再収集
+        
+        各ソースの check_frequency（config/sources.yml）と最終収集日時を比較し、
+        新鮮なソースはスナップショットの内容をそのまま使う。
+        
+        再収集はプロセス間で1本だけ（single-flight）。他のプロセスが収集中なら
+        完了を待ち、その間にスナップショットが更新されていればそれを使う
+        
+        Returns:
+            掲載中（期限内・地雷を除く）のキャンペーンリスト
+        """
+        meta = self._load_meta()
+        stale = self.scheduler.stale_sources(meta['refreshed_at'] if meta else {})
+        
+        if meta and not stale:
+            return self._active_campaigns(meta)
+        
+        lock = self._collection_lock()
+        if not lock.acquire():
+            print("⚠️  他プロセスの収集待ちがタイムアウト: 現在のスナップショットで応答")
+            return self._active_campaigns(meta) if meta else []
+        
         try:
-            rakuten = collect_rakuten_campaigns()
-            all_campaigns.extend(rakuten)
-            print(f"    ✅ {len(rakuten)}件")
+            if lock.waited:
+                latest = self._load_meta()
+                if latest and (not meta or latest['cached_at'] != meta['cached_at']):
+                    print("♻️  他プロセスの収集結果を使用")
+                    return self._active_campaigns(latest)
+            
+            labels = ', '.join(self.collectors[key].source_name for key in stale)
+            print(f"🔄 再収集対象: {labels}")
+            return filter_active(self._collect(sources=stale))
+        finally:
+            lock.release()
+    
+    def serve_stale(self, cold_start_wait: float = COLD_START_WAIT) -> Sequence[Mapping]:
+        """
+        stale-while-revalidate でキャンペーン取得
+        
+        スナップショットがあれば即座に返し、鮮度切れのソースがあれば
+        バックグラウンドで再収集を1本だけ起動する。
+        スナップショットがない場合のみ、最大 cold_start_wait 秒まで収集完了を待つ。
+        いずれも同じソースの再収集は再試行間隔（RefreshThrottle）が経つまで起動しない
+        
+        Returns:
+            変更不可のキャンペーンリスト（コールドスタートで間に合わなければ空リスト）
+        """
+        meta = self._load_meta()
+        
+        if meta:
+            self._refresh_in_background(meta['refreshed_at'])
+            return self._active_campaigns(meta)
+        
+        if not self.throttle.claim(list(self.collectors)):
+            print("⚠️  スナップショットなし・再収集の再試行待ちのため空で応答")
+            return []
+        
+        print(f"🧊 スナップショットなし: 最大{cold_start_wait:.0f}秒収集を待機")
+        start_background_refresh(self).join(timeout=cold_start_wait)
+        
+        meta = self._load_meta()
+        if not meta:
+            print("⚠️  収集が間に合わないため空で応答（収集は継続）")
+            return []
+        return self._active_campaigns(meta)
+    
+    async def serve_stale_async(self, cold_start_wait: float = COLD_START_WAIT) -> Sequence[Mapping]:
+        """
+        serve_stale の非同期版（Webhook 用。DB読み込みでイベントループをブロックしない）
+        
+        DBのスナップショットは非同期ドライバで読む。スナップショットがない場合
+        （ファイルからの取り込み・コールドスタート）とファイル保存の場合はスレッドで serve_stale を実行
+        """
+        if not self.async_store:
+            return await asyncio.to_thread(self.serve_stale, cold_start_wait)
+        
+        try:
+            meta = await self.async_store.load_meta()
         except Exception as e:
-            print(f"    ❌ エラー: {e}")
+            print(f"スナップショット読み込みエラー: {e}")
+            meta = None
+        
+        if not meta:
+            return await asyncio.to_thread(self.serve_stale, cold_start_wait)
+        
+        self._refresh_in_background(meta['refreshed_at'])
         
-        # Vポイント
-        print("  - Vポイント収集中...")
         try:
-            vpoint = collect_vpoint_campaigns()
-            all_campaigns.extend(vpoint)
-            print(f"    ✅ {len(vpoint)}件")
+            campaigns = await get_snapshot_cache().get_async(
+                ('db', self.async_store.identity),
+                meta['version'],
+                self._load_active_async
+            )
         except Exception as e:
-            print(f"    ❌ エラー: {e}")
+            print(f"スナップショット読み込みエラー: {e}")
+            return ()
+        
+        campaigns = drop_expired(campaigns)
+        print(f"✅ スナップショットから{len(campaigns)}件のキャンペーンを読み込み")
+        return campaigns
+    
+    def _refresh_in_background(self, refreshed_at: Dict[str, Optional[datetime]]):
+        """鮮度切れで再試行間隔が経ったソースがあれば、バックグラウンド再収集を起動"""
+        stale = self.scheduler.stale_sources(refreshed_at)
+        if stale and self.throttle.claim(stale):
+            start_background_refresh(self)
+    
+    async def _load_active_async(self) -> Sequence[Mapping]:
+        return freeze_campaigns(await self.async_store.active_campaigns())
+    
+    def _build_tasks(self, keys: List[str]) -> Dict[str, List[Callable[[], List[Dict]]]]:
+        """ソースごとにURL単位の収集処理を組み立てる"""
+        tasks = {}
+        for key in keys:
+            collector = self.collectors[key]
+            tasks[key] = [partial(collector._scrape_url, url) for url in collector.urls]
+        return tasks
+    
+    def get_cached_campaigns(self) -> Sequence[Mapping]:
+        """
+        キャッシュからキャンペーン取得
+        
+        Returns:
+            掲載中のキャンペーン（キャッシュがない・古い場合は空リスト）
+        """
+        meta = self._load_meta()
+        if not meta:
+            return []
+        
+        # キャッシュの有効期限チェック（24時間）
+        age_hours = (datetime.now() - meta['cached_at']).total_seconds() / 3600
+        
+        if age_hours > 24:
+            print("⚠️  キャッシュが古いため再収集が必要")
+            return []
+        
+        return self._active_campaigns(meta)
+    
+    def _load_meta(self) -> Optional[Dict]:
+        """
+        スナップショットの収集日時だけを読み込み
+        
+        DBの場合はキャンペーン本体を読まない。DBが空でJSONスナップショットがあれば取り込む
+        
+        Returns:
+            cached_at / refreshed_at（ファイルの場合は掲載対象の campaigns も含む）。なければ None
+        """
+        if not self.store:
+            return self._cached_file_snapshot()
         
-        # dポイント
-        print("  - dポイント収集中...")
         try:
-            dpoint = collect_dpoint_campaigns()
-            all_campaigns.extend(dpoint)
-            print(f"    ✅ {len(dpoint)}件")
+            meta = self.store.load_meta()
+            if meta is None and Path(self.cache_file).exists():
+                meta = self._import_file_snapshot()
+            return meta
         except Exception as e:
-            print(f"    ❌ エラー: {e}")
+            print(f"スナップショット読み込みエラー: {e}")
+            return None
+    
+    def _active_campaigns(self, meta: Dict) -> Sequence[Mapping]:
+        """
+        掲載中・期限内・地雷でないキャンペーン
         
-        print(f"\n✅ 合計 {len(all_campaigns)}件のキャンペーンを収集")
+        DBはSQLで絞り込んだ結果を、ファイルはパース済みの結果を、スナップショットが
+        変わるまでプロセス内で共有する（変更不可）。期限切れは読み出し時に除外
+        """
+        if self.store:
+            try:
+                campaigns = get_snapshot_cache().get(
+                    ('db', self.store.identity),
+                    meta['version'],
+                    lambda: freeze_campaigns(self.store.active_campaigns())
+                )
+            except Exception as e:
+                print(f"スナップショット読み込みエラー: {e}")
+                return ()
+        else:
+            campaigns = meta['campaigns']
         
-        # 重複排除
-        all_campaigns = self._deduplicate(all_campaigns)
-        print(f"   重複排除後: {len(all_campaigns)}件")
+        campaigns = drop_expired(campaigns)
+        print(f"✅ スナップショットから{len(campaigns)}件のキャンペーンを読み込み")
+        return campaigns
+    
+    def _load_snapshot(self) -> Optional[Dict]:
+        """
+        スナップショット読み込み（掲載中のキャンペーンすべて）
         
-        # キャッシュ保存
-        self._save_cache(all_campaigns)
+        Returns:
+            cached_at / refreshed_at（ソースキー → 最終収集日時）/ campaigns
+            （ない・壊れている場合は None）
+        """
+        if not self.store:
+            return self._load_file_snapshot()
         
-        return all_campaigns
+        try:
+            if self._load_meta() is None:
+                return None
+            return self.store.load_snapshot()
+        except Exception as e:
+            print(f"スナップショット読み込みエラー: {e}")
+            return None
+    
+    def _cached_file_snapshot(self) -> Optional[Mapping]:
+        """JSONスナップショット（mtime・サイズが変わるまでプロセス内キャッシュを使う）"""
+        cache_path = Path(self.cache_file)
+        try:
+            stat = cache_path.stat()
+        except OSError:
+            return None
+        
+        return get_snapshot_cache().get(
+            ('file', str(cache_path.resolve())),
+            (stat.st_mtime_ns, stat.st_size),
+            self._load_frozen_file_snapshot
+        )
+    
+    def _load_frozen_file_snapshot(self) -> Optional[Mapping]:
+        snapshot = self._load_file_snapshot()
+        if not snapshot:
+            return None
+        return MappingProxyType({
+            'cached_at': snapshot['cached_at'],
+            'refreshed_at': MappingProxyType(snapshot['refreshed_at']),
+            'campaigns': freeze_campaigns(filter_active(snapshot['campaigns']))
+        })
     
-    def get_cached_campaigns(self) -> List[Dict]:
+    def _import_file_snapshot(self) -> Optional[Dict]:
+        """ファイルのスナップショット（GitHub Actions の収集結果など）をDBへ取り込む"""
+        snapshot = self._load_file_snapshot()
+        if not snapshot:
+            return None
+        
+        self.store.save_snapshot(snapshot['campaigns'], snapshot['refreshed_at'], cached_at=snapshot['cached_at'])
+        print(f"📥 {self.cache_file} をDBへ取り込み: {len(snapshot['campaigns'])}件")
+        return self.store.load_meta()
+    
+    def _load_file_snapshot(self) -> Optional[Dict]:
         """
-        キャッシュからキャンペーン取得
+        ファイルのスナップショット読み込み（形式はファイル先頭で判定）
         
         Returns:
-            キャッシュされたキャンペーン（なければ空リスト）
+            cached_at / refreshed_at（ソースキー → 最終収集日時）/ campaigns
+            （ファイルがない・壊れている場合は None）
         """
         try:
             cache_path = Path(self.cache_file)
             if not cache_path.exists():
-                return []
+                return None
+            
+            if is_binary_snapshot(cache_path):
+                return read_binary_snapshot(cache_path)
             
             with open(cache_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            # キャッシュの有効期限チェック（24時間）
             cached_at = datetime.fromisoformat(data.get('cached_at', '2000-01-01'))
-            age_hours = (datetime.now() - cached_at).total_seconds() / 3600
-            
-            if age_hours > 24:
-                print("⚠️  キャッシュが古いため再収集が必要")
-                return []
             
-            campaigns = data.get('campaigns', [])
+            # ソース別の収集日時（旧形式のキャッシュは専用実装の全ソース cached_at 扱い）
+            sources = data.get('sources')
+            if sources is None:
+                refreshed_at = {key: cached_at for key in SOURCE_COLLECTORS}
+            else:
+                refreshed_at = {
+                    key: datetime.fromisoformat(meta['refreshed_at'])
+                    for key, meta in sources.items()
+                    if meta.get('refreshed_at')
+                }
             
             # 日時文字列をdatetimeに戻す
-            for camp in campaigns:
-                if isinstance(camp.get('start_date'), str):
-                    camp['start_date'] = datetime.fromisoformat(camp['start_date'])
-                if isinstance(camp.get('end_date'), str):
-                    camp['end_date'] = datetime.fromisoformat(camp['end_date'])
+            campaigns = [decode_campaign(camp) for camp in data.get('campaigns', [])]
             
-            print(f"✅ キャッシュから{len(campaigns)}件のキャンペーンを読み込み")
-            return campaigns
+            return {
+                'cached_at': cached_at,
+                'refreshed_at': refreshed_at,
+                'campaigns': campaigns
+            }
         
         except Exception as e:
             print(f"キャッシュ読み込みエラー: {e}")
-            return []
+            return None
+    
+    def _save_cache(self, campaigns: List[Dict], refreshed_at: Dict[str, datetime] = None):
+        """スナップショットを保存（DB または JSON＋Campaign テーブルへの upsert）"""
+        if self.store:
+            try:
+                version = self.store.save_snapshot(campaigns, refreshed_at)
+                print(f"🗄️ DB保存: {len(campaigns)}件（バージョン {version}）")
+            except Exception as e:
+                print(f"DB保存エラー: {e}")
+            return
+        
+        self._write_cache_file(campaigns, refreshed_at)
+        self._store_campaigns(campaigns)
     
-    def _save_cache(self, campaigns: List[Dict]):
-        """キャンペーンをキャッシュに保存"""
+    def _write_cache_file(self, campaigns: List[Dict], refreshed_at: Dict[str, datetime] = None):
+        """キャンペーンをファイルに保存（SNAPSHOT_FORMAT の形式）"""
         try:
             cache_path = Path(self.cache_file)
-            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            if self.snapshot_format == "binary":
+                size = write_binary_snapshot(cache_path, campaigns, refreshed_at)
+                print(f"💾 キャッシュ保存: {cache_path}（{size:,}バイト）")
+                return
             
             # datetimeをISO形式文字列に変換
-            campaigns_serializable = []
-            for camp in campaigns:
-                camp_copy = camp.copy()
-                if isinstance(camp_copy.get('start_date'), datetime):
-                    camp_copy['start_date'] = camp_copy['start_date'].isoformat()
-                if isinstance(camp_copy.get('end_date'), datetime):
-                    camp_copy['end_date'] = camp_copy['end_date'].isoformat()
-                campaigns_serializable.append(camp_copy)
+            campaigns_serializable = [encode_campaign(camp) for camp in campaigns]
             
             data = {
                 'cached_at': datetime.now().isoformat(),
                 'count': len(campaigns),
+                'sources': {
+                    key: {'refreshed_at': refreshed.isoformat()}
+                    for key, refreshed in (refreshed_at or {}).items()
+                },
                 'campaigns': campaigns_serializable
             }
             
-            with open(cache_path, 'w', encoding='utf-8') as f:
+            # 一時ファイルに書いてから置き換え（読み手が書きかけのファイルを見ない）
+            with atomic_write(cache_path, encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             
             print(f"💾 キャッシュ保存: {cache_path}")
@@ -136,47 +501,168 @@ class CampaignCollector:
         except Exception as e:
             print(f"キャッシュ保存エラー: {e}")
     
+    def _store_campaigns(self, campaigns: List[Dict]):
+        """スナップショットを Campaign テーブルへ一括 upsert"""
+        try:
+            count = upsert_campaigns(campaigns)
+            print(f"🗄️ DB保存: {count}件")
+        except Exception as e:
+            print(f"DB保存エラー: {e}")
+    
     def _deduplicate(self, campaigns: List[Dict]) -> List[Dict]:
         """
         重複キャンペーンを排除
         
-        タイトルが同じものは重複とみなす
+        表記揺れ・日付違いのタイトルや別ドメインの同一キャンペーンも
+        近似重複としてまとめ、最初に出現したものを残す。
+        統合したクラスタは self.last_duplicates に記録
         """
-        seen = set()
-        unique = []
+        unique, clusters = deduplicate(campaigns)
+        self.last_duplicates = clusters
         
-        for camp in campaigns:
-            title = camp.get('title', '')
-            if title and title not in seen:
-                seen.add(title)
-                unique.append(camp)
+        for cluster in clusters:
+            kept = cluster['kept']
+            merged = ', '.join(f"{c.get('source')}: {c.get('title')}" for c in cluster['merged'])
+            print(f"   🔗 重複統合: {kept.get('source')}: {kept.get('title')} ← {merged}")
         
         return unique
 
 
-def get_campaigns(force_refresh: bool = False) -> List[Dict]:
+def filter_active(campaigns: List[Dict], now: datetime = None) -> List[Dict]:
+    """
+    期限内・地雷でないキャンペーンに絞り込み（CampaignStore.active_campaigns と同じ条件・順序）
+    """
+    now = now or datetime.now()
+    active = [
+        camp for camp in campaigns
+        if not camp.get('is_dangerous') and (camp.get('end_date') is None or camp['end_date'] >= now)
+    ]
+    active.sort(key=lambda camp: (camp.get('end_date') is None, camp.get('end_date') or now))
+    return active
+
+
+# 直近の期限切れ除外の結果（スナップショット, 開始位置, 除外後のタプル）
+_trimmed: Optional[Tuple] = None
+_trimmed_lock = threading.Lock()
+
+
+def drop_expired(campaigns: Sequence[Mapping], now: datetime = None) -> Sequence[Mapping]:
+    """
+    終了日の近い順に並んだキャンペーンから期限切れ（先頭側）を除く
+    
+    期限切れがなければ同じオブジェクトをそのまま返す。
+    スナップショット（タプル）は、次に期限切れが増えるまで同じ SnapshotSlice を返す
+    （下流の列データ・インデックスのキャッシュが効き続けるように）
+    """
+    global _trimmed
+    now = now or datetime.now()
+    start = 0
+    for camp in campaigns:
+        end_date = camp.get('end_date')
+        if end_date is None or end_date >= now:
+            break
+        start += 1
+    if not start:
+        return campaigns
+    if not isinstance(campaigns, tuple):
+        return campaigns[start:]
+    
+    with _trimmed_lock:
+        trimmed = _trimmed
+        if trimmed is not None and trimmed[0] is campaigns and trimmed[1] == start:
+            return trimmed[2]
+        view = SnapshotSlice(campaigns, start)
+        _trimmed = (campaigns, start, view)
+        return view
+
+
+# バックグラウンド再収集（プロセス内で同時に1本まで）
+_refresh_thread: Optional[threading.Thread] = None
+_refresh_lock = threading.Lock()
+
+
+def _run_refresh(collector: CampaignCollector):
+    try:
+        collector.refresh_stale()
+    except Exception as e:
+        print(f"バックグラウンド再収集エラー: {e}")
+
+
+def start_background_refresh(collector: CampaignCollector = None) -> threading.Thread:
+    """
+    鮮度切れソースの再収集をバックグラウンドで起動
+    
+    実行中の再収集があれば新たに起動せず、そのスレッドを返す
+    
+    Returns:
+        再収集スレッド
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is None or not _refresh_thread.is_alive():
+            _refresh_thread = threading.Thread(
+                target=_run_refresh,
+                args=(collector or get_shared_collector(),),
+                name="campaign-refresh",
+                daemon=True
+            )
+            _refresh_thread.start()
+            print("🔄 バックグラウンド再収集を開始")
+        return _refresh_thread
+
+
+# get_campaigns・Webhook で使い回すコレクター（sources.yml の読み込み・コレクター生成はプロセスで1回）
+_shared_collector: Optional[CampaignCollector] = None
+_shared_collector_lock = threading.Lock()
+
+
+def get_shared_collector() -> CampaignCollector:
+    """プロセス共有の CampaignCollector を取得"""
+    global _shared_collector
+    with _shared_collector_lock:
+        if _shared_collector is None:
+            _shared_collector = CampaignCollector()
+        return _shared_collector
+
+
+def get_campaigns(force_refresh: bool = False, stale_while_revalidate: bool = False,
+                  cold_start_wait: float = COLD_START_WAIT) -> Sequence[Mapping]:
     """
     キャンペーン取得のエントリーポイント
     
     Args:
-        force_refresh: Trueの場合、キャッシュを無視して再収集
+        force_refresh: Trueの場合、キャッシュを無視して全ソース再収集
+        stale_while_revalidate: Trueの場合、スナップショットを即座に返し再収集はバックグラウンドで行う
+            （応答時間が重要なWebhook向け）
+        cold_start_wait: stale_while_revalidate でスナップショットがない場合に待つ最大秒数
     
     Returns:
-        キャンペーンリスト
+        キャンペーンリスト（通常は鮮度切れのソースだけ再収集し、掲載中・期限内・地雷でないものを返す。
+        スナップショットから返すものはプロセス内で共有する変更不可のリスト。
+        force_refresh の場合は収集結果すべて）。コレクターはプロセスで共有する
     """
-    collector = CampaignCollector()
+    collector = get_shared_collector()
     
     if force_refresh:
         return collector.collect_all()
     
-    # まずキャッシュを試す
-    campaigns = collector.get_cached_campaigns()
+    if stale_while_revalidate:
+        return collector.serve_stale(cold_start_wait)
     
-    # キャッシュがなければ収集
-    if not campaigns:
-        campaigns = collector.collect_all()
+    return collector.refresh_stale()
+
+
+async def get_campaigns_async(cold_start_wait: float = COLD_START_WAIT) -> Sequence[Mapping]:
+    """
+    get_campaigns(stale_while_revalidate=True) の非同期版（Webhook 用）
+    
+    コレクターはプロセスで共有し、初回の生成（設定ファイルの読み込み）はスレッドで行う
     
-    return campaigns
+    Returns:
+        掲載中・期限内・地雷でないキャンペーン（変更不可）
+    """
+    collector = _shared_collector or await asyncio.to_thread(get_shared_collector)
+    return await collector.serve_stale_async(cold_start_wait)
 
 
 if __name__ == "__main__":
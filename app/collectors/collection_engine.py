@@ -0,0 +1,126 @@
+"""
+並行キャンペーン収集エンジン
+全ソース・全URLをスレッドプールで同時に取得し、
+ソース単位のタイムアウトと全体の締切を管理する
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, Future
+from typing import Callable, Dict, List, Optional
+
+
+# 1URL分の収集処理（引数なしでキャンペーンリストを返す）
+CollectTask = Callable[[], List[Dict]]
+
+
+class CollectionResult:
+    """並行収集の結果"""
+
+    def __init__(self):
+        self.campaigns: List[Dict] = []  # 完了したソースのキャンペーン（ソース順・URL順）
+        self.by_source: Dict[str, List[Dict]] = {}  # 完了したソースごとの結果
+        self.completed: List[str] = []  # 期限内に完了したソース
+        self.timed_out: List[str] = []  # タイムアウトしたソース
+        self.errors: Dict[str, List[str]] = {}  # ソースごとのURL単位エラー
+        self.elapsed: float = 0.0  # 所要時間（秒）
+
+    def summary(self) -> Dict:
+        """ログ・レポート用の要約"""
+        return {
+            'completed': list(self.completed),
+            'timed_out': list(self.timed_out),
+            'errors': {source: list(errs) for source, errs in self.errors.items()},
+            'counts': {source: len(camps) for source, camps in self.by_source.items()},
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+def collect_concurrently(
+    tasks: Dict[str, List[CollectTask]],
+    source_timeout: float = 20.0,
+    deadline: float = 30.0,
+    max_workers: Optional[int] = None
+) -> CollectionResult:
+    """
+    全ソースのURLを並行収集
+
+    Args:
+        tasks: ソース名 → URLごとの収集処理リスト
+        source_timeout: ソースごとのタイムアウト（秒）
+        deadline: 全体の締切（秒）
+        max_workers: スレッド数（省略時はURL数、最大32）
+
+    Returns:
+        完了したソースの部分結果とタイムアウト情報
+    """
+    result = CollectionResult()
+    start = time.monotonic()
+
+    total = sum(len(fns) for fns in tasks.values())
+    if total == 0:
+        result.completed = list(tasks.keys())
+        result.by_source = {source: [] for source in tasks}
+        return result
+
+    workers = max_workers or min(32, total)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector")
+
+    futures: Dict[str, List[Future]] = {}
+    owner: Dict[Future, str] = {}
+    source_end: Dict[str, float] = {}
+    overall_end = start + deadline
+
+    try:
+        for source, fns in tasks.items():
+            futures[source] = []
+            source_end[source] = min(start + source_timeout, overall_end)
+            for fn in fns:
+                future = executor.submit(fn)
+                futures[source].append(future)
+                owner[future] = source
+
+        pending = set(owner)
+        active = {source for source, fs in futures.items() if fs}
+
+        while pending:
+            now = time.monotonic()
+
+            # 期限切れソースを打ち切り
+            for source in sorted(active, key=list(tasks).index):
+                if now >= source_end[source] and any(not f.done() for f in futures[source]):
+                    result.timed_out.append(source)
+                    for f in futures[source]:
+                        f.cancel()
+                        pending.discard(f)
+            active = {
+                source for source in active
+                if source not in result.timed_out and any(not f.done() for f in futures[source])
+            }
+
+            if not pending or not active:
+                break
+
+            next_end = min(source_end[source] for source in active)
+            _, pending = wait(pending, timeout=max(0.0, next_end - now), return_when=FIRST_COMPLETED)
+
+    finally:
+        # 取り残されたスレッドは待たない（requests側のタイムアウトで終了する）
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # ソース順・URL順に結果を組み立て
+    for source, fs in futures.items():
+        if source in result.timed_out:
+            continue
+
+        campaigns = []
+        for f in fs:
+            try:
+                campaigns.extend(f.result() or [])
+            except Exception as e:
+                result.errors.setdefault(source, []).append(str(e))
+
+        result.by_source[source] = campaigns
+        result.campaigns.extend(campaigns)
+        result.completed.append(source)
+
+    result.elapsed = time.monotonic() - start
+    return result
@@ -0,0 +1,173 @@
+"""
+設定駆動の汎用コレクター
+config/sources.yml の scrape 設定（URL・セレクタ・カード/店舗の対応・件数）だけで
+情報源を追加できるようにする
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from urllib.parse import urljoin
+
+from app.collectors.http_cache import fetch_campaigns
+from app.collectors.html_parsing import select_candidates
+from app.collectors.normalize import make_campaign_id
+from app.collectors.extraction import extract_campaign_facts, estimate_return_rate, default_end_date
+from app.collectors.sources_config import load_sources
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+DEFAULT_ACTION_STEPS = [
+    '1. キャンペーンページでエントリー',
+    '2. 対象の決済方法で支払い'
+]
+
+
+class ConfiguredCollector:
+    """sources.yml の設定で動く汎用コレクター"""
+
+    def __init__(self, config: Dict):
+        scrape = config['scrape']
+
+        self.key = config['collector']
+        self.source_name = config['name']
+        self.urls = scrape.get('urls') or [config['url']]
+        self.headers = dict(DEFAULT_HEADERS, **scrape.get('headers', {}))
+
+        # セレクタ
+        self.item_selector = scrape['item_selector']
+        self.title_selector = scrape.get('title_selector', 'h2, h3, h4, .title')
+        self.description_selector = scrape.get('description_selector', '.description, .text, p')
+        self.link_selector = scrape.get('link_selector', 'a')
+        self.limit = scrape.get('limit', 10)
+
+        # 還元率の推定
+        self.base_amount = scrape.get('base_amount', 10000)
+        points = scrape.get('points') or {}
+        self.use_points = points.get('enabled', True)
+        self.min_points = points.get('min', 0)
+
+        # カード・店舗の対応
+        cards = scrape.get('cards') or {}
+        self.card_rules = cards.get('rules') or []  # [{keyword, card}]
+        self.default_cards = cards.get('default') or []
+        self.target_stores = scrape.get('target_stores') or []
+        self.danger_rules = scrape.get('danger_rules') or []  # [{keywords, reason}]
+        self.action_steps = scrape.get('action_steps') or DEFAULT_ACTION_STEPS
+
+    def collect_campaigns(self) -> List[Dict]:
+        """キャンペーン収集"""
+        campaigns = []
+
+        for url in self.urls:
+            try:
+                campaigns.extend(self._scrape_url(url))
+            except Exception as e:
+                print(f"{self.source_name}収集エラー ({url}): {e}")
+
+        return campaigns
+
+    def _scrape_url(self, url: str) -> List[Dict]:
+        """URLからキャンペーン情報を抽出（取得エラーは呼び出し元へ送出）"""
+        return fetch_campaigns(
+            url,
+            self.headers,
+            lambda content: self._parse_page(content, url),
+            timeout=10
+        )
+
+    def _parse_page(self, content: bytes, url: str) -> List[Dict]:
+        """ページ本文からキャンペーン要素を抽出"""
+        campaigns = []
+
+        for elem in select_candidates(content, self.item_selector, limit=self.limit):
+            campaign = self._parse_campaign_element(elem, url)
+            if campaign:
+                campaigns.append(campaign)
+
+        return campaigns
+
+    def _parse_campaign_element(self, elem, source_url: str) -> Optional[Dict]:
+        """キャンペーン要素をパース"""
+        try:
+            title_elem = elem.select_one(self.title_selector)
+            if not title_elem:
+                return None
+
+            title = title_elem.get_text(strip=True)
+
+            link_elem = elem.select_one(self.link_selector)
+            campaign_url = ""
+            if link_elem and link_elem.get('href'):
+                campaign_url = urljoin(source_url, link_elem['href'])
+
+            desc_elem = elem.select_one(self.description_selector)
+            description = desc_elem.get_text(strip=True) if desc_elem else ""
+
+            now = datetime.now()
+            facts = extract_campaign_facts(elem.get_text(' '), now=now, rate_text=f"{title} {description}")
+            return_rate = estimate_return_rate(
+                facts,
+                use_points=self.use_points,
+                min_points=self.min_points,
+                base_amount=self.base_amount
+            )
+
+            text = f"{title} {description}"
+            required_cards = [rule['card'] for rule in self.card_rules if rule['keyword'] in text]
+            danger_reasons = [
+                rule['reason'] for rule in self.danger_rules
+                if all(keyword in text for keyword in rule['keywords'])
+            ]
+
+            return {
+                'campaign_id': make_campaign_id(
+                    self.key, self.source_name, campaign_url or source_url, title,
+                    listing=not campaign_url, end_date=facts['end_date']
+                ),
+                'title': title,
+                'description': description[:200],
+                'url': campaign_url or source_url,
+                'source': self.source_name,
+                'start_date': facts['start_date'] or now,
+                'end_date': facts['end_date'] or default_end_date(now),
+                'base_amount': self.base_amount,
+                'return_rate': return_rate,
+                'conditions': {'entry_required': facts['entry_required']},
+                'required_cards': required_cards or list(self.default_cards),
+                'target_stores': list(self.target_stores),
+                'is_dangerous': bool(danger_reasons),
+                'danger_reason': danger_reasons[0] if danger_reasons else None,
+                'action_steps': list(self.action_steps)
+            }
+
+        except Exception as e:
+            print(f"パースエラー: {e}")
+            return None
+
+
+def load_configured_collectors(config_file: Union[str, Path] = None) -> Dict[str, ConfiguredCollector]:
+    """
+    scrape 設定を持つ情報源から汎用コレクターを生成
+
+    Returns:
+        コレクターキー → ConfiguredCollector（設定不備の情報源はスキップ）
+    """
+    collectors = {}
+
+    for source in load_sources(config_file):
+        if not source.get('scrape'):
+            continue
+        try:
+            collector = ConfiguredCollector(source)
+        except (KeyError, TypeError) as e:
+            print(f"情報源設定エラー ({source.get('name')}): {e}")
+            continue
+        if collector.key in collectors:
+            print(f"情報源設定エラー ({source.get('name')}): collector '{collector.key}' が重複")
+            continue
+        collectors[collector.key] = collector
+
+    return collectors
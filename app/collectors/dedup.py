@@ -0,0 +1,186 @@
+"""
+キャンペーンの近似重複検出
+正規化タイトルが完全一致するものは先にまとめ、残りは文字3-gramを MinHash で署名し、
+LSH（バンド分割）で候補ペアだけを比較するため、件数にほぼ比例した時間で動く
+
+URLパスのトークンはタイトルの類似度がしきい値にわずかに届かないときの決め手にだけ使い、
+タイトルの判定を覆さない
+"""
+import random
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Tuple
+
+from app.collectors.normalize import normalize_title, url_path_tokens
+
+
+SHINGLE_SIZE = 3
+NUM_PERM = 48
+BANDS = 16  # 1バンド3行 → 類似度0.6のペアが約98%の確率で候補になる
+THRESHOLD = 0.6
+URL_TIE_MARGIN = 0.1  # タイトルの類似度が THRESHOLD - この値 以上なら、URLパスのトークンの一致で重複とみなす
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def shingles(campaign: Dict) -> FrozenSet[str]:
+    """タイトルの文字3-gram"""
+    return _shingles(normalize_title(campaign.get('title', '')))
+
+
+def _shingles(title: str) -> FrozenSet[str]:
+    if not title:
+        return frozenset()
+    if len(title) <= SHINGLE_SIZE:
+        return frozenset((title,))
+    return frozenset(title[i:i + SHINGLE_SIZE] for i in range(len(title) - SHINGLE_SIZE + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    ユニバーサルハッシュ族 (a*x + b) mod p による MinHash 署名
+
+    3-gramは件数が増えても種類が頭打ちになるため、トークンごとのハッシュ列を
+    キャッシュし、署名はその列ごとの最小値（zip/min）だけで求める
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._token_hashes: Dict[str, Tuple[int, ...]] = {}
+
+    def _hashes(self, token: str) -> Tuple[int, ...]:
+        hashes = self._token_hashes.get(token)
+        if hashes is None:
+            x = zlib.crc32(token.encode('utf-8'))
+            p = _MERSENNE_PRIME
+            hashes = tuple((a * x + b) % p for a, b in self.params)
+            self._token_hashes[token] = hashes
+        return hashes
+
+    def signature(self, tokens: FrozenSet[str]) -> Tuple[int, ...]:
+        return tuple(map(min, zip(*map(self._hashes, tokens))))
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # 先に出現した方を代表にする
+            if root_j < root_i:
+                root_i, root_j = root_j, root_i
+            self.parent[root_j] = root_i
+
+
+def _is_duplicate(similarity: float, url_a: FrozenSet[str], url_b: FrozenSet[str], threshold: float) -> bool:
+    if similarity >= threshold:
+        return True
+    return similarity >= threshold - URL_TIE_MARGIN and bool(url_a & url_b)
+
+
+def find_duplicate_clusters(campaigns: List[Dict], threshold: float = THRESHOLD,
+                            num_perm: int = NUM_PERM, bands: int = BANDS) -> List[List[int]]:
+    """
+    近似重複のクラスタを検出
+
+    Args:
+        campaigns: キャンペーンリスト
+        threshold: 重複とみなすタイトルの Jaccard 類似度（3-gram集合どうし）。
+            threshold - URL_TIE_MARGIN 以上ならURLパスのトークンが共通するときも重複とみなす。
+            いずれもタイトル中の数値が一致すること
+        num_perm: MinHash の署名長
+        bands: LSH のバンド数（num_perm を割り切れること）
+
+    Returns:
+        2件以上からなるクラスタ（各要素は campaigns のインデックス、昇順）
+    """
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm)
+    titles = [normalize_title(camp.get('title', '')) for camp in campaigns]
+    sets = [_shingles(title) for title in titles]
+    url_tokens = [frozenset(url_path_tokens(camp.get('url', ''))) for camp in campaigns]
+    # タイトル中の数値（倍率・ポイント数など。日付は正規化で除去済み）が違えば別キャンペーン
+    numbers = [frozenset(_NUMBER_PATTERN.findall(title)) for title in titles]
+    uf = _UnionFind(len(campaigns))
+
+    # 正規化タイトルが完全一致するものは（URLによらず）署名を計算せずにまとめる
+    representatives: Dict[str, int] = {}
+    unique_indices = []
+    for i, title in enumerate(titles):
+        if not title:
+            continue
+        first = representatives.setdefault(title, i)
+        if first == i:
+            unique_indices.append(i)
+        else:
+            uf.union(first, i)
+
+    # LSH: 数値が同じで、いずれかのバンドが一致したものだけを候補ペアとして検証
+    buckets = defaultdict(list)
+    for i in unique_indices:
+        signature = hasher.signature(sets[i])
+        for band in range(bands):
+            buckets[(band, numbers[i], signature[band * rows:(band + 1) * rows])].append(i)
+
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if uf.find(i) != uf.find(j) and _is_duplicate(
+                    jaccard(sets[i], sets[j]), url_tokens[i], url_tokens[j], threshold
+                ):
+                    uf.union(i, j)
+
+    clusters = defaultdict(list)
+    for i in range(len(campaigns)):
+        clusters[uf.find(i)].append(i)
+
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def deduplicate(campaigns: List[Dict], threshold: float = THRESHOLD) -> Tuple[List[Dict], List[Dict]]:
+    """
+    近似重複を排除（各クラスタの先頭＝最初に出現したものを残す）
+
+    Returns:
+        (重複排除後のキャンペーン, 統合したクラスタ [{kept, merged}])
+    """
+    clusters = find_duplicate_clusters(campaigns, threshold=threshold)
+
+    dropped = set()
+    merged_clusters = []
+    for members in clusters:
+        dropped.update(members[1:])
+        merged_clusters.append({
+            'kept': campaigns[members[0]],
+            'merged': [campaigns[i] for i in members[1:]]
+        })
+
+    unique = [
+        camp for i, camp in enumerate(campaigns)
+        if i not in dropped and camp.get('title')
+    ]
+    return unique, merged_clusters
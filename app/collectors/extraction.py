@@ -0,0 +1,225 @@
+"""
+キャンペーン情報の抽出エンジン
+コンパイル済みの正規表現1本で要素テキストを1回だけ走査し、
+還元率・倍率・開始日/終了日・期間（〜）・エントリー要否をまとめて取り出す
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+
+# 全トークンを1本の正規表現にまとめ、finditer 1回で走査する
+# 先頭の先読みで、トークンになり得ない文字では各選択肢を試さずに読み飛ばす
+_TOKEN_PATTERN = re.compile(
+    r'(?=[〜～~かま開実キエ対利期要]|(?<![\d.,])\d)(?:'
+    r'(?P<full>(?P<fy>\d{4})\s*年\s*(?P<fm>\d{1,2})\s*月\s*(?P<fd>\d{1,2})\s*日)'
+    r'|(?P<slash>(?<![\d/])(?:(?P<sy>\d{4})/)?(?P<sm>\d{1,2})/(?P<sd>\d{1,2})(?![\d/]))'
+    r'|(?P<md>(?P<mm>\d{1,2})\s*月\s*(?P<md_d>\d{1,2})\s*日)'
+    r'|(?P<sep>[〜～~]|から)'
+    r'|(?P<until>まで)'
+    r'|(?P<period>(?:開催|実施|キャンペーン|エントリー|対象|利用)?期間)'
+    r'|(?P<days>(?P<days_n>\d{1,3})\s*日間)'
+    r'|(?P<mult>(?P<mult_n>\d+(?:\.\d+)?)\s*倍)'
+    r'|(?P<pct>(?P<pct_n>\d+(?:\.\d+)?)\s*[%％])'
+    r'|(?P<points>(?P<points_n>\d{1,3}(?:,\d{3})+|\d+)\s*(?:ポイント|pt|P)(?![a-zA-Z]))'
+    r'|(?P<entry>要エントリー|エントリー(?:必須|が必要|要|の上|後|から|して|で|ページ))'
+    r')'
+)
+
+# 日付トークンの間に挟まってもよいもの（曜日・時刻・空白・括弧）
+_DATE_GAP = re.compile(r'^[\s　（）()月火水木金土日祝・:：\d]*$')
+
+# 還元率のトークン → 数値のグループ名
+_RATE_KINDS = {'mult': 'mult_n', 'pct': 'pct_n', 'points': 'points_n'}
+
+DEFAULT_RETURN_RATE = 5
+DEFAULT_DURATION_DAYS = 30
+
+Number = Union[int, float]
+
+
+def _number(text: str) -> Number:
+    """"10" → 10, "0.5" → 0.5, "1,000" → 1000"""
+    value = float(text.replace(',', ''))
+    return int(value) if value.is_integer() else value
+
+
+def _date_parts(match, kind: str) -> Tuple[Optional[int], int, int]:
+    """日付トークン → (年 or None, 月, 日)"""
+    if kind == 'full':
+        year, month, day = match.group('fy', 'fm', 'fd')
+    elif kind == 'slash':
+        year, month, day = match.group('sy', 'sm', 'sd')
+    else:
+        year = None
+        month, day = match.group('mm', 'md_d')
+    return (int(year) if year else None), int(month), int(day)
+
+
+def _make_date(year: int, month: int, day: int, end_of_day: bool) -> Optional[datetime]:
+    try:
+        if end_of_day:
+            return datetime(year, month, day, 23, 59, 59)
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def extract_campaign_facts(text: str, now: datetime = None, rate_text: str = None) -> Dict:
+    """
+    要素テキストからキャンペーン情報を抽出
+
+    Args:
+        text: キャンペーン要素のテキスト
+        now: 基準日時（年の補完・デフォルト終了日に使用）
+        rate_text: 倍率・パーセント・ポイント数を読むテキスト（省略時は text）。
+                   要素内の注記やバナーの数字を還元率と取り違えないよう、タイトル＋説明文を渡す
+
+    Returns:
+        multiplier: ポイント倍率（"10倍" → 10, なければ None）
+        percent: パーセント還元（"20%還元" → 20, なければ None）
+        points: ポイント数（"1,000ポイント" → 1000, なければ None）
+        return_rate: 還元率（倍率 → パーセントの順、なければ DEFAULT_RETURN_RATE）
+        start_date: 開始日（期間表記から、なければ None）
+        end_date: 終了日（期間表記・「まで」・日付から、なければ None）
+        entry_required: エントリーが必要か
+    """
+    now = now or datetime.now()
+
+    multiplier = percent = points = None
+    entry_required = False
+    dates: List[Tuple[int, int, Tuple]] = []  # (開始位置, 終了位置, 日付)
+    seps: List[Tuple[int, int]] = []  # 範囲記号の位置
+    untils: List[int] = []  # 「まで」の位置
+    period_at = -1  # 「期間」表記の直後の位置
+    duration_days = None  # 「30日間」などの期間日数
+
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if rate_text is not None and kind in _RATE_KINDS:
+            continue
+        if kind == 'full' or kind == 'md' or kind == 'slash':
+            dates.append((match.start(), match.end(), _date_parts(match, kind)))
+        elif kind == 'sep':
+            seps.append((match.start(), match.end()))
+        elif kind == 'until':
+            untils.append(match.start())
+        elif kind == 'period':
+            if period_at < 0:
+                period_at = match.end()
+            if match.group('period').startswith('エントリー'):
+                entry_required = True
+        elif kind == 'days':
+            if duration_days is None:
+                duration_days = int(match.group('days_n'))
+        elif kind == 'mult':
+            if multiplier is None:
+                multiplier = _number(match.group('mult_n'))
+        elif kind == 'pct':
+            if percent is None:
+                percent = _number(match.group('pct_n'))
+        elif kind == 'points':
+            if points is None:
+                points = _number(match.group('points_n'))
+        elif kind == 'entry':
+            entry_required = True
+
+    if rate_text is not None:
+        multiplier, percent, points = _extract_rates(rate_text)
+
+    start_date, end_date = _resolve_period(text, dates, seps, untils, period_at, now)
+
+    # 「エントリーから30日間」など日付のない期間表記
+    if end_date is None and duration_days:
+        end_date = (start_date or now) + timedelta(days=duration_days)
+
+    facts = {
+        'multiplier': multiplier,
+        'percent': percent,
+        'points': points,
+        'start_date': start_date,
+        'end_date': end_date,
+        'entry_required': entry_required,
+    }
+    facts['return_rate'] = estimate_return_rate(facts, use_points=False)
+    return facts
+
+
+def _extract_rates(text: str) -> Tuple[Optional[Number], Optional[Number], Optional[Number]]:
+    """テキストの最初の倍率・パーセント・ポイント数"""
+    found = {}
+    for match in _TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind in _RATE_KINDS and kind not in found:
+            found[kind] = _number(match.group(_RATE_KINDS[kind]))
+    return found.get('mult'), found.get('pct'), found.get('points')
+
+
+def _resolve_period(text, dates, seps, untils, period_at, now) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """日付トークン列から開始日・終了日を決める"""
+    # 範囲表記「A〜B」: 日付の間に範囲記号があるもの（最初の1組を採用）
+    for (_, a_end, a), (b_start, _, b) in zip(dates, dates[1:]):
+        between = [sep for sep in seps if a_end <= sep[0] and sep[1] <= b_start]
+        if len(between) != 1:
+            continue
+        gap = text[a_end:between[0][0]] + text[between[0][1]:b_start]
+        if not _DATE_GAP.match(gap):
+            continue
+
+        start_year = a[0] or b[0] or now.year
+        start = _make_date(start_year, a[1], a[2], end_of_day=False)
+        end = _make_date(b[0] or start_year, b[1], b[2], end_of_day=True)
+        if not start or not end:
+            continue
+        if end < start and not b[0]:
+            end = _make_date(end.year + 1, b[1], b[2], end_of_day=True)
+        # 年の記載がなく終了済みに見える場合は来年の開催とみなす
+        if not a[0] and not b[0] and end < now:
+            start = _make_date(start.year + 1, a[1], a[2], end_of_day=False)
+            end = _make_date(end.year + 1, b[1], b[2], end_of_day=True)
+        if start and end:
+            return start, end
+
+    # 単独の日付は終了日とみなす
+    # 優先順: 「Aまで」の日付 → 「期間」表記以降の日付 → 年月日 → 月日のみ
+    until_dates = [d for d in dates if any(0 <= pos - d[1] <= 2 for pos in untils)]
+    period_dates = [d for d in dates if period_at >= 0 and d[0] >= period_at]
+    full_dates = [d for d in dates if d[2][0] is not None]
+    for candidates in (until_dates, period_dates, full_dates, dates):
+        for _, _, (year, month, day) in candidates:
+            end = _make_date(year or now.year, month, day, end_of_day=True)
+            if end is None:
+                continue
+            if year is None and end < now:
+                end = _make_date(now.year + 1, month, day, end_of_day=True)
+            if end:
+                return None, end
+
+    return None, None
+
+
+def estimate_return_rate(facts: Dict, use_points: bool = True, min_points: int = 0, base_amount: int = 10000) -> Number:
+    """
+    抽出結果から還元率（%）を推定
+
+    倍率 → パーセント → ポイント数（base_amount円利用あたり）→ デフォルト の順
+
+    Args:
+        facts: extract_campaign_facts の結果
+        use_points: ポイント数表記から推定するか
+        min_points: ポイント数から推定する最小ポイント
+        base_amount: ポイント数から推定する際の想定利用額
+    """
+    if facts['multiplier'] is not None:
+        return facts['multiplier']
+    if facts['percent'] is not None:
+        return facts['percent']
+    points = facts['points']
+    if use_points and points is not None and points >= min_points:
+        return max(1, int((points / base_amount) * 100))
+    return DEFAULT_RETURN_RATE
+
+
+def default_end_date(now: datetime = None) -> datetime:
+    """期間が読み取れない場合の終了日（30日後）"""
+    return (now or datetime.now()) + timedelta(days=DEFAULT_DURATION_DAYS)
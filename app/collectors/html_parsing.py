@@ -0,0 +1,85 @@
+"""
+HTMLパース共通処理
+lxmlバックエンド＋SoupStrainerで、キャンペーン候補のコンテナだけを木構造にする
+"""
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+
+# fast: lxml＋候補コンテナのみ構築 / legacy: html.parserで全体を構築（従来方式）
+DEFAULT_PARSE_MODE = "fast"
+
+_COMPOUND_PATTERN = re.compile(r'^([a-zA-Z][a-zA-Z0-9-]*)?((?:\.[\w-]+)*)$')
+
+
+class CandidateStrainer(SoupStrainer):
+    """タグ名またはクラス名が一致する要素（とその子孫）だけを構築するフィルタ"""
+
+    def __init__(self, names: frozenset, classes: frozenset):
+        super().__init__()
+        self.names = names
+        self.classes = classes
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if name in self.names:
+            return True
+        classes = (attrs or {}).get('class') or ()
+        if isinstance(classes, str):
+            classes = classes.split()
+        return not self.classes.isdisjoint(classes)
+
+
+@lru_cache(maxsize=32)
+def strainer_for(selector: str) -> Optional[CandidateStrainer]:
+    """
+    CSSセレクタから候補コンテナ用のフィルタを生成
+
+    各セレクタの先頭要素（例: ".campaign-list li" なら ".campaign-list"）を
+    タグ名・クラス名で絞り込む。解釈できないセレクタがあれば None（全体を構築）
+    """
+    names, classes = set(), set()
+
+    for part in selector.split(','):
+        tokens = part.strip().split()
+        if not tokens:
+            continue
+        match = _COMPOUND_PATTERN.match(tokens[0])
+        if not match:
+            return None
+        tag, class_part = match.groups()
+        if class_part:
+            classes.add(class_part.split('.')[1])
+        elif tag:
+            names.add(tag.lower())
+        else:
+            return None
+
+    return CandidateStrainer(frozenset(names), frozenset(classes))
+
+
+def select_candidates(content: bytes, selector: str, limit: int = 10, mode: str = None) -> List[Tag]:
+    """
+    ページからキャンペーン候補要素を抽出
+
+    Args:
+        content: HTML本文
+        selector: 候補要素のCSSセレクタ
+        limit: 最大件数
+        mode: "fast" または "legacy"（省略時は環境変数 HTML_PARSE_MODE）
+
+    Returns:
+        候補要素（文書順・最大 limit 件）
+    """
+    mode = mode or os.getenv("HTML_PARSE_MODE", DEFAULT_PARSE_MODE)
+
+    if mode == "legacy":
+        soup = BeautifulSoup(content, 'html.parser')
+    else:
+        soup = BeautifulSoup(content, 'lxml', parse_only=strainer_for(selector))
+
+    return soup.select(selector, limit=limit)
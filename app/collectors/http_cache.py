@@ -0,0 +1,165 @@
+"""
+条件付きHTTP取得＋ディスクキャッシュ
+URLごとに ETag / Last-Modified / 本文ハッシュと解析結果を保存し、
+304 や本文が同一の場合は BeautifulSoup の解析を丸ごと省略する
+
+解析結果は解析処理のバージョン（PARSER_VERSION）と解析した日付が同じ間だけ使う。
+解析処理を変えたとき・日付が変わったとき（開始日や既定の終了日は解析時刻から決まる）は取り直して解析する
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from app.collectors.http_client import HttpClient, get_http_client
+from app.collectors.serialization import encode_campaign, decode_campaign
+from app.utils.file_io import FileLock, atomic_write
+
+
+DEFAULT_HTTP_CACHE_FILE = "data/http_cache.json"
+
+# 解析処理（セレクタ・抽出ルール）を変えたら上げる（古い解析結果を使わない）
+PARSER_VERSION = "3"
+
+SAVE_LOCK_TIMEOUT = 10  # 秒
+
+
+class ResponseCache:
+    """URLごとの検証情報と解析済みキャンペーンのキャッシュ"""
+
+    def __init__(self, cache_file: str = None):
+        self.cache_file = cache_file or os.getenv("HTTP_CACHE_FILE", DEFAULT_HTTP_CACHE_FILE)
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+        self.stats = {'not_modified': 0, 'unchanged': 0, 'parsed': 0}
+
+    def get(self, url: str) -> Optional[Dict]:
+        """URLのキャッシュエントリ取得"""
+        with self._lock:
+            return self._load().get(url)
+
+    def store(self, url: str, entry: Dict):
+        """
+        URLのキャッシュエントリ保存
+
+        他のプロセスが保存した別URLのエントリを消さないよう、ファイルロック内で
+        ディスクの内容を読み直してから、このURLだけ書き換えて保存する
+        """
+        with self._lock:
+            try:
+                with FileLock(f"{self.cache_file}.lock", timeout=SAVE_LOCK_TIMEOUT):
+                    self._entries = self._read()
+                    self._entries[url] = entry
+                    self._flush()
+            except (OSError, TimeoutError) as e:
+                self._load()[url] = entry
+                print(f"HTTPキャッシュ保存エラー: {e}")
+
+    def count(self, key: str):
+        """統計カウンタ加算"""
+        with self._lock:
+            self.stats[key] += 1
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _flush(self):
+        with atomic_write(self.cache_file, encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """プロセス共有のレスポンスキャッシュ"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def fetch_campaigns(
+    url: str,
+    headers: Dict[str, str],
+    parse: Callable[[bytes], List[Dict]],
+    timeout: float = 10,
+    cache: ResponseCache = None,
+    client: HttpClient = None,
+    parser_version: str = PARSER_VERSION
+) -> List[Dict]:
+    """
+    条件付きリクエストでページを取得し、変更があった場合のみ解析
+
+    Args:
+        url: 取得URL
+        headers: リクエストヘッダー
+        parse: 本文 → キャンペーンリストの解析関数
+        timeout: タイムアウト（秒）
+        cache: レスポンスキャッシュ（省略時はプロセス共有）
+        client: HTTPクライアント（省略時はプロセス共有）
+        parser_version: 解析処理のバージョン（違う版の解析結果は使わない）
+
+    Returns:
+        キャンペーンリスト（未変更ならキャッシュ済みの解析結果）
+    """
+    cache = cache or get_response_cache()
+    client = client or get_http_client()
+    entry = cache.get(url)
+    today = date.today().isoformat()
+    if entry and (entry.get('parser_version') != parser_version or entry.get('parsed_on') != today):
+        # 解析処理が変わった・別の日に解析した結果は使わない（条件付きにせず取り直す）
+        entry = None
+
+    request_headers = dict(headers)
+    if entry:
+        if entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = client.get(url, headers=request_headers, timeout=timeout)
+
+    # 304 Not Modified: 本文なし、前回の解析結果を再利用
+    if response.status_code == 304 and entry:
+        cache.count('not_modified')
+        return [decode_campaign(c) for c in entry['campaigns']]
+
+    response.raise_for_status()
+
+    content = response.content
+    digest = hashlib.sha256(content).hexdigest()
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+
+    # 本文が前回と同一: 解析を省略し、検証情報だけ更新
+    if entry and entry.get('sha256') == digest:
+        cache.count('unchanged')
+        if etag != entry.get('etag') or last_modified != entry.get('last_modified'):
+            cache.store(url, {**entry, 'etag': etag, 'last_modified': last_modified})
+        return [decode_campaign(c) for c in entry['campaigns']]
+
+    campaigns = parse(content)
+    cache.count('parsed')
+    cache.store(url, {
+        'etag': etag,
+        'last_modified': last_modified,
+        'sha256': digest,
+        'parser_version': parser_version,
+        'parsed_on': today,
+        'campaigns': [encode_campaign(c) for c in campaigns]
+    })
+    return campaigns
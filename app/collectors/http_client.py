@@ -0,0 +1,180 @@
+"""
+コレクター共通HTTPクライアント
+Keep-Alive接続プール・ジッター付きリトライ・ホスト単位のレート制限
+"""
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+# リトライ対象のステータスコード
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（スレッドセーフ）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # 1秒あたりの補充トークン数
+        self.capacity = capacity  # バースト上限
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """トークンを1つ取得（足りなければ補充まで待機）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _counting_pool(base: type, on_conn: Callable[[bool], None]) -> type:
+    """リクエストに使う接続ごとに、再利用か新規接続かを通知する接続プールクラスを生成"""
+
+    class CountingPool(base):
+        def _get_conn(self, timeout=None):
+            # プールから取り出した接続はソケットを保持している。新規作成・切断済みで閉じた接続は送信時に接続する
+            conn = super()._get_conn(timeout)
+            on_conn(conn.sock is not None)
+            return conn
+
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """接続プールに計測用クラスを差し込むアダプター"""
+
+    def __init__(self, on_conn: Callable[[bool], None], **kwargs):
+        self._on_conn = on_conn
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _counting_pool(HTTPConnectionPool, self._on_conn),
+            'https': _counting_pool(HTTPSConnectionPool, self._on_conn),
+        }
+
+
+class HttpClient:
+    """全コレクターで共有するHTTPクライアント"""
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        rate_per_host: float = 2.0,
+        burst_per_host: float = 4.0
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_per_host = rate_per_host
+        self.burst_per_host = burst_per_host
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0, 'retries': 0}
+
+        self.session = requests.Session()
+        adapter = _CountingAdapter(
+            lambda reused: self._count('connections_reused' if reused else 'connections_opened'),
+            pool_connections=pool_maxsize,
+            pool_maxsize=pool_maxsize
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GETリクエスト（接続エラー・5xx・429は指数バックオフでリトライ）
+
+        Args:
+            url: 取得URL
+            **kwargs: requests.Session.get にそのまま渡す引数
+
+        Returns:
+            レスポンス（リトライ上限に達した場合は最後のレスポンス）
+        """
+        bucket = self._bucket(urlparse(url).netloc)
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            self._count('requests')
+
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt)
+                response.close()
+
+            self._count('retries')
+            time.sleep(delay)
+
+        raise RuntimeError("unreachable")
+
+    def stats(self) -> Dict[str, int]:
+        """接続の新規作成・再利用回数などの統計"""
+        with self._lock:
+            return dict(self._counters)
+
+    def close(self):
+        """接続プールを閉じる"""
+        self.session.close()
+
+    def _bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_host, self.burst_per_host)
+                self._buckets[host] = bucket
+            return bucket
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        """フルジッター付き指数バックオフ"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Retry-After ヘッダー（秒指定のみ対応）"""
+        value = response.headers.get('Retry-After', '')
+        if value.isdigit():
+            return min(float(value), self.backoff_max)
+        return None
+
+
+_default_client: Optional[HttpClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """プロセス共有のHTTPクライアント"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,97 @@
+"""
+キャンペーンのタイトル・URL正規化
+全角/半角・記号・日付表記の揺れを吸収し、同一キャンペーンの判定に使う
+"""
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+# 日付・曜日・時刻の表記（タイトルの掲載時期の違いは同一キャンペーンとみなす）
+_DATE_PATTERN = re.compile(
+    r'\d{4}年\d{1,2}月\d{1,2}日'
+    r'|\d{4}[/.-]\d{1,2}[/.-]\d{1,2}'
+    r'|\d{1,2}月\d{1,2}日'
+    r'|\d{1,2}/\d{1,2}'
+    r'|\d{4}年\d{1,2}月'
+    r'|\d{1,2}月'
+    r'|[(（][月火水木金土日祝・]+[)）]'
+    r'|\d{1,2}:\d{2}'
+)
+
+# 文字・数字以外（記号・空白・括弧など）
+_SYMBOL_PATTERN = re.compile(r'[\W_]+')
+
+_PATH_TOKEN_PATTERN = re.compile(r'[/\-_.]+')
+
+# URLパスのうち内容を表さないトークン
+_IGNORED_PATH_TOKENS = frozenset({'', 'index', 'html', 'htm', 'php', 'jsp', 'aspx', 'campaign', 'campaigns', 'event', 'events'})
+
+
+def normalize_title(title: str) -> str:
+    """
+    タイトルを比較用に正規化
+
+    例: "【楽天】スーパーSALE　3/4(月)〜" → "楽天スーパーsale"
+    """
+    text = unicodedata.normalize('NFKC', title or '').lower()
+    text = _DATE_PATTERN.sub(' ', text)
+    return _SYMBOL_PATTERN.sub('', text)
+
+
+def normalize_url(url: str) -> str:
+    """
+    URLを比較用に正規化（ホストの www. ・クエリ・フラグメント・末尾スラッシュを除去）
+
+    例: "https://www.example.com/sale/?scid=top#a" → "example.com/sale"
+    """
+    parts = urlsplit((url or '').strip().lower())
+    host = parts.netloc
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+def url_path_tokens(url: str) -> List[str]:
+    """
+    URLパスの内容を表すトークン（ホストは含めない）
+
+    例: "https://event.rakuten.co.jp/campaign/supersale/" → ["supersale"]
+    """
+    path = urlsplit((url or '').lower()).path
+    return [
+        token for token in _PATH_TOKEN_PATTERN.split(path)
+        if token not in _IGNORED_PATH_TOKENS
+    ]
+
+
+def title_date_tokens(title: str) -> List[str]:
+    """
+    タイトルの日付・曜日・時刻の表記（normalize_title で除くもの）
+
+    例: "【楽天】3月のポイントアップ 3/4(月)〜" → ["3月", "3/4", "(月)"]
+    """
+    return _DATE_PATTERN.findall(unicodedata.normalize('NFKC', title or '').lower())
+
+
+def make_campaign_id(prefix: str, source: str, url: str, title: str,
+                     listing: bool = False, end_date: Optional[datetime] = None) -> str:
+    """
+    内容から決まるキャンペーンID（プロセス・再起動をまたいで同じ値になる）
+
+    情報源・正規化URL・正規化タイトルのダイジェストから生成。
+    個別リンクがなく url が一覧ページ（listing=True）の場合は、期間だけが違うキャンペーン
+    （「3月」と「4月」など）が同じIDにならないよう、タイトルの日付表記と終了日（抽出できた場合）も含める
+
+    例: make_campaign_id("rakuten", "楽天市場", url, title) → "rakuten_3f2a9c0d1e8b7a64"
+    """
+    parts = [source or '', normalize_url(url), normalize_title(title)]
+    if listing:
+        parts.append(' '.join(title_date_tokens(title)))
+        parts.append(end_date.strftime('%Y-%m-%d') if end_date else '')
+    key = '\n'.join(parts)
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    return f"{prefix}_{digest}"
@@ -2,18 +2,27 @@
 楽天ポイントキャンペーン収集
 requests + BeautifulSoup4 でコスト最小化
 """
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
-import re
+
+from app.collectors.http_cache import fetch_campaigns
+from app.collectors.html_parsing import select_candidates
+from app.collectors.normalize import make_campaign_id
+from app.collectors.extraction import extract_campaign_facts, estimate_return_rate, default_end_date
 
 
 class RakutenCollector:
     """楽天キャンペーン情報収集"""
     
+    source_name = "楽天市場"
+    
     def __init__(self):
         self.base_url = "https://event.rakuten.co.jp"
+        # 複数のエンドポイントから収集
+        self.urls = [
+            f"{self.base_url}/campaign/",  # メインキャンペーンページ
+            "https://point.rakuten.co.jp/campaign/",  # ポイント特集
+        ]
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
@@ -27,13 +36,7 @@ class RakutenCollector:
         """
         campaigns = []
         
-        # 複数のエンドポイントから収集
-        urls = [
-            f"{self.base_url}/campaign/",  # メインキャンペーンページ
-            "https://point.rakuten.co.jp/campaign/",  # ポイント特集
-        ]
-        
-        for url in urls:
+        for url in self.urls:
             try:
                 campaigns.extend(self._scrape_url(url))
             except Exception as e:
@@ -42,27 +45,27 @@ class RakutenCollector:
         return campaigns
     
     def _scrape_url(self, url: str) -> List[Dict]:
-        """URLからキャンペーン情報を抽出"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            campaigns = []
-            
-            # キャンペーン要素を探す（セレクタは実際のHTML構造に合わせて調整）
-            campaign_elements = soup.select('.campaign-item, .event-item, article')
-            
-            for elem in campaign_elements[:10]:  # 上位10件
-                campaign = self._parse_campaign_element(elem, url)
-                if campaign:
-                    campaigns.append(campaign)
-            
-            return campaigns
+        """URLからキャンペーン情報を抽出（取得エラーは呼び出し元へ送出）"""
+        return fetch_campaigns(
+            url,
+            self.headers,
+            lambda content: self._parse_page(content, url),
+            timeout=10
+        )
+    
+    def _parse_page(self, content: bytes, url: str) -> List[Dict]:
+        """ページ本文からキャンペーン要素を抽出"""
+        campaigns = []
         
-        except Exception as e:
-            print(f"スクレイピングエラー: {e}")
-            return []
+        # キャンペーン要素を探す（セレクタは実際のHTML構造に合わせて調整）
+        campaign_elements = select_candidates(content, '.campaign-item, .event-item, article', limit=10)
+        
+        for elem in campaign_elements:  # 上位10件
+            campaign = self._parse_campaign_element(elem, url)
+            if campaign:
+                campaigns.append(campaign)
+        
+        return campaigns
     
     def _parse_campaign_element(self, elem, source_url: str) -> Optional[Dict]:
         """キャンペーン要素をパース"""
@@ -88,23 +91,26 @@ class RakutenCollector:
             desc_elem = elem.select_one('.description, .summary, p')
             description = desc_elem.get_text(strip=True) if desc_elem else ""
             
-            # ポイント還元率を抽出
-            return_rate = self._extract_return_rate(f"{title} {description}")
-            
-            # 期間情報を抽出
-            period_text = elem.get_text()
-            end_date = self._extract_end_date(period_text)
+            # 期間・エントリー要否は要素テキスト全体、還元率はタイトル＋説明文から抽出
+            now = datetime.now()
+            facts = extract_campaign_facts(elem.get_text(' '), now=now, rate_text=f"{title} {description}")
+            return_rate = estimate_return_rate(facts, use_points=False)
+            end_date = facts['end_date'] or default_end_date(now)
             
             return {
-                'campaign_id': f"rakuten_{hash(title)}",
+                'campaign_id': make_campaign_id(
+                    "rakuten", self.source_name, campaign_url or source_url, title,
+                    listing=not campaign_url, end_date=facts['end_date']
+                ),
                 'title': title,
                 'description': description[:200],  # 200文字制限
                 'url': campaign_url or source_url,
-                'source': '楽天市場',
-                'start_date': datetime.now(),
+                'source': self.source_name,
+                'start_date': facts['start_date'] or now,
                 'end_date': end_date,
                 'base_amount': 10000,  # デフォルト想定利用額
                 'return_rate': return_rate,
+                'conditions': {'entry_required': facts['entry_required']},
                 'required_cards': ['楽天カード'],
                 'target_stores': ['楽天市場'],
                 'is_dangerous': False,
@@ -117,58 +123,6 @@ class RakutenCollector:
         except Exception as e:
             print(f"パースエラー: {e}")
             return None
-    
-    def _extract_return_rate(self, text: str) -> int:
-        """
-        テキストから還元率を抽出
-        
-        例: "ポイント10倍" → 10
-             "20%還元" → 20
-        """
-        # ポイント倍率
-        match = re.search(r'(\d+)倍', text)
-        if match:
-            return int(match.group(1))
-        
-        # パーセント表記
-        match = re.search(r'(\d+)%', text)
-        if match:
-            return int(match.group(1))
-        
-        # デフォルト
-        return 5
-    
-    def _extract_end_date(self, text: str) -> datetime:
-        """
-        テキストから終了日を抽出
-        
-        例: "2026年2月28日まで" → datetime(2026, 2, 28)
-        """
-        # 年月日パターン
-        match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', text)
-        if match:
-            year, month, day = map(int, match.groups())
-            try:
-                return datetime(year, month, day, 23, 59, 59)
-            except ValueError:
-                pass
-        
-        # 月日のみパターン
-        match = re.search(r'(\d{1,2})月(\d{1,2})日', text)
-        if match:
-            month, day = map(int, match.groups())
-            year = datetime.now().year
-            try:
-                end_date = datetime(year, month, day, 23, 59, 59)
-                # 過去の日付なら来年
-                if end_date < datetime.now():
-                    end_date = datetime(year + 1, month, day, 23, 59, 59)
-                return end_date
-            except ValueError:
-                pass
-        
-        # デフォルト: 30日後
-        return datetime.now() + timedelta(days=30)
 
 
 def collect_rakuten_campaigns() -> List[Dict]:
@@ -0,0 +1,159 @@
+"""
+ソース単位の再収集スケジューラー
+config/sources.yml の check_frequency を読み、鮮度切れのソースだけを再収集対象にする
+"""
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from app.collectors.sources_config import load_sources
+
+# check_frequency の名前付き指定
+NAMED_FREQUENCIES = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+DEFAULT_FREQUENCY = NAMED_FREQUENCIES['daily']
+
+# バックグラウンド再収集の最短再試行間隔（失敗が続くと倍々に延ばし、最大 MAX_RETRY_INTERVAL）
+MIN_RETRY_INTERVAL = timedelta(minutes=5)
+MAX_RETRY_INTERVAL = timedelta(hours=1)
+
+_DURATION_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([mhd])\s*$')
+_DURATION_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def parse_frequency(value: Union[str, int, float, None]) -> timedelta:
+    """
+    check_frequency を期間に変換
+
+    例: "daily" → 1日, "6h" → 6時間, "30m" → 30分, 12 → 12時間
+    """
+    if value is None:
+        return DEFAULT_FREQUENCY
+
+    if isinstance(value, (int, float)):
+        return timedelta(hours=value)
+
+    text = str(value).strip().lower()
+    if text in NAMED_FREQUENCIES:
+        return NAMED_FREQUENCIES[text]
+
+    match = _DURATION_PATTERN.match(text)
+    if match:
+        amount, unit = match.groups()
+        return timedelta(**{_DURATION_UNITS[unit]: float(amount)})
+
+    raise ValueError(f"不明なcheck_frequency: {value}")
+
+
+def load_check_frequencies(config_file: Union[str, Path] = None) -> Dict[str, timedelta]:
+    """
+    コレクターごとの再収集間隔を読み込み
+
+    同じコレクターに複数の情報源がある場合は最も短い間隔を採用
+
+    Returns:
+        コレクターキー → 再収集間隔
+    """
+    frequencies: Dict[str, timedelta] = {}
+    for source in load_sources(config_file):
+        key = source.get('collector')
+        if not key:
+            continue
+        frequency = parse_frequency(source.get('check_frequency'))
+        frequencies[key] = min(frequency, frequencies.get(key, frequency))
+
+    return frequencies
+
+
+class RefreshScheduler:
+    """ソースごとの鮮度管理"""
+
+    def __init__(self, source_keys: List[str], config_file: Union[str, Path] = None):
+        frequencies = load_check_frequencies(config_file)
+        self.frequencies = {key: frequencies.get(key, DEFAULT_FREQUENCY) for key in source_keys}
+
+    def stale_sources(self, refreshed_at: Dict[str, Optional[datetime]], now: datetime = None) -> List[str]:
+        """
+        再収集が必要なソースを判定
+
+        Args:
+            refreshed_at: ソースキー → 最終収集日時（未収集は None または欠落）
+            now: 判定時刻（省略時は現在時刻）
+
+        Returns:
+            鮮度切れのソースキー（登録順）
+        """
+        now = now or datetime.now()
+        stale = []
+        for key, frequency in self.frequencies.items():
+            last = refreshed_at.get(key)
+            if last is None or now - last >= frequency:
+                stale.append(key)
+        return stale
+
+
+class RefreshThrottle:
+    """
+    ソースごとの再収集の起動間隔（プロセス内）
+
+    鮮度切れのソースが取得に失敗し続けても、リクエストのたびに再収集を起動しないよう、
+    最後に起動した時刻から再試行間隔が経つまで同じソースは起動しない。
+    失敗するたびに間隔を倍にし、成功したら記録を消す
+    """
+
+    def __init__(self, min_interval: timedelta = MIN_RETRY_INTERVAL, max_interval: timedelta = MAX_RETRY_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._attempted_at: Dict[str, datetime] = {}
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def retry_interval(self, key: str) -> timedelta:
+        """ソースの再試行間隔（連続失敗回数に応じて延ばす）"""
+        failures = self._failures.get(key, 0)
+        return min(self.min_interval * (2 ** min(failures, 16)), self.max_interval)
+
+    def claim(self, keys: List[str], now: datetime = None) -> List[str]:
+        """
+        再試行間隔が経ったソースを選び、起動時刻を記録
+
+        Returns:
+            今回起動してよいソースキー（keys の順）
+        """
+        now = now or datetime.now()
+        with self._lock:
+            due = [
+                key for key in keys
+                if key not in self._attempted_at or now - self._attempted_at[key] >= self.retry_interval(key)
+            ]
+            for key in due:
+                self._attempted_at[key] = now
+            return due
+
+    def record(self, succeeded: List[str], failed: List[str]):
+        """収集結果を記録（失敗したソースは次の再試行間隔を延ばす）"""
+        with self._lock:
+            for key in succeeded:
+                self._attempted_at.pop(key, None)
+                self._failures.pop(key, None)
+            for key in failed:
+                self._failures[key] = self._failures.get(key, 0) + 1
+
+
+_default_throttle: Optional[RefreshThrottle] = None
+_default_throttle_lock = threading.Lock()
+
+
+def get_refresh_throttle() -> RefreshThrottle:
+    """プロセス共有の RefreshThrottle を取得"""
+    global _default_throttle
+    with _default_throttle_lock:
+        if _default_throttle is None:
+            _default_throttle = RefreshThrottle()
+        return _default_throttle
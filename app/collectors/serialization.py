@@ -0,0 +1,27 @@
+"""
+キャンペーンのJSON変換
+datetime を ISO形式文字列と相互変換する
+"""
+from datetime import datetime
+from typing import Dict
+
+
+DATE_FIELDS = ('start_date', 'end_date')
+
+
+def encode_campaign(campaign: Dict) -> Dict:
+    """キャンペーンをJSON保存できる形に変換（datetime → ISO文字列）"""
+    camp_copy = dict(campaign)
+    for field in DATE_FIELDS:
+        if isinstance(camp_copy.get(field), datetime):
+            camp_copy[field] = camp_copy[field].isoformat()
+    return camp_copy
+
+
+def decode_campaign(data: Dict) -> Dict:
+    """JSONから読み込んだキャンペーンを復元（ISO文字列 → datetime）"""
+    campaign = dict(data)
+    for field in DATE_FIELDS:
+        if isinstance(campaign.get(field), str):
+            campaign[field] = datetime.fromisoformat(campaign[field])
+    return campaign
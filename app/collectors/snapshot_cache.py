@@ -0,0 +1,128 @@
+"""
+プロセス内のスナップショットキャッシュ
+パース済み・変更不可のキャンペーンリストを共有し、
+キャッシュファイルの mtime/サイズ または DBスナップショットのバージョンが変わったときだけ読み直す
+"""
+import threading
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Mapping, Tuple
+
+
+def freeze(value: Any) -> Any:
+    """辞書 → MappingProxyType、リスト → タプル に再帰的に変換（変更不可にする）"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def freeze_campaigns(campaigns: List[Dict]) -> Tuple[Mapping, ...]:
+    """キャンペーンリストを変更不可のタプルに変換"""
+    return tuple(freeze(camp) for camp in campaigns)
+
+
+class SnapshotSlice(tuple):
+    """
+    スナップショットの先頭 start 件を除いたタプル（期限切れを除いたもの）
+
+    元のスナップショット（base）と開始位置を持ち、列データ・インデックスのキャッシュは
+    このオブジェクト自体ではなく (base, start) で引く
+    """
+
+    def __new__(cls, base: Tuple[Mapping, ...], start: int):
+        if isinstance(base, SnapshotSlice):
+            base, start = base.base, base.start + start
+        view = super().__new__(cls, base[start:])
+        view.base = base
+        view.start = start
+        return view
+
+
+def snapshot_origin(campaigns: Tuple[Mapping, ...]) -> Tuple[Tuple[Mapping, ...], int]:
+    """(元のスナップショット, 開始位置)（SnapshotSlice でなければ (campaigns, 0)）"""
+    if isinstance(campaigns, SnapshotSlice):
+        return campaigns.base, campaigns.start
+    return campaigns, 0
+
+
+class SnapshotCache:
+    """
+    スロット（ファイルパス・DB）ごとに最新の1件だけを保持するキャッシュ
+
+    キー（mtime/サイズ・バージョンなど）が前回と同じならヒット、違えば loader で読み直す
+    """
+
+    def __init__(self):
+        self._entries: Dict[Hashable, Tuple[Hashable, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, slot: Hashable, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        キャッシュから取得（キーが変わっていれば loader で読み直す）
+
+        Args:
+            slot: キャッシュの置き場所（例: ("file", パス)）
+            key: 内容の同一性を表す値（例: (mtime_ns, size)、バージョン）
+            loader: 読み込み処理（戻り値はそのまま共有されるため変更不可にしておく）
+        """
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+
+        # 読み込み中はロックを持たない（同時ミスは両方読み込み、後勝ち）
+        value = loader()
+
+        with self._lock:
+            self.misses += 1
+            if value is not None:
+                self._entries[slot] = (key, value)
+        return value
+
+    async def get_async(self, slot: Hashable, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """get の非同期版（loader はコルーチン関数）"""
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+
+        value = await loader()
+
+        with self._lock:
+            self.misses += 1
+            if value is not None:
+                self._entries[slot] = (key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """ヒット・ミス回数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries)
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """プロセス共有のスナップショットキャッシュ"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SnapshotCache()
+        return _default_cache
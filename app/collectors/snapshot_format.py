@@ -0,0 +1,323 @@
+"""
+キャンペーンスナップショットのバイナリ形式
+固定長レコード＋文字列テーブル（情報源・カード・店舗などは重複排除して1回だけ格納）で保存し、
+読み込みは mmap 上で struct.iter_unpack により一括で行う
+
+ファイル構成（リトルエンディアン）:
+    ヘッダ      magic "PKSN" / バージョン / 各セクションの件数・バイト長
+    メタ情報    JSON（cached_at, sources）
+    文字列表    UTF-8本文の終端オフセット配列 + 本文（番号0は None）
+    リスト表    各リストの終端位置配列 + 文字列番号の配列（番号0は None）
+    レコード    キャンペーン1件 = 固定長 RECORD_STRUCT
+"""
+import json
+import mmap
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from app.collectors.serialization import encode_campaign, decode_campaign
+from app.utils.file_io import atomic_write
+
+
+MAGIC = b"PKSN"
+FORMAT_VERSION = 1
+
+# magic, バージョン, メタ長, 文字列数, 文字列本文長, リスト数, リスト要素数, レコード数
+HEADER_STRUCT = struct.Struct('<4sHxxIIIIII')
+
+# campaign_id, title, description, url, source, danger_reason（文字列番号）,
+# start_date, end_date（エポックからのマイクロ秒）, base_amount, return_rate,
+# required_cards, target_stores, action_steps（リスト番号）, extras（文字列番号: 残りの項目のJSON）, flags
+RECORD_STRUCT = struct.Struct('<6Iqqqd4IB3x')
+
+NONE_INDEX = 0  # 文字列番号・リスト番号の0は None
+NONE_TIME = -(1 << 63)
+
+STRING_FIELDS = ('campaign_id', 'title', 'description', 'url', 'source', 'danger_reason')
+DATE_FIELDS = ('start_date', 'end_date')
+LIST_FIELDS = ('required_cards', 'target_stores', 'action_steps')
+RECORD_FIELDS = frozenset(STRING_FIELDS + DATE_FIELDS + LIST_FIELDS + ('base_amount', 'return_rate', 'is_dangerous'))
+
+# flags
+FLAG_DANGEROUS = 1
+FLAG_HAS_DANGEROUS = 2
+FLAG_HAS_BASE_AMOUNT = 4
+FLAG_HAS_RETURN_RATE = 8
+FLAG_RETURN_RATE_INT = 16
+
+EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_INT64_MIN, _INT64_MAX = -(1 << 63) + 1, (1 << 63) - 1
+
+
+def is_binary_snapshot(path: Union[str, Path]) -> bool:
+    """ファイル先頭がバイナリ形式の magic か"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class _Interner:
+    """値 → 通し番号（同じ値は1回だけ格納。番号0は None）"""
+
+    def __init__(self):
+        self.index: Dict = {None: NONE_INDEX}
+        self.values: List = [None]
+
+    def add(self, value) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+def _extras_key(extras: Dict):
+    """extras の重複判定用キー（ハッシュできなければ None）"""
+    key = tuple(
+        (name, tuple(value.items()) if type(value) is dict else value)
+        for name, value in extras.items()
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def write_binary_snapshot(path: Union[str, Path], campaigns: List[Dict],
+                          refreshed_at: Dict[str, datetime] = None, cached_at: datetime = None) -> int:
+    """
+    スナップショットをバイナリ形式で保存
+
+    レコードに収まらない値（タイムゾーン付き日時・文字列以外のタイトルなど）や
+    その他の項目（conditions など）は extras にJSONで格納する（同じ内容は1回だけ）。
+    一時ファイルに書いてから置き換えるため、読み込み中のプロセスは古いファイルを読み切れる
+
+    Returns:
+        書き込んだバイト数
+    """
+    strings = _Interner()
+    lists = _Interner()
+    list_ids: Dict[tuple, int] = {}  # 文字列のタプル → リスト番号
+    extras_ids: Dict[tuple, int] = {}  # extras のキー → 文字列番号
+    records = bytearray()
+    pack = RECORD_STRUCT.pack
+    add_string = strings.add
+
+    for camp in campaigns:
+        extra_names = camp.keys() - RECORD_FIELDS
+        extras = {name: camp[name] for name in extra_names} if extra_names else {}
+        get = camp.get
+
+        fields = []
+        for field in STRING_FIELDS:
+            value = get(field)
+            if value is None or type(value) is str:
+                fields.append(add_string(value))
+            else:
+                fields.append(NONE_INDEX)
+                extras[field] = value
+
+        for field in DATE_FIELDS:
+            value = get(field)
+            if type(value) is datetime and value.tzinfo is None:
+                fields.append((value - EPOCH) // _ONE_MICROSECOND)
+            else:
+                fields.append(NONE_TIME)
+                if value is not None:
+                    extras[field] = value
+
+        flags = 0
+        base_amount = get('base_amount')
+        if type(base_amount) is int and _INT64_MIN <= base_amount <= _INT64_MAX:
+            flags |= FLAG_HAS_BASE_AMOUNT
+        else:
+            if base_amount is not None:
+                extras['base_amount'] = base_amount
+            base_amount = 0
+
+        return_rate = get('return_rate')
+        if type(return_rate) is int and abs(return_rate) < (1 << 53):
+            flags |= FLAG_HAS_RETURN_RATE | FLAG_RETURN_RATE_INT
+        elif type(return_rate) is float:
+            flags |= FLAG_HAS_RETURN_RATE
+        else:
+            if return_rate is not None:
+                extras['return_rate'] = return_rate
+            return_rate = 0
+        fields.append(base_amount)
+        fields.append(float(return_rate))
+
+        for field in LIST_FIELDS:
+            value = get(field)
+            if value is None:
+                fields.append(NONE_INDEX)
+                continue
+            key = tuple(value) if type(value) in (list, tuple) else None
+            list_id = list_ids.get(key) if key is not None else None
+            if list_id is None:
+                if key is not None and all(type(item) is str for item in key):
+                    list_id = list_ids[key] = lists.add(tuple(add_string(item) for item in key))
+                else:
+                    list_id = NONE_INDEX
+                    extras[field] = value
+            fields.append(list_id)
+
+        is_dangerous = get('is_dangerous')
+        if type(is_dangerous) is bool:
+            flags |= FLAG_HAS_DANGEROUS | (FLAG_DANGEROUS if is_dangerous else 0)
+        elif is_dangerous is not None:
+            extras['is_dangerous'] = is_dangerous
+
+        extras_id = NONE_INDEX
+        if extras:
+            key = _extras_key(extras)
+            extras_id = extras_ids.get(key) if key is not None else None
+            if extras_id is None:
+                extras_id = add_string(json.dumps(encode_campaign(extras), ensure_ascii=False, separators=(',', ':')))
+                if key is not None:
+                    extras_ids[key] = extras_id
+        fields.append(extras_id)
+        fields.append(flags)
+
+        records += pack(*fields)
+
+    # 文字列表
+    encoded = [b''] + [value.encode('utf-8') for value in strings.values[1:]]
+    string_ends, total = [], 0
+    for data in encoded:
+        total += len(data)
+        string_ends.append(total)
+
+    # リスト表
+    list_ends, list_items = [0], []
+    for items in lists.values[1:]:
+        list_items.extend(items)
+        list_ends.append(len(list_items))
+
+    meta = json.dumps({
+        'cached_at': (cached_at or datetime.now()).isoformat(),
+        'sources': {key: {'refreshed_at': refreshed.isoformat()} for key, refreshed in (refreshed_at or {}).items()},
+    }, ensure_ascii=False).encode('utf-8')
+
+    header = HEADER_STRUCT.pack(
+        MAGIC, FORMAT_VERSION, len(meta),
+        len(encoded), total, len(list_ends), len(list_items), len(campaigns)
+    )
+
+    with atomic_write(path, 'wb') as f:
+        f.write(header)
+        f.write(meta)
+        f.write(struct.pack(f'<{len(string_ends)}I', *string_ends))
+        f.write(b''.join(encoded))
+        f.write(struct.pack(f'<{len(list_ends)}I', *list_ends))
+        f.write(struct.pack(f'<{len(list_items)}I', *list_items))
+        f.write(records)
+        return f.tell()
+
+
+def read_binary_snapshot(path: Union[str, Path]) -> Optional[Dict]:
+    """
+    バイナリ形式のスナップショットを読み込み
+
+    Returns:
+        cached_at / refreshed_at / campaigns（_load_file_snapshot と同じ形。
+        レコードの項目は値がなくても None で入る）
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return _parse(mapped)
+
+
+def _parse(buffer) -> Dict:
+    (magic, version, meta_size, string_count, string_bytes,
+     list_count, list_item_count, record_count) = HEADER_STRUCT.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"未対応のスナップショット形式: {magic!r} v{version}")
+
+    offset = HEADER_STRUCT.size
+    meta = json.loads(buffer[offset:offset + meta_size])
+    offset += meta_size
+
+    # 文字列表（各文字列は1回だけデコード）
+    string_ends = struct.unpack_from(f'<{string_count}I', buffer, offset)
+    offset += 4 * string_count
+    blob = buffer[offset:offset + string_bytes]
+    offset += string_bytes
+    strings = [None]
+    start = string_ends[0]
+    for end in string_ends[1:]:
+        strings.append(blob[start:end].decode('utf-8'))
+        start = end
+
+    # リスト表
+    list_ends = struct.unpack_from(f'<{list_count}I', buffer, offset)
+    offset += 4 * list_count
+    list_items = struct.unpack_from(f'<{list_item_count}I', buffer, offset)
+    offset += 4 * list_item_count
+    lists = [None]
+    start = list_ends[0]
+    for end in list_ends[1:]:
+        lists.append(tuple(strings[i] for i in list_items[start:end]))
+        start = end
+
+    times: Dict[int, Optional[datetime]] = {NONE_TIME: None}  # 同じ日時は1回だけ生成
+    extras_cache: Dict[int, Dict] = {}
+
+    campaigns = []
+    append = campaigns.append
+    # レコードはコピーせず mmap 上で直接アンパック
+    with memoryview(buffer)[offset:offset + RECORD_STRUCT.size * record_count] as view:
+        records = RECORD_STRUCT.iter_unpack(view)
+        for (campaign_id, title, description, url, source, danger_reason,
+             start_date, end_date, base_amount, return_rate,
+             required_cards, target_stores, action_steps, extras_id, flags) in records:
+            start = times.get(start_date, EPOCH)
+            if start is EPOCH:
+                start = times[start_date] = EPOCH + timedelta(microseconds=start_date)
+            end = times.get(end_date, EPOCH)
+            if end is EPOCH:
+                end = times[end_date] = EPOCH + timedelta(microseconds=end_date)
+
+            cards, stores, steps = lists[required_cards], lists[target_stores], lists[action_steps]
+            camp = {
+                'campaign_id': strings[campaign_id],
+                'title': strings[title],
+                'description': strings[description],
+                'url': strings[url],
+                'source': strings[source],
+                'start_date': start,
+                'end_date': end,
+                'required_cards': list(cards) if cards is not None else None,
+                'target_stores': list(stores) if stores is not None else None,
+                'action_steps': list(steps) if steps is not None else None,
+                'danger_reason': strings[danger_reason],
+            }
+            if flags & FLAG_HAS_DANGEROUS:
+                camp['is_dangerous'] = flags & FLAG_DANGEROUS == FLAG_DANGEROUS
+            if flags & FLAG_HAS_BASE_AMOUNT:
+                camp['base_amount'] = base_amount
+            if flags & FLAG_HAS_RETURN_RATE:
+                camp['return_rate'] = int(return_rate) if flags & FLAG_RETURN_RATE_INT else return_rate
+            if extras_id:
+                extras = extras_cache.get(extras_id)
+                if extras is None:
+                    extras = extras_cache[extras_id] = decode_campaign(json.loads(strings[extras_id]))
+                # 共有している extras の辞書・リストは複製して渡す
+                for name, value in extras.items():
+                    camp[name] = value.copy() if type(value) in (dict, list) else value
+            append(camp)
+        del records  # mmap を閉じられるようにバッファを解放
+
+    cached_at = datetime.fromisoformat(meta.get('cached_at', '2000-01-01'))
+    refreshed_at = {
+        key: datetime.fromisoformat(value['refreshed_at'])
+        for key, value in meta.get('sources', {}).items()
+        if value.get('refreshed_at')
+    }
+    return {'cached_at': cached_at, 'refreshed_at': refreshed_at, 'campaigns': campaigns}
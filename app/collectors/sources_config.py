@@ -0,0 +1,28 @@
+"""
+情報源設定（config/sources.yml）の読み込み
+"""
+from pathlib import Path
+from typing import Dict, List, Union
+
+import yaml
+
+
+DEFAULT_SOURCES_FILE = Path(__file__).resolve().parents[2] / "config" / "sources.yml"
+
+
+def load_sources(config_file: Union[str, Path] = None) -> List[Dict]:
+    """
+    情報源リストを読み込み
+
+    Returns:
+        sources 配下の設定リスト（読み込めない場合は空リスト）
+    """
+    path = Path(config_file or DEFAULT_SOURCES_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except OSError as e:
+        print(f"情報源設定の読み込みエラー: {e}")
+        return []
+
+    return config.get('sources') or []
@@ -1,18 +1,22 @@
 """
 Vポイント（三井住友カード）キャンペーン収集
 """
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List, Dict, Optional
-import re
+
+from app.collectors.http_cache import fetch_campaigns
+from app.collectors.html_parsing import select_candidates
+from app.collectors.normalize import make_campaign_id
+from app.collectors.extraction import extract_campaign_facts, estimate_return_rate, default_end_date
 
 
 class VPointCollector:
     """Vポイントキャンペーン情報収集"""
     
+    source_name = "Vポイント"
+    
     def __init__(self):
-        self.base_urls = [
+        self.urls = [
             "https://www.smbc-card.com/mem/campaign/",  # 三井住友カード
             "https://www.saisoncard.co.jp/campaign/",  # セゾンカード（Vポイント提携）
         ]
@@ -24,7 +28,7 @@ class VPointCollector:
         """Vポイントキャンペーン収集"""
         campaigns = []
         
-        for url in self.base_urls:
+        for url in self.urls:
             try:
                 campaigns.extend(self._scrape_url(url))
             except Exception as e:
@@ -33,27 +37,27 @@ class VPointCollector:
         return campaigns
     
     def _scrape_url(self, url: str) -> List[Dict]:
-        """URLからキャンペーン情報を抽出"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            campaigns = []
-            
-            # キャンペーン要素を探す
-            campaign_elements = soup.select('.campaign-list li, .campaign-item, article')
-            
-            for elem in campaign_elements[:10]:
-                campaign = self._parse_campaign_element(elem, url)
-                if campaign:
-                    campaigns.append(campaign)
-            
-            return campaigns
+        """URLからキャンペーン情報を抽出（取得エラーは呼び出し元へ送出）"""
+        return fetch_campaigns(
+            url,
+            self.headers,
+            lambda content: self._parse_page(content, url),
+            timeout=10
+        )
+    
+    def _parse_page(self, content: bytes, url: str) -> List[Dict]:
+        """ページ本文からキャンペーン要素を抽出"""
+        campaigns = []
         
-        except Exception as e:
-            print(f"スクレイピングエラー: {e}")
-            return []
+        # キャンペーン要素を探す
+        campaign_elements = select_candidates(content, '.campaign-list li, .campaign-item, article', limit=10)
+        
+        for elem in campaign_elements:
+            campaign = self._parse_campaign_element(elem, url)
+            if campaign:
+                campaigns.append(campaign)
+        
+        return campaigns
     
     def _parse_campaign_element(self, elem, source_url: str) -> Optional[Dict]:
         """キャンペーン要素をパース"""
@@ -80,12 +84,11 @@ class VPointCollector:
             desc_elem = elem.select_one('.description, .text, p')
             description = desc_elem.get_text(strip=True) if desc_elem else ""
             
-            # 還元率抽出
-            return_rate = self._extract_return_rate(f"{title} {description}")
-            
-            # 期間抽出
-            period_text = elem.get_text()
-            end_date = self._extract_end_date(period_text)
+            # 期間・エントリー要否は要素テキスト全体、還元率はタイトル＋説明文から抽出
+            now = datetime.now()
+            facts = extract_campaign_facts(elem.get_text(' '), now=now, rate_text=f"{title} {description}")
+            return_rate = estimate_return_rate(facts)
+            end_date = facts['end_date'] or default_end_date(now)
             
             # カード判定
             required_cards = []
@@ -95,15 +98,19 @@ class VPointCollector:
                 required_cards.append('セゾンカード')
             
             return {
-                'campaign_id': f"vpoint_{hash(title)}",
+                'campaign_id': make_campaign_id(
+                    "vpoint", self.source_name, campaign_url or source_url, title,
+                    listing=not campaign_url, end_date=facts['end_date']
+                ),
                 'title': title,
                 'description': description[:200],
                 'url': campaign_url or source_url,
-                'source': 'Vポイント',
-                'start_date': datetime.now(),
+                'source': self.source_name,
+                'start_date': facts['start_date'] or now,
                 'end_date': end_date,
                 'base_amount': 15000,
                 'return_rate': return_rate,
+                'conditions': {'entry_required': facts['entry_required']},
                 'required_cards': required_cards if required_cards else ['三井住友カード'],
                 'target_stores': ['コンビニ', 'スーパー', 'オンラインショップ'],
                 'is_dangerous': False,
@@ -116,53 +123,6 @@ class VPointCollector:
         except Exception as e:
             print(f"パースエラー: {e}")
             return None
-    
-    def _extract_return_rate(self, text: str) -> int:
-        """還元率抽出"""
-        # ポイント倍率
-        match = re.search(r'(\d+)倍', text)
-        if match:
-            return int(match.group(1))
-        
-        # パーセント
-        match = re.search(r'(\d+)%', text)
-        if match:
-            return int(match.group(1))
-        
-        # Vポイント直接指定
-        match = re.search(r'(\d+)ポイント', text)
-        if match:
-            points = int(match.group(1))
-            # 1万円利用で何ポイントかを推定
-            return max(1, int((points / 10000) * 100))
-        
-        return 5
-    
-    def _extract_end_date(self, text: str) -> datetime:
-        """終了日抽出"""
-        # 年月日
-        match = re.search(r'(\d{4})年(\d{1,2})月(\d{1,2})日', text)
-        if match:
-            year, month, day = map(int, match.groups())
-            try:
-                return datetime(year, month, day, 23, 59, 59)
-            except ValueError:
-                pass
-        
-        # 月日のみ
-        match = re.search(r'(\d{1,2})月(\d{1,2})日', text)
-        if match:
-            month, day = map(int, match.groups())
-            year = datetime.now().year
-            try:
-                end_date = datetime(year, month, day, 23, 59, 59)
-                if end_date < datetime.now():
-                    end_date = datetime(year + 1, month, day, 23, 59, 59)
-                return end_date
-            except ValueError:
-                pass
-        
-        return datetime.now() + timedelta(days=30)
 
 
 def collect_vpoint_campaigns() -> List[Dict]:
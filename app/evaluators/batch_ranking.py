@@ -0,0 +1,146 @@
+"""
+バッチランキング（週次通知など、多数のユーザーの上位 k 件をまとめて求める）
+ユーザーをブロックに分け、ブロックごとに ユーザー数 × キャンペーン数 の行列でスコアを一括計算する。
+ブロックはプロセスプールで CPU コア数だけ並列に処理し、各プロセスは
+キャンペーンの列データを起動時に1回だけ作る
+
+結果は rank_top_k(campaigns, profile, k) と同じ
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from app.evaluators.features import card_names
+from app.evaluators.personalize import _enrich_rows
+from app.evaluators.scoring import CampaignMatrix, get_campaign_matrix, score_names, top_k_rows
+from app.notifiers.formatters import format_weekly_notification
+from app.profiles.user_profile import UserProfile
+
+
+WEEKLY_TOP_K = 5  # 週次通知（有料）の表示件数
+
+# 1ブロックの行列の要素数（ユーザー数 × キャンペーン数）の目安。float64 で1配列約16MB
+MATRIX_CELLS = 2_000_000
+
+# 列データの作成に使う項目（ワーカープロセスにはこれだけ渡す）
+MATRIX_FIELDS = ('base_amount', 'return_rate', 'end_date', 'is_dangerous', 'required_cards', 'target_stores')
+
+# ワーカープロセス内の列データと基準時刻（_init_worker で設定）
+_worker_matrix = None
+_worker_now = None
+
+
+def _init_worker(rows: List[Dict], now: datetime):
+    global _worker_matrix, _worker_now
+    _worker_matrix = CampaignMatrix(rows)
+    _worker_now = now
+
+
+def _rank_block_in_worker(user_cards, user_stores, k: int):
+    return _rank_block(_worker_matrix, user_cards, user_stores, k, _worker_now)
+
+
+def _rank_block(matrix: CampaignMatrix, user_cards: Sequence[Sequence[str]], user_stores: Sequence[Sequence[str]],
+                k: int, now: datetime) -> Tuple[List, ...]:
+    """
+    ブロックのユーザーごとの上位 k 件
+
+    Returns:
+        (インデックス, スコア, 期待還元額, 残日数, カード保有) それぞれ ユーザー数 × k のリスト
+    """
+    scores = score_names(matrix, user_cards, user_stores, now)
+    order = top_k_rows(scores.score, k)
+    return (order.tolist(),) + tuple(
+        np.take_along_axis(values, order, axis=1).tolist() for values in scores
+    )
+
+
+def _names(block: Sequence) -> Tuple[List, List]:
+    """プロフィールからスコア計算に使う値だけを取り出す（プロセス間で渡すため）"""
+    return (
+        [card_names(profile) for profile in block],
+        [list(profile.favorite_stores) for profile in block],
+    )
+
+
+def _blocks(profiles: Iterable, block_size: int) -> Iterator[List]:
+    iterator = iter(profiles)
+    while True:
+        block = list(islice(iterator, block_size))
+        if not block:
+            return
+        yield block
+
+
+def _with_campaigns(campaigns: Sequence[Dict], block: List, result: Tuple[List, ...]) -> Iterator[Tuple[object, List[Dict]]]:
+    for profile, *values in zip(block, *result):
+        yield profile, _enrich_rows(campaigns, *values)
+
+
+def rank_users_top_k(campaigns: Sequence[Dict], profiles: Iterable, k: int = WEEKLY_TOP_K,
+                     workers: int = None, block_size: int = None,
+                     now: datetime = None) -> Iterator[Tuple[object, List[Dict]]]:
+    """
+    ユーザーごとの上位 k 件をまとめて計算
+
+    profiles はブロック単位で読み進めるため、iter_users のような
+    ジェネレータを渡せば全ユーザーをメモリに載せずに処理できる
+
+    Args:
+        campaigns: キャンペーンリスト（スナップショット）
+        profiles: UserProfile の並び
+        k: ユーザーごとの件数
+        workers: プロセス数（省略時は CPU コア数。1 ならこのプロセスで計算）
+        block_size: 1ブロックのユーザー数（省略時は MATRIX_CELLS ÷ キャンペーン数）
+        now: 残日数の基準（省略時は開始時刻。全ユーザー共通）
+
+    Yields:
+        (プロフィール, rank_top_k と同じ形式のリスト)（profiles の順）
+    """
+    now = now or datetime.now()
+    block_size = block_size or max(1, MATRIX_CELLS // max(len(campaigns), 1))
+    workers = workers or os.cpu_count() or 1
+    blocks = _blocks(profiles, block_size)
+
+    if workers <= 1:
+        matrix = get_campaign_matrix(campaigns)
+        for block in blocks:
+            yield from _with_campaigns(campaigns, block, _rank_block(matrix, *_names(block), k, now))
+        return
+
+    rows = [{field: campaign[field] for field in MATRIX_FIELDS if field in campaign} for campaign in campaigns]
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rows, now))
+
+    # 投入済みのブロックはプロセス数の2倍まで（結果は投入順に返す）
+    pending = deque()
+    try:
+        for block in blocks:
+            pending.append((block, executor.submit(_rank_block_in_worker, *_names(block), k)))
+            if len(pending) >= workers * 2:
+                block, future = pending.popleft()
+                yield from _with_campaigns(campaigns, block, future.result())
+
+        while pending:
+            block, future = pending.popleft()
+            yield from _with_campaigns(campaigns, block, future.result())
+
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_weekly_notifications(campaigns: Sequence[Dict], plan: str = 'paid', k: int = WEEKLY_TOP_K,
+                              workers: int = None) -> Iterator[Tuple[str, str]]:
+    """
+    週次通知の本文をユーザーごとに生成
+
+    Yields:
+        (line_user_id, 通知本文)
+    """
+    profiles = chain.from_iterable(UserProfile.iter_users(plan=plan))
+    for profile, ranked in rank_users_top_k(campaigns, profiles, k, workers=workers):
+        yield profile.line_user_id, format_weekly_notification(ranked, profile.plan)
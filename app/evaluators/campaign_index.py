@@ -0,0 +1,241 @@
+"""
+キャンペーンの転置インデックス（上位 k 件ランキングの候補の絞り込み）
+スナップショットの必要カード・対象店舗・ソースごとに、該当するキャンペーンの位置（昇順の配列）を持つ
+
+上位 k 件は、カード不要・保有カードが使える・お気に入り店舗が対象のキャンペーン（候補）だけを
+ユーザーごとに計算する。残り（必要カード未保有・店舗不一致）のスコアはユーザーによらないため
+スナップショットごとに1回だけ並べておき、先頭から候補以外を k 件取って候補の上位と併せる。
+残りの並びは残日数の加点が変わるまで使い回す
+
+結果は top_k_order(score_campaigns(...), k) と同じ
+"""
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.collectors.snapshot_cache import snapshot_origin
+from app.evaluators.features import card_names
+from app.evaluators.scoring import (
+    DAY_BONUS, _DAY_US, _clock_us, CampaignMatrix, Scores,
+    days_remaining, rank_order, score_campaigns, score_names, top_k_order
+)
+
+
+CARD = 'card'  # 必要カード（名前 None はカード不要）
+STORE = 'store'  # 対象店舗
+SOURCE = 'source'  # 収集元
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _fingerprint(campaign: Dict) -> Tuple:
+    """インデックスに使う項目（前回のスナップショットと変わっていなければ位置だけ付け替える）"""
+    return (
+        tuple(campaign.get('required_cards') or ()),
+        tuple(campaign.get('target_stores') or ()),
+        campaign.get('source'),
+    )
+
+
+def _keys(fingerprint: Tuple) -> set:
+    cards, stores, source = fingerprint
+    keys = {(CARD, card) for card in cards} if cards else {(CARD, None)}
+    keys.update((STORE, store) for store in stores)
+    if source is not None:
+        keys.add((SOURCE, source))
+    return keys
+
+
+class CampaignIndex:
+    """スナップショットの転置インデックス（(種類, 名前) → キャンペーン位置の昇順配列）"""
+
+    def __init__(self, campaigns: Sequence[Dict], previous: 'CampaignIndex' = None):
+        """
+        Args:
+            campaigns: スナップショット
+            previous: 前回のスナップショットのインデックス（あれば差分だけ読み直す）
+        """
+        self.campaigns = campaigns
+        self.fingerprints = [_fingerprint(campaign) for campaign in campaigns]
+        ids = [campaign.get('campaign_id') for campaign in campaigns]
+        # 差分更新は campaign_id がすべてあり重複しない場合だけ
+        self.positions = {campaign_id: i for i, campaign_id in enumerate(ids)}
+        if None in self.positions or len(self.positions) != len(ids):
+            self.positions = None
+
+        self.reused = 0  # 前回から位置を付け替えただけのキャンペーン数
+        if previous is not None and previous.positions is not None and self.positions is not None:
+            self.postings = self._update(previous)
+        else:
+            self.postings = self._collect(range(len(campaigns)))
+
+        self._rest = None
+        self._rest_lock = threading.Lock()
+
+    def _collect(self, positions: Iterable[int]) -> Dict[Tuple, np.ndarray]:
+        lists: Dict[Tuple, List[int]] = {}
+        for i in positions:
+            for key in _keys(self.fingerprints[i]):
+                lists.setdefault(key, []).append(i)
+        return {key: np.asarray(values, dtype=np.int64) for key, values in lists.items()}
+
+    def _update(self, previous: 'CampaignIndex') -> Dict[Tuple, np.ndarray]:
+        """前回のインデックスの位置を付け替え、追加・変更されたキャンペーンだけ読み直す"""
+        old_to_new = np.full(len(previous.fingerprints), -1, dtype=np.int64)
+        changed = []
+        for campaign_id, i in self.positions.items():
+            old = previous.positions.get(campaign_id)
+            if old is not None and previous.fingerprints[old] == self.fingerprints[i]:
+                old_to_new[old] = i
+            else:
+                changed.append(i)
+        self.reused = len(self.positions) - len(changed)
+
+        postings = {}
+        for key, old_positions in previous.postings.items():
+            moved = old_to_new[old_positions]
+            postings[key] = moved[moved >= 0]
+        for key, added in self._collect(changed).items():
+            postings[key] = np.concatenate((postings.get(key, _EMPTY), added))
+        # 並び順が変わっていることがあるため昇順に戻す
+        return {key: np.sort(values) for key, values in postings.items() if len(values)}
+
+    def tail(self, start: int, campaigns: Sequence[Dict]) -> 'CampaignIndex':
+        """先頭 start 件を除いたスナップショットのインデックス（位置をずらすだけで読み直さない）"""
+        index = CampaignIndex.__new__(CampaignIndex)
+        index.campaigns = campaigns
+        index.fingerprints = self.fingerprints[start:]
+        index.positions = None  # 差分更新の元には全件のインデックスを使う
+        index.reused = len(index.fingerprints)
+        index.postings = {}
+        for key, positions in self.postings.items():
+            kept = positions[np.searchsorted(positions, start):]
+            if len(kept):
+                index.postings[key] = kept - start
+        index._rest = None
+        index._rest_lock = threading.Lock()
+        return index
+
+    def __len__(self) -> int:
+        return len(self.campaigns)
+
+    def lookup(self, kind: str, names: Iterable) -> np.ndarray:
+        """names のいずれかに該当するキャンペーンの位置（昇順）"""
+        return self._union([self.postings[(kind, name)] for name in names if (kind, name) in self.postings])
+
+    def candidates(self, cards: Iterable[str], stores: Iterable[str]) -> np.ndarray:
+        """カード不要・保有カードが使える・お気に入り店舗が対象のキャンペーンの位置（昇順）"""
+        keys = [(CARD, None)] + [(CARD, card) for card in cards] + [(STORE, store) for store in stores]
+        return self._union([self.postings[key] for key in keys if key in self.postings])
+
+    def _union(self, found: List[np.ndarray]) -> np.ndarray:
+        if not found:
+            return _EMPTY
+        if len(found) == 1:
+            return found[0]
+        # 件数分のフラグに立てて拾う（連結して np.unique で並べ替えるより速い）
+        selected = np.zeros(len(self.campaigns), dtype=bool)
+        for positions in found:
+            selected[positions] = True
+        return np.flatnonzero(selected)
+
+    def top_k(self, matrix: CampaignMatrix, profile, k: int, now: datetime = None) -> Tuple[np.ndarray, Scores]:
+        """
+        上位 k 件（候補だけを計算）
+
+        Args:
+            matrix: 同じスナップショットの CampaignMatrix
+
+        Returns:
+            (キャンペーンの位置, その位置のスコア等)（top_k_order(score_campaigns(...), k) と同じ順）
+        """
+        now = now or datetime.now()
+        if k <= 0:
+            return _EMPTY, Scores(np.empty(0), _EMPTY, _EMPTY, np.empty(0, dtype=bool))
+
+        # 候補: ユーザーごとに計算
+        candidates = self.candidates(card_names(profile), profile.favorite_stores)
+        scores = score_campaigns(matrix.subset(candidates), profile, now)
+        top = top_k_order(scores, k)
+
+        # 候補以外: スコア順の並びの先頭から k 件（候補は飛ばす）
+        rest_scores, rest_order = self._rest_ranking(matrix, now)
+        head = rest_order[:k + len(candidates)]
+        head = head[~np.isin(head, candidates, assume_unique=True)][:k]
+
+        positions = np.concatenate((candidates[top], head))
+        score = np.concatenate((scores.score[top], rest_scores.score[head]))
+        order = np.lexsort((positions, -score))[:k]
+        positions = positions[order]
+        return positions, Scores(
+            score[order],
+            np.concatenate((scores.expected_return[top], rest_scores.expected_return[head]))[order],
+            np.concatenate((scores.days_remaining[top], days_remaining(matrix.subset(head), now)))[order],
+            np.concatenate((scores.has_required_card[top], np.zeros(len(head), dtype=bool)))[order]
+        )
+
+    def _rest_ranking(self, matrix: CampaignMatrix, now: datetime) -> Tuple[Scores, np.ndarray]:
+        """
+        必要カード未保有・店舗不一致として計算した全件のスコアと並び順
+
+        ユーザーによらず、残日数の加点が変わるまで（次に締切まで 15/8/4 日を切るまで）同じ
+        """
+        naive_us, aware_us = _clock_us(now)
+        rest = self._rest
+        if rest is not None and rest[0] is matrix:
+            (naive_from, naive_until), (aware_from, aware_until) = rest[1]
+            if naive_from <= naive_us <= naive_until and aware_from <= aware_us <= aware_until:
+                return rest[2], rest[3]
+
+        with self._rest_lock:
+            scores = Scores(*(values[0] for values in score_names(matrix, [()], [()], now)))
+            validity = (
+                (naive_us, self._bonus_stable_until(matrix, matrix.has_end & ~matrix.end_aware, naive_us)),
+                (aware_us, self._bonus_stable_until(matrix, matrix.has_end & matrix.end_aware, aware_us)),
+            )
+            self._rest = (matrix, validity, scores, rank_order(scores))
+            return self._rest[2], self._rest[3]
+
+    @staticmethod
+    def _bonus_stable_until(matrix: CampaignMatrix, selected: np.ndarray, now_us: int) -> int:
+        """残日数の加点が変わらない最後の時刻（締切まで 上限日数 + 1 日 を切る直前）"""
+        boundaries = matrix.end_us[selected, np.newaxis] - np.array([limit + 1 for limit, _ in DAY_BONUS]) * _DAY_US
+        ahead = boundaries[boundaries >= now_us]
+        return int(ahead.min()) if len(ahead) else sys.maxsize
+
+
+# 直近のスナップショットのインデックス（スナップショットが変わったら差分で作り直す）
+_index_cache: Optional[CampaignIndex] = None
+# 期限切れを除いたスナップショットのインデックス（元のスナップショット, 開始位置, インデックス）
+_tail_cache: Optional[Tuple] = None
+_index_cache_lock = threading.Lock()
+
+
+def get_campaign_index(campaigns: Sequence[Dict]) -> Optional[CampaignIndex]:
+    """
+    スナップショットの転置インデックス取得
+
+    (元のスナップショット, 開始位置) で再利用する。期限切れを除いたもの（SnapshotSlice）は
+    全件のインデックスの位置をずらして作る。変更されうるリストは作っても使い回せないため None
+    """
+    global _index_cache, _tail_cache
+    if not isinstance(campaigns, tuple):
+        return None
+
+    base, start = snapshot_origin(campaigns)
+    with _index_cache_lock:
+        cached = _index_cache
+        if cached is None or cached.campaigns is not base:
+            cached = _index_cache = CampaignIndex(base, previous=cached)
+        if not start:
+            return cached
+
+        tail = _tail_cache
+        if tail is not None and tail[0] is base and tail[1] == start:
+            return tail[2]
+        index = cached.tail(start, campaigns)
+        _tail_cache = (base, start, index)
+        return index
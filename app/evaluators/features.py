@@ -0,0 +1,115 @@
+"""
+カード・店舗名の特徴量エンコード（ビットマスク）
+名前を語彙に登録してビット位置を割り当て、キャンペーンの必要カード・対象店舗や
+ユーザーの保有カード・お気に入り店舗をビットマスクにする。
+「いずれかを保有しているか」「いずれかと一致するか」はビットマスクの AND 1回で判定できる
+
+- 1件ずつの判定: Python の int（桁数無制限）
+- 一括判定（scoring.py）: 64ビットごとに区切った uint64 配列
+"""
+import threading
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+
+
+WORD_BITS = 64
+_WORD_MASK = (1 << WORD_BITS) - 1
+
+
+class FeatureVocabulary:
+    """名前 → ビット位置の語彙（登録のみで削除はしない。種類の少ないカード名・店舗名用）"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, name: str) -> int:
+        """名前のビット位置（未登録なら割り当てる）"""
+        index = self._ids.get(name)
+        if index is None:
+            with self._lock:
+                index = self._ids.setdefault(name, len(self._ids))
+        return index
+
+    def encode(self, names: Iterable[str], add: bool = True) -> int:
+        """
+        名前の集合をビットマスクに変換
+
+        Args:
+            add: 未登録の名前を登録するか（False なら無視。ユーザー側は未登録の名前が
+                 どのキャンペーンとも一致しないため登録しない）
+        """
+        mask = 0
+        for name in names:
+            index = self.intern(name) if add else self._ids.get(name)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def width(self) -> int:
+        """現在の語彙を表すのに必要な uint64 の個数（最低1）"""
+        return max(1, -(-len(self._ids) // WORD_BITS))
+
+    def encode_rows(self, name_lists: Sequence[Iterable[str]], add: bool = True, width: int = None) -> np.ndarray:
+        """
+        名前リストごとのビットマスクを uint64 配列に変換（件数 × width）
+
+        width を超えるビット（後から登録された名前）は切り捨てる
+        """
+        masks = [self.encode(names, add) for names in name_lists]
+        return to_words(masks, width or self.width())
+
+
+def to_words(masks: Sequence[int], width: int) -> np.ndarray:
+    """int のビットマスクを64ビットごとに区切った uint64 配列（件数 × width）"""
+    words = np.empty((len(masks), width), dtype=np.uint64)
+    for word in range(width):
+        shift = word * WORD_BITS
+        words[:, word] = [(mask >> shift) & _WORD_MASK for mask in masks]
+    return words
+
+
+def any_common(campaign_words: np.ndarray, user_words: np.ndarray) -> np.ndarray:
+    """
+    ユーザー × キャンペーン ごとに共通のビットがあるか（ユーザー数 × キャンペーン数）
+
+    Args:
+        campaign_words: キャンペーン数 × width
+        user_words: ユーザー数 × width（同じ語彙・同じ width で作ったもの）
+    """
+    common = np.zeros((len(user_words), len(campaign_words)), dtype=bool)
+    for word in range(campaign_words.shape[1]):
+        common |= (user_words[:, word, np.newaxis] & campaign_words[:, word]) != 0
+    return common
+
+
+def card_names(profile) -> list:
+    """プロフィールの保有カード名"""
+    return [card.get('name', '') for card in profile.cards]
+
+
+# プロセス共有の語彙（カード名・店舗名は別のビット空間）
+_vocabularies: Dict[str, FeatureVocabulary] = {}
+_vocabularies_lock = threading.Lock()
+
+
+def _get_vocabulary(kind: str) -> FeatureVocabulary:
+    with _vocabularies_lock:
+        vocabulary = _vocabularies.get(kind)
+        if vocabulary is None:
+            vocabulary = _vocabularies[kind] = FeatureVocabulary()
+        return vocabulary
+
+
+def get_card_vocabulary() -> FeatureVocabulary:
+    """カード名の語彙"""
+    return _get_vocabulary('card')
+
+
+def get_store_vocabulary() -> FeatureVocabulary:
+    """店舗名の語彙"""
+    return _get_vocabulary('store')
@@ -2,39 +2,76 @@
 個人最適化・キャンペーンランキング（有料プラン用）
 """
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.profiles.user_profile import UserProfile
+from app.evaluators.campaign_index import get_campaign_index
+from app.evaluators.scoring import get_campaign_matrix, rank_order, score_campaigns, top_k_order
 
 
 def rank_campaigns_for_user(campaigns: List[Dict], profile: UserProfile) -> List[Dict]:
     """
     ユーザーに最適化されたキャンペーンランキング
     
+    スコア・期待還元額・残日数は全キャンペーン分を列指向で一括計算する（scoring.py）。
+    スナップショット（タプル）の列データはカタログが変わるまで再利用
+    
     Args:
         campaigns: キャンペーンリスト
         profile: ユーザープロフィール
     
     Returns:
-        ランク付けされたキャンペーンリスト（上位から順）
+        ランク付けされたキャンペーンリスト（上位から順。同点は元の順）
     """
-    ranked = []
+    scores = score_campaigns(get_campaign_matrix(campaigns), profile)
+    return _enrich(campaigns, scores, rank_order(scores))
+
+
+def rank_top_k(campaigns: List[Dict], profile: UserProfile, k: int) -> List[Dict]:
+    """
+    上位 k 件だけのランキング（rank_campaigns_for_user(...)[:k] と同じ結果）
     
-    for campaign in campaigns:
-        score = _calculate_campaign_score(campaign, profile)
-        expected_return = _calculate_expected_return(campaign, profile)
-        days_remaining = _calculate_days_remaining(campaign)
-        
+    並べ替え・辞書のコピー・理由文の生成は上位 k 件だけ行う（TOP3 は k=3、週次通知は k=5）。
+    スナップショット（タプル）ではスコア計算もカード不要・保有カード・お気に入り店舗の
+    キャンペーンだけに絞る（campaign_index.py）
+    """
+    matrix = get_campaign_matrix(campaigns)
+    index = get_campaign_index(campaigns)
+    if index is not None:
+        # スナップショットは転置インデックスで候補を絞って計算
+        positions, selected = index.top_k(matrix, profile, k)
+        return _enrich_rows(campaigns, positions.tolist(), *(values.tolist() for values in selected))
+    
+    scores = score_campaigns(matrix, profile)
+    return _enrich(campaigns, scores, top_k_order(scores, k))
+
+
+def _enrich(campaigns: List[Dict], scores, order) -> List[Dict]:
+    """指定した順のキャンペーンにスコア・期待還元額・残日数・理由を付ける"""
+    return _enrich_rows(
+        campaigns,
+        order.tolist(),
+        scores.score[order].tolist(),
+        scores.expected_return[order].tolist(),
+        scores.days_remaining[order].tolist(),
+        scores.has_required_card[order].tolist()
+    )
+
+
+def _enrich_rows(campaigns: List[Dict], indices: List[int], score: List[float], expected_return: List[int],
+                 days_remaining: List[int], has_required_card: List[bool]) -> List[Dict]:
+    """_enrich の本体（順位ごとの値を Python のリストで受け取る。バッチランキングと共用）"""
+    ranked = []
+    for i, campaign_score, expected, days, has_card in zip(
+        indices, score, expected_return, days_remaining, has_required_card
+    ):
+        campaign = campaigns[i]
         ranked.append({
             **campaign,
-            'score': score,
-            'expected_return': expected_return,
-            'days_remaining': days_remaining,
-            'reason': _generate_reason(campaign, profile, expected_return, days_remaining)
+            'score': campaign_score,
+            'expected_return': expected,
+            'days_remaining': days,
+            'reason': _build_reason(campaign, expected, days, has_card)
         })
-    
-    # スコア順にソート
-    ranked.sort(key=lambda x: x['score'], reverse=True)
-    
     return ranked
 
 
@@ -140,6 +177,11 @@ def _generate_reason(campaign: Dict, profile: UserProfile, expected_return: int,
     現時点では定型文ベース
     将来的にOpenAI APIで生成
     """
+    return _build_reason(campaign, expected_return, days_remaining, _has_required_card(campaign, profile))
+
+
+def _build_reason(campaign: Dict, expected_return: int, days_remaining: int, has_required_card: bool) -> str:
+    """おすすめ理由（カード保有判定は計算済みの値を使う）"""
     reasons = []
     
     # 期待還元額
@@ -154,8 +196,8 @@ def _generate_reason(campaign: Dict, profile: UserProfile, expected_return: int,
     elif days_remaining <= 7:
         reasons.append(f"締切が{days_remaining}日後に迫っている")
     
-   # カード保有
-    if _has_required_card(campaign, profile):
+    # カード保有
+    if has_required_card:
         required_cards = campaign.get('required_cards', [])
         if required_cards and len(required_cards) > 0:
             card_name = required_cards[0]
@@ -170,13 +212,26 @@ def _generate_reason(campaign: Dict, profile: UserProfile, expected_return: int,
     return "。".join(reasons[:2]) + "。"
 
 
-def get_missed_amount_estimate(profile: UserProfile) -> int:
+def estimate_missed_amount(profile: UserProfile, savings: Optional[Dict],
+                           recommended: Optional[List[Dict]] = None) -> int:
     """
     取り逃し推定額（無料プラン用）
     
-    有料プランだったら得られたであろう金額を推定
+    今月の集計の、表示・推薦したキャンペーンの期待還元額のうち達成していない分。
+    DBは読まない（集計は呼び出し元が get_monthly_savings(_async) で読んで渡す）。
+    集計がまだないユーザーは今回の推薦分、それもなければ属性から推定
+    
+    Args:
+        savings: get_monthly_savings の結果（今月の行動がなければ None）
+        recommended: 今回推薦した（有料プランなら表示していた）キャンペーン（rank_top_k の結果）
     """
-    # ダミー実装（実際はキャンペーン履歴から算出）
+    if savings and savings['viewed_count']:
+        return max(savings['potential_amount'] - savings['completed_amount'], 0)
+    
+    if recommended:
+        return sum(campaign.get('expected_return') or 0 for campaign in recommended)
+    
+    # 履歴なし: 属性からの推定
     base = 5000
     
     # ユーザー属性による補正
@@ -187,3 +242,13 @@ def get_missed_amount_estimate(profile: UserProfile) -> int:
         base += len(profile.favorite_stores) * 300
     
     return base
+
+
+def get_missed_amount_estimate(profile: UserProfile, savings: Optional[Dict] = None,
+                               recommended: Optional[List[Dict]] = None) -> int:
+    """
+    取り逃し推定額（無料プラン用・後方互換）
+    
+    集計・推薦を渡さなければ属性からの推定。DBは読まない（estimate_missed_amount 参照）
+    """
+    return estimate_missed_amount(profile, savings, recommended)
@@ -0,0 +1,310 @@
+"""
+キャンペーンの一括スコアリング（列指向）
+キャンペーンごとの値（想定利用額・還元率・終了日・必要カード・対象店舗・地雷）を
+カタログ（スナップショット）ごとに1回だけ NumPy 配列に変換し、
+ユーザーごとの期待還元額・残日数・カード保有・スコアを全件まとめて計算する
+（週次通知などのバッチでは、複数ユーザー × 全キャンペーンの行列を一度に計算する）
+
+計算結果は personalize の1件ずつの計算（_calculate_campaign_score など）と一致する
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.collectors.snapshot_cache import snapshot_origin
+from app.evaluators.features import (
+    FeatureVocabulary, any_common, card_names, get_card_vocabulary, get_store_vocabulary, to_words
+)
+
+DEFAULT_BASE_AMOUNT = 10000  # 想定利用額（円）
+DEFAULT_RETURN_RATE = 5  # 還元率（%）
+UNKNOWN_DAYS = 999  # 締切不明の残日数
+DAY_BONUS = ((3, 30), (7, 20), (14, 10))  # 残日数がこの日数以下なら加点（締切が近いほど高得点）
+
+_DAY_US = 86_400_000_000
+_MICROSECOND = timedelta(microseconds=1)
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_UTC_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_end_date(end_date):
+    if isinstance(end_date, str):
+        return datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+    return end_date
+
+
+def _epoch_us(moment: datetime) -> int:
+    """エポックからのマイクロ秒（タイムゾーンなしはそのままの壁時計、ありはUTC）"""
+    if moment.tzinfo is None:
+        return (moment - _NAIVE_EPOCH) // _MICROSECOND
+    return (moment - _UTC_EPOCH) // _MICROSECOND
+
+
+def _clock_us(now: datetime) -> Tuple[int, int]:
+    """基準時刻のエポックマイクロ秒（タイムゾーンなしの締切と比べる値, ありの締切と比べる値）"""
+    local_now = now if now.tzinfo is None else now.astimezone().replace(tzinfo=None)
+    return _epoch_us(local_now), _epoch_us(now.astimezone(timezone.utc))
+
+
+class _FeatureMasks:
+    """
+    キャンペーンごとの名前リスト（必要カード・対象店舗）をビットマスクで保持
+
+    words: キャンペーン数 × width の uint64（語彙 vocabulary のビット位置）
+    """
+
+    def __init__(self, vocabulary: FeatureVocabulary, name_lists: List[Sequence[str]]):
+        self.vocabulary = vocabulary
+        masks = [vocabulary.encode(names) for names in name_lists]
+        self.width = vocabulary.width()
+        self.words = to_words(masks, self.width)
+        self.has_any = np.fromiter((mask != 0 for mask in masks), dtype=bool, count=len(masks))
+
+    def any_match(self, names) -> np.ndarray:
+        """キャンペーンごとに、名前リストのいずれかが names に含まれるか"""
+        return self.any_match_rows([names])[0]
+
+    def any_match_rows(self, name_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        """any_match をユーザーごとにまとめて計算（ユーザー数 × キャンペーン数。ビットマスクの AND）"""
+        return any_common(self.words, self.vocabulary.encode_rows(name_lists, add=False, width=self.width))
+
+    def subset(self, positions: np.ndarray) -> '_FeatureMasks':
+        """指定位置のキャンペーンだけのビットマスク"""
+        subset = _FeatureMasks.__new__(_FeatureMasks)
+        subset.vocabulary = self.vocabulary
+        subset.width = self.width
+        subset.words = self.words[positions]
+        subset.has_any = self.has_any[positions]
+        return subset
+
+
+class CampaignMatrix:
+    """カタログ全体の列データ（ユーザーによらない部分）"""
+
+    def __init__(self, campaigns: Sequence[Dict]):
+        self.campaigns = campaigns
+        size = len(campaigns)
+
+        base_amount = np.empty(size, dtype=np.float64)
+        return_rate = np.empty(size, dtype=np.float64)
+        end_us = np.zeros(size, dtype=np.int64)
+        has_end = np.zeros(size, dtype=bool)
+        end_aware = np.zeros(size, dtype=bool)
+        dangerous = np.zeros(size, dtype=bool)
+        required_cards = []
+        target_stores = []
+
+        for i, campaign in enumerate(campaigns):
+            get = campaign.get
+            base = get('base_amount', DEFAULT_BASE_AMOUNT)
+            rate = get('return_rate', DEFAULT_RETURN_RATE)
+            base_amount[i] = DEFAULT_BASE_AMOUNT if base is None else base
+            return_rate[i] = DEFAULT_RETURN_RATE if rate is None else rate
+
+            end_date = get('end_date')
+            if end_date:
+                end_date = _parse_end_date(end_date)
+                end_us[i] = _epoch_us(end_date)
+                has_end[i] = True
+                end_aware[i] = end_date.tzinfo is not None
+
+            dangerous[i] = bool(get('is_dangerous', False))
+            required_cards.append(get('required_cards') or ())
+            target_stores.append(get('target_stores') or ())
+
+        # 想定利用額 × (還元率 / 100)（personalize と同じ順で計算し、丸め誤差も一致させる）
+        self.base_return = base_amount * (return_rate / 100)
+        self.end_us = end_us
+        self.has_end = has_end
+        self.end_aware = end_aware
+        self.dangerous = dangerous
+        self.required_cards = _FeatureMasks(get_card_vocabulary(), required_cards)
+        self.target_stores = _FeatureMasks(get_store_vocabulary(), target_stores)
+
+    def __len__(self) -> int:
+        return len(self.base_return)
+
+    def subset(self, positions: np.ndarray) -> 'CampaignMatrix':
+        """
+        指定位置のキャンペーンだけの列データ（候補の絞り込み用）
+
+        campaigns は持たない（結果のインデックスは positions の中の位置）
+        """
+        subset = CampaignMatrix.__new__(CampaignMatrix)
+        subset.campaigns = None
+        for name in ('base_return', 'end_us', 'has_end', 'end_aware', 'dangerous'):
+            setattr(subset, name, getattr(self, name)[positions])
+        subset.required_cards = self.required_cards.subset(positions)
+        subset.target_stores = self.target_stores.subset(positions)
+        return subset
+
+    def tail(self, start: int, campaigns: Sequence[Dict]) -> 'CampaignMatrix':
+        """先頭 start 件を除いた列データ（配列はコピーせずビューで持つ。期限切れを除いたスナップショット用）"""
+        tail = self.subset(slice(start, None))
+        tail.campaigns = campaigns
+        return tail
+
+
+class Scores(NamedTuple):
+    """ユーザー1人分の計算結果（キャンペーンの並び順。score_users では ユーザー数 × キャンペーン数）"""
+    score: np.ndarray  # float64
+    expected_return: np.ndarray  # int64（円）
+    days_remaining: np.ndarray  # int64（締切不明は 999）
+    has_required_card: np.ndarray  # bool
+
+
+def score_campaigns(matrix: CampaignMatrix, profile, now: datetime = None) -> Scores:
+    """
+    ユーザーに対する全キャンペーンのスコアを一括計算
+
+    Args:
+        matrix: CampaignMatrix（get_campaign_matrix で取得）
+        profile: UserProfile（cards / favorite_stores を使う）
+        now: 残日数の基準（省略時は現在時刻。タイムゾーンなし）
+    """
+    return Scores(*(values[0] for values in score_users(matrix, [profile], now)))
+
+
+def score_users(matrix: CampaignMatrix, profiles: Sequence, now: datetime = None) -> Scores:
+    """
+    複数ユーザー × 全キャンペーンのスコアを一括計算（各行は score_campaigns と同じ結果）
+
+    メモリはユーザー数 × キャンペーン数に比例するため、大人数は分割して渡す
+    """
+    return score_names(
+        matrix,
+        [card_names(profile) for profile in profiles],
+        [profile.favorite_stores for profile in profiles],
+        now
+    )
+
+
+def score_names(matrix: CampaignMatrix, user_cards: Sequence[Sequence[str]],
+                user_stores: Sequence[Sequence[str]], now: datetime = None) -> Scores:
+    """score_users の本体（ユーザーごとの保有カード名・お気に入り店舗のリストで受け取る）"""
+    now = now or datetime.now()
+    users = len(user_cards)
+
+    # カード保有（必要カードなし、またはいずれかを保有）・お気に入り店舗との一致
+    has_card = ~matrix.required_cards.has_any | matrix.required_cards.any_match_rows(user_cards)
+    store_match = matrix.target_stores.any_match_rows(user_stores)
+
+    days = days_remaining(matrix, now)
+    day_bonus = np.select([days <= limit for limit, _ in DAY_BONUS], [bonus for _, bonus in DAY_BONUS], 0)
+    penalty = np.where(matrix.dangerous, 50, 0)
+
+    # 期待還元額・スコアはキャンペーンごとに（店舗一致・カード保有の）4通りしかないため、
+    # 複数ユーザーの場合は1次元で計算してからユーザーごとに選ぶ
+    def expected_for(multiplier):
+        # 利用傾向の係数（対象店舗なし 1.0 / お気に入り店舗と一致 1.5 / それ以外 0.8）
+        return np.trunc(matrix.base_return * np.where(matrix.target_stores.has_any, multiplier, 1.0)).astype(np.int64)
+
+    def score_for(expected, card_bonus):
+        score = np.minimum(expected / 100, 50)
+        score = score + day_bonus
+        score = score + card_bonus
+        score = score - penalty
+        return np.maximum(score, 0)
+
+    matched = expected_for(1.5)
+    unmatched = expected_for(0.8)
+
+    if users == 1:
+        # 1人なら表を作るより直接計算する方が速い
+        expected = np.where(store_match, matched, unmatched)
+        score = score_for(expected, np.where(has_card, 20, -10))
+        return Scores(score, expected, days[np.newaxis], has_card)
+
+    # キャンペーンごとに（店舗不一致・カードなし / 一致・なし / 不一致・あり / 一致・あり）の順で並べた表を、
+    # ユーザーごとの組み合わせ番号（0〜3）で引く
+    combination = (has_card.view(np.uint8) << 1) | store_match.view(np.uint8)
+    index = np.arange(len(days)) * 4 + combination
+    expected = np.stack([unmatched, matched, unmatched, matched], axis=1).ravel()[index]
+    score = np.stack([
+        score_for(unmatched, -10), score_for(matched, -10), score_for(unmatched, 20), score_for(matched, 20)
+    ], axis=1).ravel()[index]
+
+    return Scores(score, expected, np.broadcast_to(days, (users, len(days))), has_card)
+
+
+def days_remaining(matrix: CampaignMatrix, now: datetime) -> np.ndarray:
+    """残日数（timedelta.days と同じく切り捨て、負は0。締切不明は 999）。ユーザーによらない"""
+    naive_us, aware_us = _clock_us(now)
+    now_us = np.where(matrix.end_aware, aware_us, naive_us)
+    return np.where(matrix.has_end, np.maximum((matrix.end_us - now_us) // _DAY_US, 0), UNKNOWN_DAYS)
+
+
+def rank_order(scores: Scores) -> np.ndarray:
+    """スコアの高い順のインデックス（同点は元の順）"""
+    return np.argsort(-scores.score, kind='stable')
+
+
+def top_k_order(scores: Scores, k: int) -> np.ndarray:
+    """
+    上位 k 件のインデックス（rank_order(scores)[:k] と同じ結果）
+
+    全件を並べ替えず、k 番目のスコアを np.partition（選択アルゴリズム）で求め、
+    それより高いものと、同点のうち先に出現したものだけを並べ替える
+    """
+    return top_k_rows(scores.score[np.newaxis], k)[0]
+
+
+def top_k_rows(score: np.ndarray, k: int) -> np.ndarray:
+    """
+    行（ユーザー）ごとの上位 k 件のインデックス（ユーザー数 × k）
+
+    各行は np.argsort(-score[row], kind='stable')[:k] と同じ
+    """
+    users, size = score.shape
+    if k <= 0 or size == 0:
+        return np.empty((users, 0), dtype=np.int64)
+    if k >= size:
+        return np.argsort(-score, axis=1, kind='stable')
+
+    threshold = np.partition(score, size - k, axis=1)[:, size - k, np.newaxis]
+    above = score > threshold
+    ties = score == threshold
+    # 同点は先に出現したものから、行ごとにちょうど k 件になるまで採用
+    needed = k - above.sum(axis=1, keepdims=True)
+    keep = above | (ties & (np.cumsum(ties, axis=1) <= needed))
+    candidates = np.nonzero(keep)[1].reshape(users, k)
+
+    # スコアの高い順（候補はインデックス順なので、安定ソートで同点はインデックス順）
+    order = np.argsort(-np.take_along_axis(score, candidates, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+# 直近のカタログの列データ（元のスナップショット, 全件の列データ, 開始位置, 開始位置以降の列データ）
+# スナップショットは変更不可のタプルのため、同一オブジェクトなら使い回す
+_matrix_cache: Optional[Tuple] = None
+_matrix_cache_lock = threading.Lock()
+
+
+def get_campaign_matrix(campaigns: Sequence[Dict]) -> CampaignMatrix:
+    """
+    カタログの列データ取得
+
+    スナップショット（タプル）は (元のスナップショット, 開始位置) で再利用する。
+    期限切れを除いたもの（SnapshotSlice）は全件の列データの先頭を除くだけで作り直さない。
+    変更されうるリストは毎回作り直す
+    """
+    global _matrix_cache
+    if not isinstance(campaigns, tuple):
+        return CampaignMatrix(campaigns)
+
+    base, start = snapshot_origin(campaigns)
+    with _matrix_cache_lock:
+        cached = _matrix_cache
+    if cached is not None and cached[0] is base:
+        if cached[2] == start:
+            return cached[3]
+        full = cached[1]
+    else:
+        full = CampaignMatrix(base)
+
+    matrix = full.tail(start, campaigns) if start else full
+    with _matrix_cache_lock:
+        _matrix_cache = (base, full, start, matrix)
+    return matrix
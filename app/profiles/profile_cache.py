@@ -0,0 +1,120 @@
+"""
+ユーザープロフィールのプロセス内キャッシュ
+同じユーザーの連続メッセージでDBを何度も読まないよう、読み込んだ内容を
+件数上限（LRU）・有効期限（TTL）付きで保持する。保存時は呼び出し元が invalidate する
+
+読み込み中に保存・破棄された場合に古い内容を入れないよう、読み込み前に generation() を取り、
+put に渡す（その間に invalidate されていれば保存しない）。
+invalidate はこのプロセス内だけなので、他のプロセス（uvicorn の別ワーカー）では最大 TTL の間古い内容が返る
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_TTL = 60.0  # 秒（他のワーカーでの更新はこの時間内に反映される）
+
+
+class ProfileCache:
+    """
+    LINEユーザーID → プロフィールの内容（辞書）
+
+    値は読み出し側でコピーして使う前提で、キャッシュ内の辞書は変更しない
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, ttl: float = DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # ID → (期限, 内容)
+        # 破棄の世代: 破棄ごとに1進め、ID → 最後に破棄したときの世代を持つ（件数上限を超えた古いものは
+        # _floor にまとめ、記録のないIDはその世代に破棄されたとみなす）
+        self._generation = 0
+        self._invalidated: 'OrderedDict[str, int]' = OrderedDict()
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, line_user_id: str) -> Optional[Dict]:
+        """キャッシュ済みの内容（ない・期限切れなら None）"""
+        with self._lock:
+            entry = self._entries.get(line_user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(line_user_id)
+                self.hits += 1
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[line_user_id]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        """現在の世代（DBから読み込む前に取り、put に渡す）"""
+        with self._lock:
+            return self._generation
+
+    def put(self, line_user_id: str, record: Dict, generation: Optional[int] = None):
+        """
+        内容を保存（上限を超えたら最も古く使われたものから削除）
+
+        Args:
+            generation: 読み込み前の generation()。それ以降にこのユーザーが破棄されていれば保存しない
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if generation is not None and self._invalidated.get(line_user_id, self._floor) > generation:
+                return
+            self._entries[line_user_id] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(line_user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, line_user_id: str):
+        """ユーザーのキャッシュを破棄（保存・プラン変更時）"""
+        with self._lock:
+            self._entries.pop(line_user_id, None)
+            self._generation += 1
+            self._invalidated[line_user_id] = self._generation
+            self._invalidated.move_to_end(line_user_id)
+            while len(self._invalidated) > max(self.max_size, 1):
+                _, generation = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, generation)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """ヒット・ミス回数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries)
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_profile_cache() -> ProfileCache:
+    """プロセス共有のプロフィールキャッシュ（PROFILE_CACHE_SIZE / PROFILE_CACHE_TTL で調整）"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProfileCache(
+                max_size=int(os.getenv("PROFILE_CACHE_SIZE", DEFAULT_MAX_SIZE)),
+                ttl=float(os.getenv("PROFILE_CACHE_TTL", DEFAULT_TTL))
+            )
+        return _default_cache
@@ -1,9 +1,24 @@
 """
 ユーザープロフィール管理
 """
+import copy
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from app.utils.database import get_session, User
+from app.utils.async_database import get_async_session
+from app.profiles.profile_cache import get_profile_cache
+
+
+# キャッシュする項目（User テーブルのカラムと同名）
+PROFILE_FIELDS = (
+    'plan', 'cards', 'favorite_stores', 'preferences',
+    'subscription_start', 'subscription_end',
+)
+
+# 一括読み込みの1クエリあたりの件数（IN のバインド変数・1回に保持する行数の上限）
+BULK_CHUNK_SIZE = 500
 
 
 class UserProfile:
@@ -27,18 +42,22 @@ class UserProfile:
         try:
             user = session.query(User).filter_by(line_user_id=self.line_user_id).first()
             if user:
-                self.plan = user.plan
-                self.cards = user.cards or []
-                self.favorite_stores = user.favorite_stores or []
-                self.preferences = user.preferences or {}
-                self.subscription_start = user.subscription_start
-                self.subscription_end = user.subscription_end
+                self._apply_user(user)
             else:
                 # 新規ユーザーの場合、DBに登録
                 self._create_new_user(session)
         finally:
             session.close()
     
+    def _apply_user(self, user: User):
+        """User 行の内容を反映"""
+        self.plan = user.plan
+        self.cards = user.cards or []
+        self.favorite_stores = user.favorite_stores or []
+        self.preferences = user.preferences or {}
+        self.subscription_start = user.subscription_start
+        self.subscription_end = user.subscription_end
+    
     def _create_new_user(self, session):
         """新規ユーザーをDBに登録"""
         new_user = User(
@@ -51,8 +70,29 @@ class UserProfile:
         session.add(new_user)
         session.commit()
     
+    @classmethod
+    def from_user(cls, user: User) -> 'UserProfile':
+        """読み込み済みの User 行から生成（DBは読まない）"""
+        profile = cls.__new__(cls)
+        profile.line_user_id = user.line_user_id
+        profile._apply_user(user)
+        return profile
+    
+    @classmethod
+    def from_record(cls, line_user_id: str, record: Dict) -> 'UserProfile':
+        """キャッシュした内容から生成（DBは読まない。リスト・辞書はコピー）"""
+        profile = cls.__new__(cls)
+        profile.line_user_id = line_user_id
+        for field in PROFILE_FIELDS:
+            setattr(profile, field, copy.deepcopy(record[field]))
+        return profile
+    
+    def to_record(self) -> Dict:
+        """キャッシュ用の内容（リスト・辞書はコピー）"""
+        return {field: copy.deepcopy(getattr(self, field)) for field in PROFILE_FIELDS}
+    
     def save(self):
-        """DBに保存"""
+        """DBに保存（プロフィールキャッシュは破棄）"""
         session = get_session()
         try:
             user = session.query(User).filter_by(line_user_id=self.line_user_id).first()
@@ -67,6 +107,7 @@ class UserProfile:
                 session.commit()
         finally:
             session.close()
+            get_profile_cache().invalidate(self.line_user_id)
     
     def is_paid_user(self) -> bool:
         """有料ユーザーかどうか"""
@@ -97,5 +138,118 @@ class UserProfile:
     
     @staticmethod
     def get_user(line_user_id: str) -> 'UserProfile':
-        """ユーザー取得"""
-        return UserProfile(line_user_id)
+        """
+        ユーザー取得（プロセス内キャッシュ経由）
+        
+        キャッシュにあればDBを読まない。戻り値は呼び出しごとに別オブジェクト。
+        読み込み中に保存されたときは、読み込んだ内容をキャッシュしない。
+        他のプロセスでの保存は、キャッシュの有効期限（PROFILE_CACHE_TTL）が切れるまで反映されない
+        """
+        cache = get_profile_cache()
+        record = cache.get(line_user_id)
+        if record is not None:
+            return UserProfile.from_record(line_user_id, record)
+        
+        generation = cache.generation()
+        profile = UserProfile(line_user_id)
+        cache.put(line_user_id, profile.to_record(), generation)
+        return profile
+    
+    @staticmethod
+    async def get_user_async(line_user_id: str) -> 'UserProfile':
+        """
+        get_user の非同期版（Webhook 用。DB読み込みでイベントループをブロックしない）
+        
+        キャッシュになければ非同期セッションで読み込み、未登録なら作成する
+        """
+        cache = get_profile_cache()
+        record = cache.get(line_user_id)
+        if record is not None:
+            return UserProfile.from_record(line_user_id, record)
+        
+        generation = cache.generation()
+        query = select(User).where(User.line_user_id == line_user_id)
+        async with get_async_session() as session:
+            user = (await session.execute(query)).scalar_one_or_none()
+            if user is None:
+                user = User(
+                    line_user_id=line_user_id,
+                    plan="free",
+                    cards=[],
+                    favorite_stores=[],
+                    preferences={},
+                    subscription_start=None,
+                    subscription_end=None
+                )
+                session.add(user)
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # 同じユーザーの同時リクエストが先に登録した
+                    await session.rollback()
+                    user = (await session.execute(query)).scalar_one()
+            profile = UserProfile.from_user(user)
+        
+        cache.put(line_user_id, profile.to_record(), generation)
+        return profile
+    
+    @staticmethod
+    def get_many(line_user_ids: Iterable[str], chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, 'UserProfile']:
+        """
+        複数ユーザーを一括取得（セッション1つ、chunk_size 件ごとに IN で1クエリ）
+        
+        未登録のユーザーは作成せず、結果に含めない。プロフィールキャッシュは使わない
+        
+        Returns:
+            LINEユーザーID → プロフィール（引数の順）
+        """
+        ids = list(dict.fromkeys(line_user_ids))
+        found = {}
+        
+        session = get_session()
+        try:
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                for user in session.query(User).filter(User.line_user_id.in_(chunk)):
+                    found[user.line_user_id] = UserProfile.from_user(user)
+        finally:
+            session.close()
+        
+        return {line_user_id: found[line_user_id] for line_user_id in ids if line_user_id in found}
+    
+    @staticmethod
+    def iter_users(plan: Optional[str] = None, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[List['UserProfile']]:
+        """
+        全ユーザーを chunk_size 件ずつ取得（週次通知などのバッチ用）
+        
+        line_user_id のキーセットページング（WHERE line_user_id > 前回の最後 ORDER BY ... LIMIT）で
+        読むため、OFFSET と違い後半のページでも遅くならない。チャンクごとにセッションを閉じる
+        
+        Args:
+            plan: プランで絞り込み（"free" / "paid"、省略時は全員）
+            chunk_size: 1クエリあたりの件数
+        
+        Yields:
+            プロフィールのリスト（line_user_id 順）
+        """
+        last_id = None
+        while True:
+            session = get_session()
+            try:
+                query = session.query(User)
+                if plan is not None:
+                    query = query.filter(User.plan == plan)
+                if last_id is not None:
+                    query = query.filter(User.line_user_id > last_id)
+                users = query.order_by(User.line_user_id).limit(chunk_size).all()
+                profiles = [UserProfile.from_user(user) for user in users]
+            finally:
+                session.close()
+            
+            if not profiles:
+                return
+            yield profiles
+            
+            if len(profiles) < chunk_size:
+                return
+            last_id = profiles[-1].line_user_id
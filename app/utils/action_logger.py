@@ -0,0 +1,225 @@
+"""
+ユーザー行動ログ（UserCampaignAction）の記録
+イベントはメモリ上のキューに積むだけで返り、専用スレッドが件数・時間ごとに
+まとめて1トランザクションで INSERT する（配信日など大量のイベントでも応答を遅らせない）。
+同じトランザクションでユーザー×月の還元額集計（monthly_savings）も更新する
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert, select
+
+from app.utils.database import UserCampaignAction, get_session
+from app.utils.monthly_savings import apply_actions
+
+
+BATCH_SIZE = 200  # 1回の INSERT の最大件数
+FLUSH_INTERVAL = 2.0  # 秒（件数に達しなくてもこの間隔で書き込む）
+MAX_QUEUE_SIZE = 10000  # キューの上限（超えた分は破棄）
+
+ACTION_TYPES = ('viewed', 'recommended', 'clicked', 'completed')
+
+_STOP = object()
+
+
+class ActionLogger:
+    """行動ログのバッファ付き書き込み"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_queue_size: int = MAX_QUEUE_SIZE, session_factory: Callable = None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory or get_session
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._stats_lock = threading.Lock()
+
+    def log(self, line_user_id: str, campaign_id: str, action_type: str,
+            expected_return: int = None, actual_return: int = None, created_at: datetime = None) -> bool:
+        """
+        行動を記録（キューに積むだけでDBには書かない）
+
+        Args:
+            action_type: viewed / recommended（無料プランで表示しなかった TOP3） / clicked / completed
+
+        Returns:
+            キューに積めたか（上限超過時は False）
+        """
+        if action_type not in ACTION_TYPES:
+            print(f"行動ログエラー: 不明な action_type '{action_type}'")
+            return False
+
+        row = {
+            'line_user_id': line_user_id,
+            'campaign_id': campaign_id,
+            'action_type': action_type,
+            'expected_return': expected_return,
+            'actual_return': actual_return,
+            'created_at': created_at or datetime.utcnow(),
+        }
+
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        キューに積まれた行動をすべて書き込むまで待つ
+
+        Returns:
+            timeout 秒以内に書き込みが終わったか（キューが満杯のまま空かなければ False）
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+
+        deadline = time.monotonic() + timeout
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(max(deadline - time.monotonic(), 0))
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """
+        残りを書き込んでスレッドを終了（シャットダウン時）
+
+        Returns:
+            timeout 秒以内に終了したか（キューが満杯のまま空かなければ False）
+        """
+        deadline = time.monotonic() + timeout
+        with self._thread_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return True
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                print("⚠️  行動ログのキューが満杯のため終了要求を送れないまま終了")
+                return False
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            print("⚠️  行動ログの書き込みが終わらないまま終了")
+            return False
+        return True
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="action-logger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """キューから取り出し、件数に達するか flush_interval 経過ごとに書き込む"""
+        batch: List[Dict] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            # 件数到達・時間経過・flush/close 要求 → 書き込み
+            if batch:
+                self._write(batch)
+                batch = []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, rows: List[Dict]):
+        session = self.session_factory()
+        try:
+            # 月次集計の差分加算と同じトランザクション（記録済みの判定のため INSERT より前）
+            apply_actions(session, rows)
+            session.execute(insert(UserCampaignAction), rows)
+            session.commit()
+            self._count('written', len(rows))
+            self._count('batches')
+        except Exception as e:
+            session.rollback()
+            self._count('failed', len(rows))
+            print(f"行動ログ保存エラー: {e}（{len(rows)}件）")
+        finally:
+            session.close()
+
+
+def get_recent_actions(line_user_id: str, limit: int = 50, since: datetime = None,
+                       action_types: List[str] = None) -> List[Dict]:
+    """
+    ユーザーの行動履歴（新しい順）
+
+    (line_user_id, created_at) の複合インデックスで読む
+
+    Returns:
+        campaign_id / action_type / expected_return / actual_return / created_at のリスト
+    """
+    query = select(UserCampaignAction).where(UserCampaignAction.line_user_id == line_user_id)
+    if since is not None:
+        query = query.where(UserCampaignAction.created_at >= since)
+    if action_types:
+        query = query.where(UserCampaignAction.action_type.in_(action_types))
+    query = query.order_by(UserCampaignAction.created_at.desc()).limit(limit)
+
+    session = get_session()
+    try:
+        return [
+            {
+                'campaign_id': action.campaign_id,
+                'action_type': action.action_type,
+                'expected_return': action.expected_return,
+                'actual_return': action.actual_return,
+                'created_at': action.created_at,
+            }
+            for action in session.execute(query).scalars()
+        ]
+    finally:
+        session.close()
+
+
+_default_logger = None
+_default_logger_lock = threading.Lock()
+
+
+def get_action_logger() -> ActionLogger:
+    """プロセス共有の行動ロガー（プロセス終了時に残りを書き込む）"""
+    global _default_logger
+    with _default_logger_lock:
+        if _default_logger is None:
+            _default_logger = ActionLogger()
+            atexit.register(_default_logger.close)
+        return _default_logger
+
+
+def log_action(line_user_id: str, campaign_id: str, action_type: str, **kwargs) -> bool:
+    """行動を記録（get_action_logger().log の省略形）"""
+    return get_action_logger().log(line_user_id, campaign_id, action_type, **kwargs)
@@ -0,0 +1,77 @@
+"""
+非同期DBアクセス（Webhook の応答経路用）
+DATABASE_URL を非同期ドライバのURLに読み替え、イベントループをブロックせずに読み込む
+- SQLite: sqlite+aiosqlite
+- PostgreSQL: postgresql+asyncpg（asyncpg を別途インストール）
+
+テーブル作成・マイグレーションは同期版の init_db() で起動時に行う
+"""
+import threading
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.utils.database import _configure_sqlite, get_db_url
+
+
+# 同期ドライバのスキーム → 非同期ドライバのスキーム
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+}
+
+# DB URL → (エンジン, セッションファクトリ)
+_async_engines: Dict[str, tuple] = {}
+_async_engines_lock = threading.Lock()
+
+
+def to_async_url(db_url: str) -> str:
+    """
+    DB URLを非同期ドライバのURLに変換（ドライバ指定済みならそのまま）
+
+    例: "sqlite:////app/data/db.sqlite3" → "sqlite+aiosqlite:////app/data/db.sqlite3"
+    """
+    scheme, sep, rest = db_url.partition('://')
+    if not sep or '+' in scheme or scheme not in ASYNC_DRIVERS:
+        return db_url
+    return f"{ASYNC_DRIVERS[scheme]}://{rest}"
+
+
+def _get_async_entry(db_url: str):
+    with _async_engines_lock:
+        entry = _async_engines.get(db_url)
+        if entry is None:
+            engine = create_async_engine(to_async_url(db_url), echo=False, pool_pre_ping=not db_url.startswith("sqlite"))
+            if engine.dialect.name == "sqlite":
+                event.listen(engine.sync_engine, "connect", _configure_sqlite)
+            # コミット後も読み込んだ値を使う（非同期では属性アクセス時の再読み込みができない）
+            entry = (engine, async_sessionmaker(engine, expire_on_commit=False))
+            _async_engines[db_url] = entry
+        return entry
+
+
+def get_async_engine() -> AsyncEngine:
+    """非同期エンジン取得（DB URLごとにプロセスで1つ）"""
+    return _get_async_entry(get_db_url())[0]
+
+
+def get_async_session() -> AsyncSession:
+    """
+    非同期セッション取得
+
+    例:
+        async with get_async_session() as session:
+            user = (await session.execute(select(User))).scalars().first()
+    """
+    return _get_async_entry(get_db_url())[1]()
+
+
+async def dispose_async_engines():
+    """生成済みの非同期エンジンを破棄（テスト・シャットダウン時用）"""
+    with _async_engines_lock:
+        engines = [engine for engine, _ in _async_engines.values()]
+        _async_engines.clear()
+    for engine in engines:
+        await engine.dispose()
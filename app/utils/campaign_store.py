@@ -0,0 +1,330 @@
+"""
+キャンペーンの永続化
+収集したスナップショットを campaign_id をキーに Campaign テーブルへ一括 upsert し、
+「掲載中・地雷でない・期限内」の絞り込みはSQL側で行う
+"""
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import false, or_, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.utils.async_database import get_async_session
+from app.utils.database import Campaign, CampaignSnapshot, get_db_url, get_session
+
+
+# campaign_id 以外に保存するカラム
+CAMPAIGN_FIELDS = (
+    'title', 'description', 'url', 'source',
+    'start_date', 'end_date',
+    'conditions', 'required_cards', 'target_stores',
+    'base_amount', 'return_rate', 'action_steps',
+    'is_dangerous', 'danger_reason', 'summary_short',
+)
+
+# キャンペーンにない項目を新規行に入れる値（カラムのデフォルトと同じ）
+FIELD_DEFAULTS = {
+    'conditions': dict,
+    'required_cards': list,
+    'target_stores': list,
+    'action_steps': list,
+    'is_dangerous': lambda: False,
+}
+
+# 1文あたりの行数（SQLiteのバインド変数上限に収まるように分割）
+UPSERT_CHUNK_SIZE = 500
+
+_DIALECT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def _to_row(campaign: Dict, now: datetime) -> Dict:
+    row = {'campaign_id': campaign['campaign_id'], 'updated_at': now, 'is_active': True}
+    for field in CAMPAIGN_FIELDS:
+        if field in campaign:
+            row[field] = campaign[field]
+    return row
+
+
+def upsert_campaigns(campaigns: List[Dict], session=None) -> int:
+    """
+    キャンペーンを一括 upsert（1トランザクション）
+
+    既存の campaign_id は内容を更新（created_at は維持）、新規は追加する。
+    SQLite / PostgreSQL は INSERT ... ON CONFLICT DO UPDATE、
+    それ以外のDBは既存行をまとめて取得して更新・追加する
+
+    Args:
+        campaigns: キャンペーンリスト（campaign_id のないものは無視）
+        session: DBセッション（省略時は新規作成してコミット後に閉じる）
+
+    Returns:
+        upsert した件数
+    """
+    own_session = session is None
+    session = session or get_session()
+
+    try:
+        count = _upsert_rows(session, campaigns, datetime.utcnow())
+        session.commit()
+        return count
+
+    except Exception:
+        session.rollback()
+        raise
+
+    finally:
+        if own_session:
+            session.close()
+
+
+def _upsert_rows(session, campaigns: List[Dict], now: datetime) -> int:
+    """upsert を実行（コミットは呼び出し元）。更新した行の updated_at は now になる"""
+    # 同じ campaign_id が複数あれば後のものを採用（1文で同じ行を2回更新できないため）
+    rows = {}
+    for camp in campaigns:
+        if camp.get('campaign_id'):
+            rows[camp['campaign_id']] = _to_row(camp, now)
+    rows = list(rows.values())
+
+    insert = _DIALECT_INSERTS.get(session.get_bind().dialect.name)
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+        if insert:
+            _upsert_on_conflict(session, insert, chunk)
+        else:
+            _upsert_by_lookup(session, chunk)
+
+    return len(rows)
+
+
+def _upsert_on_conflict(session, insert, rows: List[Dict]):
+    """INSERT ... ON CONFLICT (campaign_id) DO UPDATE"""
+    # 更新するのはいずれかの行が持っている項目のみ（収集しない summary_short などは維持）
+    columns = ['updated_at', 'is_active'] + [field for field in CAMPAIGN_FIELDS if any(field in row for row in rows)]
+
+    values = []
+    for row in rows:
+        value = {'campaign_id': row['campaign_id'], 'created_at': row['updated_at']}
+        for col in columns:
+            if col in row:
+                value[col] = row[col]
+            else:
+                default = FIELD_DEFAULTS.get(col)
+                value[col] = default() if default else None
+        values.append(value)
+
+    statement = insert(Campaign).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=['campaign_id'],
+        set_={col: statement.excluded[col] for col in columns}
+    )
+    session.execute(statement)
+
+
+def _upsert_by_lookup(session, rows: List[Dict]):
+    """既存行を IN でまとめて取得し、更新・追加"""
+    ids = [row['campaign_id'] for row in rows]
+    existing = {
+        campaign.campaign_id: campaign
+        for campaign in session.query(Campaign).filter(Campaign.campaign_id.in_(ids))
+    }
+
+    for row in rows:
+        campaign = existing.get(row['campaign_id'])
+        if campaign is None:
+            session.add(Campaign(created_at=row['updated_at'], **row))
+        else:
+            for col, value in row.items():
+                setattr(campaign, col, value)
+
+
+# 保持するスナップショット履歴の件数
+SNAPSHOT_HISTORY = 10
+
+_custom_store_ids = itertools.count(1)
+
+
+def campaign_to_dict(campaign: Campaign) -> Dict:
+    """Campaign 行をコレクターと同じ形の辞書に変換"""
+    data = {'campaign_id': campaign.campaign_id}
+    for field in CAMPAIGN_FIELDS:
+        data[field] = getattr(campaign, field)
+
+    # 還元率は整数で収集したものを整数に戻す（Float カラムのため）
+    return_rate = data['return_rate']
+    if isinstance(return_rate, float) and return_rate.is_integer():
+        data['return_rate'] = int(return_rate)
+    return data
+
+
+def latest_snapshot_query():
+    """最新スナップショットの行"""
+    return select(CampaignSnapshot).order_by(CampaignSnapshot.id.desc()).limit(1)
+
+
+def snapshot_meta(snapshot: Optional[CampaignSnapshot]) -> Optional[Dict]:
+    """スナップショット行 → version / cached_at / refreshed_at"""
+    if snapshot is None:
+        return None
+    return {
+        'version': snapshot.id,
+        'cached_at': snapshot.cached_at,
+        'refreshed_at': {
+            key: datetime.fromisoformat(refreshed)
+            for key, refreshed in (snapshot.sources or {}).items()
+        }
+    }
+
+
+def active_campaigns_query(now: datetime, include_dangerous: bool = False,
+                           sources: List[str] = None, limit: int = None):
+    """掲載中・期限内（・地雷でない）のキャンペーン（終了日が近い順、終了日不明は最後）"""
+    query = select(Campaign).where(
+        Campaign.is_active == true(),
+        or_(Campaign.end_date >= now, Campaign.end_date.is_(None))
+    )
+    if not include_dangerous:
+        query = query.where(Campaign.is_dangerous == false())
+    if sources:
+        query = query.where(Campaign.source.in_(sources))
+
+    query = query.order_by(Campaign.end_date.is_(None), Campaign.end_date, Campaign.id)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+class CampaignStore:
+    """Campaign テーブルを使ったスナップショットの保存・読み込み"""
+
+    def __init__(self, session_factory: Callable = None):
+        self.session_factory = session_factory or get_session
+        # 同じDBを指すストアの識別子（プロセス内キャッシュのキーに使う）
+        self.identity = get_db_url() if session_factory is None else f"custom-{next(_custom_store_ids)}"
+
+    def save_snapshot(self, campaigns: List[Dict], refreshed_at: Dict[str, datetime] = None,
+                      cached_at: datetime = None) -> int:
+        """
+        スナップショットを保存（1トランザクション）
+
+        今回のキャンペーンを upsert して掲載中にし、含まれないものは掲載終了にする
+
+        Returns:
+            スナップショットのバージョン
+        """
+        session = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            count = _upsert_rows(session, campaigns, now)
+
+            # 今回 upsert しなかった行（updated_at が今回より前）を掲載終了に
+            session.query(Campaign).filter(
+                Campaign.is_active == true(),
+                or_(Campaign.updated_at < now, Campaign.updated_at.is_(None))
+            ).update({'is_active': False}, synchronize_session=False)
+
+            snapshot = CampaignSnapshot(
+                cached_at=cached_at or datetime.now(),
+                count=count,
+                sources={key: refreshed.isoformat() for key, refreshed in (refreshed_at or {}).items()}
+            )
+            session.add(snapshot)
+            session.flush()
+
+            session.query(CampaignSnapshot).filter(
+                CampaignSnapshot.id <= snapshot.id - SNAPSHOT_HISTORY
+            ).delete(synchronize_session=False)
+
+            session.commit()
+            return snapshot.id
+
+        except Exception:
+            session.rollback()
+            raise
+
+        finally:
+            session.close()
+
+    def load_meta(self) -> Optional[Dict]:
+        """
+        最新スナップショットの情報（キャンペーン本体は読まない）
+
+        Returns:
+            version / cached_at / refreshed_at（ソースキー → 最終収集日時）
+            （未保存なら None）
+        """
+        session = self.session_factory()
+        try:
+            return snapshot_meta(session.execute(latest_snapshot_query()).scalar_one_or_none())
+        finally:
+            session.close()
+
+    def load_snapshot(self) -> Optional[Dict]:
+        """
+        最新スナップショット（掲載中のキャンペーンすべて。期限切れ・地雷も含む）
+
+        Returns:
+            version / cached_at / refreshed_at / campaigns（未保存なら None）
+        """
+        meta = self.load_meta()
+        if meta is None:
+            return None
+
+        session = self.session_factory()
+        try:
+            rows = session.query(Campaign).filter(Campaign.is_active == true()).order_by(Campaign.id)
+            return dict(meta, campaigns=[campaign_to_dict(row) for row in rows])
+        finally:
+            session.close()
+
+    def active_campaigns(self, now: datetime = None, include_dangerous: bool = False,
+                         sources: List[str] = None, limit: int = None) -> List[Dict]:
+        """
+        掲載中・期限内（・地雷でない）のキャンペーンをSQLで絞り込んで取得
+
+        Args:
+            now: 期限判定の基準日時（省略時は現在時刻）
+            include_dangerous: 地雷キャンペーンも含めるか
+            sources: 情報源名で絞り込み（例: ["楽天市場"]）
+            limit: 最大件数
+
+        Returns:
+            キャンペーンリスト（終了日が近い順、終了日不明は最後）
+        """
+        query = active_campaigns_query(now or datetime.now(), include_dangerous, sources, limit)
+        session = self.session_factory()
+        try:
+            return [campaign_to_dict(row) for row in session.execute(query).scalars()]
+        finally:
+            session.close()
+
+
+class AsyncCampaignStore:
+    """
+    CampaignStore の読み込みの非同期版（Webhook の応答経路用）
+
+    保存・ファイルからの取り込みは同期版で行う
+    """
+
+    def __init__(self, session_factory: Callable = None):
+        self.session_factory = session_factory or get_async_session
+        self.identity = get_db_url() if session_factory is None else f"custom-{next(_custom_store_ids)}"
+
+    async def load_meta(self) -> Optional[Dict]:
+        """最新スナップショットの情報（CampaignStore.load_meta と同じ）"""
+        async with self.session_factory() as session:
+            result = await session.execute(latest_snapshot_query())
+            return snapshot_meta(result.scalar_one_or_none())
+
+    async def active_campaigns(self, now: datetime = None, include_dangerous: bool = False,
+                               sources: List[str] = None, limit: int = None) -> List[Dict]:
+        """掲載中・期限内（・地雷でない）のキャンペーン（CampaignStore.active_campaigns と同じ）"""
+        query = active_campaigns_query(now or datetime.now(), include_dangerous, sources, limit)
+        async with self.session_factory() as session:
+            result = await session.execute(query)
+            return [campaign_to_dict(row) for row in result.scalars()]
@@ -1,11 +1,12 @@
 """
 データベースモデル定義
 """
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, create_engine
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, Index, UniqueConstraint, create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
+import threading
 
 Base = declarative_base()
 
@@ -13,6 +14,10 @@ Base = declarative_base()
 class User(Base):
     """ユーザー情報"""
     __tablename__ = "users"
+    __table_args__ = (
+        # プラン別の一括読み込み（line_user_id のキーセットページング）用
+        Index("ix_users_plan_line_user_id", "plan", "line_user_id"),
+    )
     
     line_user_id = Column(String, primary_key=True, index=True)
     plan = Column(String, default="free")  # free or paid
@@ -32,6 +37,10 @@ class User(Base):
 class Campaign(Base):
     """キャンペーン情報"""
     __tablename__ = "campaigns"
+    __table_args__ = (
+        # 「掲載中・地雷でない・期限内」の絞り込み用
+        Index("ix_campaigns_active_dangerous_end", "is_active", "is_dangerous", "end_date"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     campaign_id = Column(String, unique=True, index=True)
@@ -40,32 +49,52 @@ class Campaign(Base):
     title = Column(String)
     description = Column(String)
     url = Column(String)
-    source = Column(String)  # 情報源
+    source = Column(String, index=True)  # 情報源
     
     # 期間情報
     start_date = Column(DateTime)
-    end_date = Column(DateTime)
+    end_date = Column(DateTime, index=True)
     
     # 条件情報
     conditions = Column(JSON, default=dict)
     required_cards = Column(JSON, default=list)  # 必要なカード
     target_stores = Column(JSON, default=list)  # 対象店舗
     
+    # 還元情報
+    base_amount = Column(Integer, nullable=True)  # 想定利用額
+    return_rate = Column(Float, nullable=True)  # 還元率（%）
+    action_steps = Column(JSON, default=list)  # 参加手順
+    
     # AI評価結果
-    is_dangerous = Column(Boolean, default=False)  # 地雷判定
+    is_dangerous = Column(Boolean, default=False, index=True)  # 地雷判定
     danger_reason = Column(String, nullable=True)
     
     # 要約
     summary_short = Column(String, nullable=True)  # OSS要約（40文字）
     
     # メタ情報
+    is_active = Column(Boolean, default=True)  # 最新スナップショットに含まれるか
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class CampaignSnapshot(Base):
+    """キャンペーンスナップショットの保存履歴（最新行が現在のスナップショット）"""
+    __tablename__ = "campaign_snapshots"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)  # バージョン
+    cached_at = Column(DateTime, default=datetime.now)  # 保存日時
+    count = Column(Integer, default=0)  # 掲載中のキャンペーン数
+    sources = Column(JSON, default=dict)  # ソースキー → 最終収集日時（ISO形式）
+
+
 class UserCampaignAction(Base):
     """ユーザーのキャンペーン行動履歴"""
     __tablename__ = "user_campaign_actions"
+    __table_args__ = (
+        # ユーザーごとの新しい順の履歴（個人最適化）用
+        Index("ix_user_campaign_actions_user_created", "line_user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     line_user_id = Column(String, index=True)
@@ -79,6 +108,49 @@ class UserCampaignAction(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class UserMonthlySavings(Base):
+    """
+    ユーザー×月の還元額集計（行動ログから差分更新）
+
+    無料プランの取り逃し推定額をインデックス1回の参照で返すための集計
+    """
+    __tablename__ = "user_monthly_savings"
+    __table_args__ = (
+        UniqueConstraint("line_user_id", "month", name="uq_user_monthly_savings_user_month"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    line_user_id = Column(String, nullable=False)
+    month = Column(String, nullable=False)  # YYYY-MM（行動ログの created_at の月）
+    
+    potential_amount = Column(Integer, default=0)  # 表示したキャンペーンの期待還元額の合計
+    completed_amount = Column(Integer, default=0)  # 達成したキャンペーンの期待還元額の合計
+    earned_amount = Column(Integer, default=0)  # 実際の還元額の合計
+    viewed_count = Column(Integer, default=0)  # 表示（無料プランは推薦）したキャンペーン数（同じキャンペーンは1回）
+    completed_count = Column(Integer, default=0)  # 達成したキャンペーン数
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MonthlySavingsCounted(Base):
+    """
+    月次集計に加算済みの (ユーザー, 月, キャンペーン, 行動)
+
+    一意制約への INSERT ... ON CONFLICT DO NOTHING で、複数のプロセスが同じ行動を
+    同時に書き込んでも1回だけ加算する
+    """
+    __tablename__ = "monthly_savings_counted"
+    __table_args__ = (
+        UniqueConstraint("line_user_id", "month", "campaign_id", "action_type", name="uq_monthly_savings_counted"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    line_user_id = Column(String, nullable=False)
+    month = Column(String, nullable=False)
+    campaign_id = Column(String, nullable=False)
+    action_type = Column(String, nullable=False)
+
+
 # データベース初期化
 def get_db_url():
     """環境変数からDB URLを取得"""
@@ -95,16 +167,138 @@ def get_db_url():
     return db_url
 
 
+# 追加済みでも NULL の行をデフォルト値で埋め直すカラム（デフォルトなしで追加していた既存DBの修復）
+BACKFILL_COLUMNS = {('campaigns', 'is_active')}
+
+
+def _backfill_default(conn, table, column):
+    """NULL の行をモデルの固定値デフォルトで埋める（関数のデフォルトは対象外）"""
+    default = column.default
+    if default is None or not default.is_scalar or default.arg is None:
+        return
+    result = conn.execute(
+        text(f'UPDATE {table.name} SET {column.name} = :value WHERE {column.name} IS NULL'),
+        {'value': default.arg}
+    )
+    if result.rowcount:
+        print(f"🛠️ デフォルト値で補完: {table.name}.{column.name}（{result.rowcount}行）")
+
+
+def _add_missing_columns(engine):
+    """
+    既存テーブルに後から追加したカラム・インデックスを補う（簡易マイグレーション）
+    
+    create_all は既存テーブルを変更しないため、モデルにあってDBにないカラムを
+    ALTER TABLE ... ADD COLUMN で追加する（NULL許容）。
+    モデルに固定値のデフォルトがあるカラムは、既存の行を NULL のままにせずデフォルト値で埋める
+    （is_active が NULL だと掲載中の絞り込みから漏れるため）
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    if (table.name, column.name) in BACKFILL_COLUMNS:
+                        _backfill_default(conn, table, column)
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                _backfill_default(conn, table, column)
+                print(f"🛠️ カラム追加: {table.name}.{column.name}")
+    
+    # 既存テーブルに後から追加したインデックス
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+# SQLite の接続ごとの設定
+# WAL: 読み込みが書き込みを待たない / synchronous=NORMAL: WAL ではコミットごとの fsync を省略しても壊れない
+# busy_timeout: 他プロセスの書き込み中はエラーにせず待つ（ミリ秒）
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+)
+
+# DB URL → (エンジン, セッションファクトリ)。プロセス内で使い回す
+_engines = {}
+_schema_ready = set()
+_engines_lock = threading.Lock()
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _get_engine_entry(db_url: str):
+    with _engines_lock:
+        entry = _engines.get(db_url)
+        if entry is None:
+            engine = create_engine(db_url, echo=False, pool_pre_ping=not db_url.startswith("sqlite"))
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", _configure_sqlite)
+            entry = (engine, sessionmaker(bind=engine))
+            _engines[db_url] = entry
+        return entry
+
+
+def get_engine():
+    """
+    エンジン取得（DB URLごとにプロセスで1つ、初回に生成）
+
+    接続プールはエンジンが持つため、セッションごとに作り直さない
+    """
+    return _get_engine_entry(get_db_url())[0]
+
+
 def init_db():
-    """データベース初期化"""
+    """
+    データベース初期化（テーブル作成・簡易マイグレーション）
+
+    起動時に1回呼ぶ。同じDBに対する2回目以降の呼び出しは何もしない
+    """
     db_url = get_db_url()
-    engine = create_engine(db_url, echo=False)
+    engine = _get_engine_entry(db_url)[0]
+    
+    with _engines_lock:
+        if db_url in _schema_ready:
+            return engine
+    
     Base.metadata.create_all(engine)
+    _add_missing_columns(engine)
+    
+    with _engines_lock:
+        _schema_ready.add(db_url)
     return engine
 
 
 def get_session():
-    """セッション取得"""
-    engine = init_db()
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
\ No newline at end of file
+    """
+    セッション取得（プロセス共有のエンジン・接続プールを使う）
+
+    スキーマ確認はそのDBで初めてセッションを作るときだけ行う
+    """
+    db_url = get_db_url()
+    if db_url not in _schema_ready:
+        init_db()
+    return _get_engine_entry(db_url)[1]()
+
+
+def dispose_engines():
+    """生成済みのエンジンと接続プールを破棄（テスト・プロセス終了時用）"""
+    with _engines_lock:
+        for engine, _ in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _schema_ready.clear()
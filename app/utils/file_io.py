@@ -0,0 +1,180 @@
+"""
+複数プロセスから安全に使うファイル操作
+- atomic_write: 一時ファイルに書いて fsync 後に rename（読み手は古い内容か新しい内容のどちらかだけを見る）
+- FileLock: ロックファイルの flock によるプロセス間の排他（uvicorn の複数ワーカーなど）
+"""
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def atomic_write(path: Union[str, Path], mode: str = 'w', encoding: Optional[str] = None):
+    """
+    ファイルを原子的に置き換える
+
+    同じディレクトリの一時ファイルに書き込み、fsync してから os.replace で差し替える。
+    例外時は一時ファイルを消し、元のファイルはそのまま残る。
+    mmap などで古いファイルを開いている読み手には影響しない
+
+    例:
+        with atomic_write("data/campaigns_cache.json", encoding="utf-8") as f:
+            json.dump(data, f)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 一時ファイル名はプロセス・スレッドごとに一意（同時に書いても互いを壊さない）
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            # mkstemp は 0600 で作るため、元のファイル（なければ通常の新規ファイル）と同じ権限にする
+            _set_mode(f.fileno(), path)
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    _fsync_directory(path.parent)
+
+
+def _current_umask() -> int:
+    # umask は設定し直さないと読めないため、起動時（import 時）に1回だけ読む
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_UMASK = _current_umask()
+
+
+def _set_mode(fd: int, path: Path):
+    """置き換え先の権限（なければ 0o666 & ~umask）を一時ファイルに設定"""
+    if not hasattr(os, 'fchmod'):  # Windows
+        return
+    try:
+        file_mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        file_mode = 0o666 & ~_UMASK
+    os.fchmod(fd, file_mode)
+
+
+def _fsync_directory(directory: Path):
+    """rename をディスクに反映（対応していないOS・ファイルシステムでは何もしない）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# fcntl がない環境ではプロセス内の排他のみ（パスごとのロック）
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path: Path) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(str(path.resolve()), threading.Lock())
+
+
+class FileLock:
+    """
+    ロックファイルによるプロセス間の排他ロック
+
+    flock はオープンしたファイルごとのロックのため、同じプロセスの別スレッドとも排他になる。
+    プロセスが異常終了した場合もOSがロックを解放する
+
+    例:
+        with FileLock("data/campaigns_cache.lock", timeout=60) as lock:
+            if lock.waited:
+                ...  # 他のプロセスの処理結果を確認
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None):
+        self.path = Path(path)
+        self.timeout = timeout  # None なら無期限に待つ
+        self.waited = False  # 他の保持者の解放を待ったか
+        self._fd: Optional[int] = None
+        self._thread_lock = None if fcntl else _thread_lock(self.path)
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        ロック取得
+
+        Args:
+            blocking: False なら取得できなければすぐ False を返す
+
+        Returns:
+            取得できたか（timeout 経過・非ブロッキングで取得できない場合は False）
+        """
+        if self._thread_lock is not None:
+            if self._thread_lock.acquire(blocking=False):
+                self.waited = False
+                return True
+            self.waited = True
+            if not blocking:
+                return False
+            return self._thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        self.waited = False
+
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                self.waited = True
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(fd)
+                    return False
+                time.sleep(self.POLL_INTERVAL)
+            except OSError:
+                os.close(fd)
+                raise
+
+    def release(self):
+        """ロック解放"""
+        if self._thread_lock is not None:
+            self._thread_lock.release()
+            return
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def __enter__(self) -> 'FileLock':
+        if not self.acquire():
+            raise TimeoutError(f"ロック取得タイムアウト: {self.path}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -0,0 +1,287 @@
+"""
+ユーザー×月の還元額集計（UserMonthlySavings）
+行動ログの書き込みと同じトランザクションで差分を加算し、
+取り逃し推定額は (line_user_id, month) の1行を読むだけで求める
+
+同じユーザー・月・キャンペーン・行動を1回だけ数えるため、加算したものを
+MonthlySavingsCounted（一意制約）に ON CONFLICT DO NOTHING で記録し、挿入できたものだけを加算する。
+複数のワーカーが同時に書き込んでも二重に数えない
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.utils.async_database import get_async_session
+from app.utils.database import Campaign, MonthlySavingsCounted, UserCampaignAction, UserMonthlySavings, get_session
+
+
+# 集計対象の行動（同じユーザー・月・キャンペーンは1回だけ数える）
+# recommended: 無料プランで表示しなかった TOP3（有料プランなら表示していたもの）
+COUNTED_ACTIONS = ('viewed', 'recommended', 'completed')
+POTENTIAL_ACTIONS = ('viewed', 'recommended')
+
+_COUNTED_KEY = ('line_user_id', 'month', 'campaign_id', 'action_type')
+
+AMOUNT_FIELDS = ('potential_amount', 'completed_amount', 'earned_amount', 'viewed_count', 'completed_count')
+
+# キャンペーンに想定利用額がない場合（personalize と同じ）
+DEFAULT_BASE_AMOUNT = 10000
+
+# 1クエリあたりのユーザー数・行数
+QUERY_CHUNK_SIZE = 500
+
+_DIALECT_INSERTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def month_key(moment: datetime) -> str:
+    """集計月（例: 2026-03）"""
+    return moment.strftime('%Y-%m')
+
+
+def _month_range(month: str) -> Tuple[datetime, datetime]:
+    start = datetime.strptime(month, '%Y-%m')
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def _catalog_returns(session, campaign_ids: Iterable[str]) -> Dict[str, int]:
+    """キャンペーンの期待還元額（想定利用額 × 還元率）"""
+    ids = list(set(campaign_ids))
+    returns = {}
+    for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+        rows = session.execute(
+            select(Campaign.campaign_id, Campaign.base_amount, Campaign.return_rate)
+            .where(Campaign.campaign_id.in_(ids[start:start + QUERY_CHUNK_SIZE]))
+        )
+        for campaign_id, base_amount, return_rate in rows:
+            if return_rate is not None:
+                returns[campaign_id] = int((base_amount or DEFAULT_BASE_AMOUNT) * return_rate / 100)
+    return returns
+
+
+def _aggregate(rows: List[Dict], catalog: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+    """行動ログ（同じ月・_count_once で重複を除いたもの）をユーザーごとの差分に集計"""
+    deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(AMOUNT_FIELDS, 0))
+    for row in rows:
+        if row['action_type'] not in COUNTED_ACTIONS or not row['campaign_id']:
+            continue
+
+        expected = row.get('expected_return')
+        if expected is None:
+            expected = catalog.get(row['campaign_id'], 0)
+
+        delta = deltas[row['line_user_id']]
+        if row['action_type'] in POTENTIAL_ACTIONS:
+            delta['potential_amount'] += expected
+            delta['viewed_count'] += 1
+        else:
+            actual = row.get('actual_return')
+            delta['completed_amount'] += expected
+            delta['earned_amount'] += expected if actual is None else actual
+            delta['completed_count'] += 1
+    return deltas
+
+
+def apply_actions(session, rows: List[Dict]):
+    """
+    書き込む前の行動ログを集計に加算（コミットは呼び出し元）
+
+    既に加算済みの (ユーザー, キャンペーン, 行動) は MonthlySavingsCounted の一意制約で除く
+    """
+    by_month = defaultdict(list)
+    for row in rows:
+        if row['action_type'] in COUNTED_ACTIONS:
+            by_month[month_key(row['created_at'])].append(row)
+
+    for month, month_rows in by_month.items():
+        counted = _count_once(session, month, month_rows)
+        catalog = _catalog_returns(session, (row['campaign_id'] for row in counted if row.get('expected_return') is None))
+        _add_deltas(session, month, _aggregate(counted, catalog))
+
+
+def _action_key(row: Dict) -> Tuple[str, str, str]:
+    return row['line_user_id'], row['campaign_id'], row['action_type']
+
+
+def _count_once(session, month: str, rows: List[Dict]) -> List[Dict]:
+    """
+    まだ加算していない行動だけを（同じ行動は1件に）返し、加算済みとして記録（コミットは呼び出し元）
+
+    他のトランザクションが同じ行動を先に記録していれば（コミット待ちを含め）挿入されず、数えない
+    """
+    keys = list(dict.fromkeys(_action_key(row) for row in rows if row['campaign_id']))
+    if not keys:
+        return []
+
+    claimed = set()
+    insert = _DIALECT_INSERTS.get(session.get_bind().dialect.name)
+    if insert:
+        for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+            statement = (
+                insert(MonthlySavingsCounted)
+                .values([
+                    {'line_user_id': user_id, 'month': month, 'campaign_id': campaign_id, 'action_type': action_type}
+                    for user_id, campaign_id, action_type in keys[start:start + QUERY_CHUNK_SIZE]
+                ])
+                .on_conflict_do_nothing(index_elements=list(_COUNTED_KEY))
+                .returning(MonthlySavingsCounted.line_user_id, MonthlySavingsCounted.campaign_id,
+                           MonthlySavingsCounted.action_type)
+            )
+            claimed.update(tuple(row) for row in session.execute(statement))
+    else:
+        # ON CONFLICT がないDB: 記録済みを読んで除く（同時に書き込んだ場合は一意制約違反でバッチごと失敗）
+        users = list({user_id for user_id, _, _ in keys})
+        existing = set()
+        for start in range(0, len(users), QUERY_CHUNK_SIZE):
+            existing.update(tuple(row) for row in session.execute(
+                select(MonthlySavingsCounted.line_user_id, MonthlySavingsCounted.campaign_id,
+                       MonthlySavingsCounted.action_type)
+                .where(
+                    MonthlySavingsCounted.month == month,
+                    MonthlySavingsCounted.line_user_id.in_(users[start:start + QUERY_CHUNK_SIZE])
+                )
+            ))
+        for user_id, campaign_id, action_type in keys:
+            if (user_id, campaign_id, action_type) not in existing:
+                session.add(MonthlySavingsCounted(
+                    line_user_id=user_id, month=month, campaign_id=campaign_id, action_type=action_type
+                ))
+                claimed.add((user_id, campaign_id, action_type))
+        session.flush()
+
+    counted = []
+    for row in rows:
+        key = _action_key(row) if row['campaign_id'] else None
+        if key in claimed:
+            claimed.discard(key)
+            counted.append(row)
+    return counted
+
+
+def _add_deltas(session, month: str, deltas: Dict[str, Dict[str, int]]):
+    """(ユーザー, 月) の行に差分を加算（なければ作成）"""
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    insert = _DIALECT_INSERTS.get(session.get_bind().dialect.name)
+
+    if insert:
+        values = [dict(delta, line_user_id=user_id, month=month, updated_at=now) for user_id, delta in deltas.items()]
+        table = UserMonthlySavings.__table__
+        for start in range(0, len(values), QUERY_CHUNK_SIZE):
+            statement = insert(UserMonthlySavings).values(values[start:start + QUERY_CHUNK_SIZE])
+            set_ = {field: table.c[field] + statement.excluded[field] for field in AMOUNT_FIELDS}
+            set_['updated_at'] = statement.excluded.updated_at
+            session.execute(statement.on_conflict_do_update(index_elements=['line_user_id', 'month'], set_=set_))
+        return
+
+    existing = {
+        row.line_user_id: row
+        for row in session.query(UserMonthlySavings).filter(
+            UserMonthlySavings.month == month,
+            UserMonthlySavings.line_user_id.in_(list(deltas))
+        )
+    }
+    for user_id, delta in deltas.items():
+        row = existing.get(user_id)
+        if row is None:
+            session.add(UserMonthlySavings(line_user_id=user_id, month=month, updated_at=now, **delta))
+        else:
+            for field, amount in delta.items():
+                setattr(row, field, (getattr(row, field) or 0) + amount)
+            row.updated_at = now
+
+
+def rebuild_monthly_savings(month: str = None) -> int:
+    """
+    行動ログから月の集計を作り直す（集計方法の変更・取りこぼしの修正用）
+
+    加算済みの記録（MonthlySavingsCounted）もその月の行動ログから作り直す
+
+    Returns:
+        集計したユーザー数
+    """
+    month = month or month_key(datetime.utcnow())
+    start, end = _month_range(month)
+
+    session = get_session()
+    try:
+        session.execute(delete(UserMonthlySavings).where(UserMonthlySavings.month == month))
+        session.execute(delete(MonthlySavingsCounted).where(MonthlySavingsCounted.month == month))
+        actions = session.execute(
+            select(UserCampaignAction)
+            .where(
+                UserCampaignAction.created_at >= start,
+                UserCampaignAction.created_at < end,
+                UserCampaignAction.action_type.in_(COUNTED_ACTIONS)
+            )
+            .order_by(UserCampaignAction.created_at)
+        ).scalars()
+        rows = [
+            {
+                'line_user_id': action.line_user_id,
+                'campaign_id': action.campaign_id,
+                'action_type': action.action_type,
+                'expected_return': action.expected_return,
+                'actual_return': action.actual_return,
+            }
+            for action in actions
+        ]
+
+        counted = _count_once(session, month, rows)
+        catalog = _catalog_returns(session, (row['campaign_id'] for row in counted if row['expected_return'] is None))
+        deltas = _aggregate(counted, catalog)
+        _add_deltas(session, month, deltas)
+        session.commit()
+        return len(deltas)
+
+    except Exception:
+        session.rollback()
+        raise
+
+    finally:
+        session.close()
+
+
+def _savings_to_dict(row: Optional[UserMonthlySavings]) -> Optional[Dict]:
+    if row is None:
+        return None
+    data = {field: getattr(row, field) or 0 for field in AMOUNT_FIELDS}
+    data['month'] = row.month
+    return data
+
+
+def _savings_query(line_user_id: str, month: str = None):
+    month = month or month_key(datetime.utcnow())
+    return select(UserMonthlySavings).where(
+        UserMonthlySavings.line_user_id == line_user_id,
+        UserMonthlySavings.month == month
+    )
+
+
+def get_monthly_savings(line_user_id: str, month: str = None) -> Optional[Dict]:
+    """
+    ユーザーの月の集計（省略時は今月）
+
+    Returns:
+        potential_amount / completed_amount / earned_amount / viewed_count / completed_count / month
+        （行動がなければ None）
+    """
+    session = get_session()
+    try:
+        return _savings_to_dict(session.execute(_savings_query(line_user_id, month)).scalar_one_or_none())
+    finally:
+        session.close()
+
+
+async def get_monthly_savings_async(line_user_id: str, month: str = None) -> Optional[Dict]:
+    """get_monthly_savings の非同期版（Webhook 用）"""
+    async with get_async_session() as session:
+        result = await session.execute(_savings_query(line_user_id, month))
+        return _savings_to_dict(result.scalar_one_or_none())
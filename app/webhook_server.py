@@ -1,13 +1,14 @@
 """
 LINE Webhook サーバー
 """
+import asyncio
 import os
 from fastapi import FastAPI, Request, HTTPException
-from linebot.v3 import WebhookHandler
+from linebot.v3 import WebhookParser
 from linebot.v3.messaging import (
     Configuration,
-    ApiClient,
-    MessagingApi,
+    AsyncApiClient,
+    AsyncMessagingApi,
     ReplyMessageRequest,
     TextMessage
 )
@@ -16,16 +17,19 @@ from linebot.v3.exceptions import InvalidSignatureError
 from dotenv import load_dotenv
 
 from app.profiles.user_profile import UserProfile
-from app.evaluators.personalize import rank_campaigns_for_user, get_missed_amount_estimate
+from app.evaluators.personalize import rank_top_k, estimate_missed_amount
 from app.notifiers.formatters import (
     format_paid_top3_text,
     format_free_top3_locked_text,
     format_help_text,
     format_plan_info_text
 )
-from app.collectors.campaign_collector import get_campaigns
+from app.collectors.campaign_collector import get_campaigns_async
 from app.collectors.dummy_collector import get_dummy_campaigns
 from app.utils.database import init_db
+from app.utils.async_database import dispose_async_engines
+from app.utils.action_logger import get_action_logger
+from app.utils.monthly_savings import get_monthly_savings_async
 
 # 環境変数読み込み
 load_dotenv()
@@ -38,22 +42,39 @@ if not LINE_CHANNEL_ACCESS_TOKEN or not LINE_CHANNEL_SECRET:
     raise ValueError("LINE_CHANNEL_ACCESS_TOKEN and LINE_CHANNEL_SECRET must be set")
 
 configuration = Configuration(access_token=LINE_CHANNEL_ACCESS_TOKEN)
-handler = WebhookHandler(LINE_CHANNEL_SECRET)
+parser = WebhookParser(LINE_CHANNEL_SECRET)
+
+# LINE API クライアント（起動時に生成し、プロセスで共有）
+async_api_client: AsyncApiClient = None  # type: ignore
+line_bot_api: AsyncMessagingApi = None  # type: ignore
 
 # FastAPI初期化
 app = FastAPI(title="ポイ活LINE Bot")
 
-# DB初期化
+# DB初期化（テーブル作成・マイグレーションは起動時のみ）
 init_db()
 
 
 @app.on_event("startup")
 async def startup_event():
     """起動時処理"""
+    global async_api_client, line_bot_api
+    async_api_client = AsyncApiClient(configuration)
+    line_bot_api = AsyncMessagingApi(async_api_client)
     print("🚀 ポイ活LINE Bot 起動")
     print(f"   PORT: {os.getenv('PORT', 8000)}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """終了時処理"""
+    if async_api_client is not None:
+        await async_api_client.close()
+    # 行動ログの残りを書き込む
+    await asyncio.to_thread(get_action_logger().close)
+    await dispose_async_engines()
+
+
 @app.get("/")
 async def root():
     """ヘルスチェック"""
@@ -68,15 +89,18 @@ async def webhook(request: Request):
     body_str = body.decode('utf-8')
     
     try:
-        handler.handle(body_str, signature)
+        events = parser.parse(body_str, signature)
     except InvalidSignatureError:
         raise HTTPException(status_code=400, detail="Invalid signature")
     
+    # DB・LINE API はすべて非同期で待つ（他のリクエストをブロックしない）
+    # 1つの Webhook に複数のイベントが届いた場合は並行して処理する
+    await asyncio.gather(*(handle_message(event) for event in events if isinstance(event, MessageEvent)))
+    
     return "OK"
 
 
-@handler.add(MessageEvent, message=TextMessageContent)
-def handle_message(event: MessageEvent):  # type: ignore
+async def handle_message(event: MessageEvent):  # type: ignore
     """メッセージイベント処理"""
     # 型安全な属性アクセス
     if not hasattr(event.source, 'user_id') or not event.source.user_id:  # type: ignore
@@ -90,8 +114,9 @@ def handle_message(event: MessageEvent):  # type: ignore
     
     msg_text = event.message.text.strip().lower()
     
-    # プラン判定
-    plan = _load_plan(user_id)
+    # プラン判定（プロフィールは1回だけ読み込み、TOP3でも使う）
+    profile = await UserProfile.get_user_async(user_id)
+    plan = _load_plan(profile)
     
     # コマンド処理
     if msg_text in ['ping', 'p']:
@@ -104,23 +129,21 @@ def handle_message(event: MessageEvent):  # type: ignore
         reply_text = format_plan_info_text(plan)
     
     elif msg_text in ['top3', 't']:
-        reply_text = _handle_top3_command(user_id, plan)
+        reply_text = await _handle_top3_command(user_id, profile, plan)
     
     else:
         reply_text = f"コマンドが認識できませんでした。\n「help」で使い方を確認できます。"
     
     # LINE返信
-    with ApiClient(configuration) as api_client:
-        line_bot_api = MessagingApi(api_client)
-        line_bot_api.reply_message(  # type: ignore
-            ReplyMessageRequest(  # type: ignore
-                reply_token=event.reply_token,  # type: ignore
-                messages=[TextMessage(text=reply_text)]  # type: ignore
-            )
+    await line_bot_api.reply_message(  # type: ignore
+        ReplyMessageRequest(  # type: ignore
+            reply_token=event.reply_token,  # type: ignore
+            messages=[TextMessage(text=reply_text)]  # type: ignore
         )
+    )
 
 
-def _load_plan(user_id: str) -> str:
+def _load_plan(profile: UserProfile) -> str:
     """
     ユーザープラン読み込み
     
@@ -132,35 +155,51 @@ def _load_plan(user_id: str) -> str:
     if force_plan in ['free', 'paid']:
         return force_plan
     
-    profile = UserProfile.get_user(user_id)
     return str(profile.plan)
 
 
-def _handle_top3_command(user_id: str, plan: str) -> str:
+async def _handle_top3_command(user_id: str, profile: UserProfile, plan: str) -> str:
     """
     TOP3コマンド処理
     
     有料: TOP3詳細表示
     無料: 拒否文＋取り逃し推定額
     """
-    profile = UserProfile.get_user(user_id)
-    
     if plan == 'paid':
         # 有料: TOP3詳細
-        # 実キャンペーン取得（キャッシュ優先）
-        campaigns = get_campaigns(force_refresh=False)
+        # 実キャンペーン取得（スナップショットを即返し、再収集はバックグラウンド）
+        campaigns = await get_campaigns_async()
         
         # キャンペーンがない場合はダミー使用
         if not campaigns:
             print("⚠️ 実キャンペーンが取得できないため、ダミーを使用")
             campaigns = get_dummy_campaigns()
         
-        ranked = rank_campaigns_for_user(campaigns, profile)
+        # 上位3件だけ並べ替え・理由文を生成
+        ranked = rank_top_k(campaigns, profile, 3)
+        
+        # 表示したTOP3を行動ログに記録（キューに積むだけ）
+        logger = get_action_logger()
+        for campaign in ranked:
+            logger.log(user_id, campaign.get('campaign_id'), 'viewed', expected_return=campaign.get('expected_return'))
+        
         return format_paid_top3_text(ranked)
     
     else:
         # 無料: 拒否文
-        missed_amount = get_missed_amount_estimate(profile)
+        # 取り逃し推定額は今月の集計を1行読むだけ
+        savings = await get_monthly_savings_async(user_id)
+        recommended = []
+        if not (savings and savings['viewed_count']):
+            # 集計がまだないときだけ、有料プランなら表示していたTOP3を並べて recommended として記録
+            # （今月の集計に加算され、次回からは集計を読む）
+            campaigns = await get_campaigns_async()
+            recommended = rank_top_k(campaigns, profile, 3) if campaigns else []
+            logger = get_action_logger()
+            for campaign in recommended:
+                logger.log(user_id, campaign.get('campaign_id'), 'recommended', expected_return=campaign.get('expected_return'))
+        
+        missed_amount = estimate_missed_amount(profile, savings, recommended)
         return format_free_top3_locked_text(missed_amount)
 
 
@@ -0,0 +1,54 @@
+"""
+バッチランキングのベンチマーク
+週次通知の上位5件を、ユーザーごとの計算（rank_campaigns_for_user / rank_top_k）と
+ユーザー × キャンペーンの行列計算（1プロセス・CPUコア数）で比較
+
+実行: python benchmarks/bench_batch_ranking.py
+"""
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.snapshot_cache import freeze_campaigns
+from app.evaluators.batch_ranking import rank_users_top_k
+from app.evaluators.personalize import rank_campaigns_for_user, rank_top_k
+from tests.test_batch_ranking import make_profiles
+from tests.test_scoring import make_campaigns
+
+
+CAMPAIGNS = 10_000
+USERS = 1_000
+K = 5
+SAMPLE = 100  # 全件ランキングは遅いため、この人数で測って1人あたりに換算
+
+
+def per_user(func, users):
+    started = time.perf_counter()
+    func(users)
+    return (time.perf_counter() - started) / len(users)
+
+
+def main():
+    snapshot = freeze_campaigns(make_campaigns(CAMPAIGNS))
+    profiles = make_profiles(USERS)
+    now = datetime.now()
+    workers = os.cpu_count() or 1
+
+    print("=" * 60)
+    print(f"バッチランキング ベンチマーク（{CAMPAIGNS:,}件 × {USERS:,}人、上位{K}件）")
+    print("=" * 60)
+
+    results = [
+        ("ユーザーごと（全件ランキング）", per_user(lambda users: [rank_campaigns_for_user(snapshot, p)[:K] for p in users], profiles[:SAMPLE])),
+        ("ユーザーごと（rank_top_k）", per_user(lambda users: [rank_top_k(snapshot, p, K) for p in users], profiles)),
+        ("行列計算（1プロセス）", per_user(lambda users: list(rank_users_top_k(snapshot, users, K, workers=1, now=now)), profiles)),
+        (f"行列計算（{workers}プロセス）", per_user(lambda users: list(rank_users_top_k(snapshot, users, K, workers=workers, now=now)), profiles)),
+    ]
+    for label, elapsed in results:
+        print(f"{label:<24} {elapsed * 1000:>6.2f}ms/人  {USERS:,}人換算 {elapsed * USERS:>6.2f}s")
+
+if __name__ == "__main__":
+    main()
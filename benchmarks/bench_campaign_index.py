@@ -0,0 +1,89 @@
+"""
+転置インデックス（候補の絞り込み）のベンチマーク
+カード・店舗の種類が多いカタログで、上位3件の計算（全件 / 候補だけ）と
+インデックスの作成（最初から / 前回からの差分）を比較
+
+実行: python benchmarks/bench_campaign_index.py
+"""
+import sys
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.snapshot_cache import freeze_campaigns
+from app.evaluators.campaign_index import CampaignIndex
+from app.evaluators.features import card_names
+from app.evaluators.scoring import CampaignMatrix, score_campaigns, top_k_order
+from tests.test_scoring import _Profile
+
+
+SIZES = (10_000, 100_000)
+CARDS = [f'カード{i}' for i in range(40)]
+STORES = [f'店舗{i}' for i in range(100)]
+CARD_FREE_RATE = 0.15  # カード不要のキャンペーンの割合
+CHANGED_RATE = 0.01  # 差分更新で入れ替えるキャンペーンの割合
+REPEAT = 20
+
+
+def make_catalog(size, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now() + timedelta(hours=12)
+    return [
+        {
+            'campaign_id': f'c{i}',
+            'end_date': now + timedelta(days=rng.randint(0, 30)),
+            'return_rate': rng.choice((0.5, 1, 2, 5, 10)),
+            'required_cards': [] if rng.random() < CARD_FREE_RATE else rng.sample(CARDS, rng.choice((1, 2))),
+            'target_stores': rng.sample(STORES, rng.choice((0, 1, 2))),
+            'source': rng.choice(('楽天市場', 'PayPay', 'dカード', 'Vポイント')),
+        }
+        for i in range(size)
+    ]
+
+
+def best(func, repeat=REPEAT):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    profile = _Profile(CARDS[:3], STORES[:5])
+
+    print("=" * 60)
+    print("転置インデックス ベンチマーク（上位3件）")
+    print("=" * 60)
+    print(f"{'件数':>8} {'候補':>7} {'全件計算':>8} {'候補だけ':>8} {'作成':>8} {'差分更新':>8}")
+
+    for size in SIZES:
+        catalog = make_catalog(size)
+        snapshot = freeze_campaigns(catalog)
+        matrix = CampaignMatrix(snapshot)
+        index = CampaignIndex(snapshot)
+        now = datetime.now()
+        index.top_k(matrix, profile, 3, now)
+
+        # 1% を別のキャンペーンに入れ替えた次のスナップショット
+        changed = int(size * CHANGED_RATE)
+        next_snapshot = freeze_campaigns(catalog[changed:] + [
+            dict(campaign, campaign_id=f'n{i}') for i, campaign in enumerate(make_catalog(changed, seed=1))
+        ])
+
+        candidates = len(index.candidates(card_names(profile), profile.favorite_stores))
+        full = best(lambda: top_k_order(score_campaigns(matrix, profile, now), 3))
+        pruned = best(lambda: index.top_k(matrix, profile, 3, now))
+        build = best(lambda: CampaignIndex(next_snapshot), repeat=3)
+        update = best(lambda: CampaignIndex(next_snapshot, previous=index), repeat=3)
+
+        print(f"{size:>8,} {candidates / size:>7.0%} {full * 1000:>7.2f}ms {pruned * 1000:>7.2f}ms "
+              f"{build * 1000:>6.0f}ms {update * 1000:>7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+近似重複検出のスケーリング計測
+MinHash/LSH（app/collectors/dedup.py）と全ペア比較の所要時間を件数ごとに比較
+
+実行: python benchmarks/bench_dedup.py
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.dedup import find_duplicate_clusters, shingles, jaccard, THRESHOLD
+
+
+STORES = ['楽天市場', 'Yahoo!ショッピング', 'PayPayモール', 'ローソン', 'セブンイレブン', 'Amazon', 'ドコモ', 'au PAY']
+KINDS = ['ポイント{n}倍', '最大{n}%還元', '{n},000ポイントプレゼント', '{n}%OFFクーポン']
+
+
+def make_campaigns(size: int, duplicate_ratio: float = 0.1, seed: int = 0):
+    """表記揺れの重複を duplicate_ratio の割合で含む合成キャンペーン"""
+    rng = random.Random(seed)
+    campaigns = []
+    for i in range(size):
+        if campaigns and rng.random() < duplicate_ratio:
+            base = rng.choice(campaigns)
+            campaigns.append({
+                'title': f"【{base['title']}】 {rng.randint(1, 12)}/{rng.randint(1, 28)}(金)〜",
+                'url': base['url'].replace('https://', 'https://event.')
+            })
+            continue
+        kind = rng.choice(KINDS).format(n=rng.randint(2, 20))
+        campaigns.append({
+            'title': f"{rng.choice(STORES)} {kind} 第{i}弾キャンペーン",
+            'url': f"https://example.jp/campaign/c{i}/"
+        })
+    return campaigns
+
+
+def brute_force(campaigns):
+    sets = [shingles(camp) for camp in campaigns]
+    pairs = 0
+    for i in range(len(sets)):
+        for j in range(i + 1, len(sets)):
+            if jaccard(sets[i], sets[j]) >= THRESHOLD:
+                pairs += 1
+    return pairs
+
+
+def main():
+    print(f"{'件数':>8} {'MinHash/LSH':>12} {'全ペア比較':>12} {'クラスタ':>8}")
+    for size in (1000, 2000, 10000, 50000):
+        campaigns = make_campaigns(size)
+
+        started = time.perf_counter()
+        clusters = find_duplicate_clusters(campaigns)
+        lsh = time.perf_counter() - started
+
+        brute = "-"
+        if size <= 2000:
+            started = time.perf_counter()
+            brute_force(campaigns)
+            brute = f"{time.perf_counter() - started:.2f}s"
+
+        print(f"{size:>8} {lsh:>11.2f}s {brute:>12} {len(clusters):>8}")
+
+
+if __name__ == "__main__":
+    main()
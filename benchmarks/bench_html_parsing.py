@@ -0,0 +1,72 @@
+"""
+HTMLパース方式のベンチマーク
+保存済みフィクスチャページで、従来方式（html.parser・全体構築）と
+高速方式（lxml＋SoupStrainer）のパース時間・ピークメモリを比較
+
+実行: python benchmarks/bench_html_parsing.py
+"""
+import sys
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.rakuten_collector import RakutenCollector
+from app.collectors.vpoint_collector import VPointCollector
+from app.collectors.dpoint_collector import DPointCollector
+
+
+FIXTURE_DIR = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "pages"
+COLLECTORS = {
+    'rakuten': RakutenCollector,
+    'vpoint': VPointCollector,
+    'dpoint': DPointCollector,
+}
+REPEAT = 20
+
+
+def _measure(collector, content: bytes, mode: str):
+    """パース時間（最良値）とピークメモリを計測"""
+    os.environ["HTML_PARSE_MODE"] = mode
+    url = collector.urls[0]
+
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        campaigns = collector._parse_page(content, url)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    collector._parse_page(content, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak, campaigns
+
+
+def main():
+    previous_mode = os.environ.get("HTML_PARSE_MODE")
+    print(f"{'page':<10}{'size':>10}{'legacy ms':>12}{'fast ms':>10}{'speedup':>9}"
+          f"{'legacy KiB':>12}{'fast KiB':>10}  same")
+    try:
+        for name, collector_class in COLLECTORS.items():
+            content = (FIXTURE_DIR / f"{name}.html").read_bytes()
+            collector = collector_class()
+
+            legacy_time, legacy_peak, legacy = _measure(collector, content, "legacy")
+            fast_time, fast_peak, fast = _measure(collector, content, "fast")
+            same = [c['title'] for c in legacy] == [c['title'] for c in fast]
+
+            print(f"{name:<10}{len(content):>10,}{legacy_time * 1000:>12.1f}{fast_time * 1000:>10.1f}"
+                  f"{legacy_time / fast_time:>8.1f}x{legacy_peak / 1024:>12,.0f}{fast_peak / 1024:>10,.0f}  {same}")
+    finally:
+        if previous_mode is None:
+            os.environ.pop("HTML_PARSE_MODE", None)
+        else:
+            os.environ["HTML_PARSE_MODE"] = previous_mode
+
+
+if __name__ == "__main__":
+    main()
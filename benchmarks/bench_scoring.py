@@ -0,0 +1,54 @@
+"""
+キャンペーンスコアリングのベンチマーク
+従来の1件ずつの計算と、列指向の一括計算（列データの準備・スコア計算・ランキング全体・上位3件）を件数ごとに比較
+
+実行: python benchmarks/bench_scoring.py
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.snapshot_cache import freeze_campaigns
+from app.evaluators.personalize import rank_campaigns_for_user, rank_top_k
+from app.evaluators.scoring import CampaignMatrix, get_campaign_matrix, score_campaigns
+from tests.test_scoring import _Profile, _rank_reference, make_campaigns
+
+
+SIZES = (10_000, 100_000)
+REPEAT = 3
+
+
+def best(func):
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    profile = _Profile(['楽天カード', 'dカード'], ['楽天市場', 'ローソン'])
+
+    print("=" * 60)
+    print("スコアリング ベンチマーク")
+    print("=" * 60)
+    print(f"{'件数':>8} {'従来':>9} {'列データ準備':>10} {'スコア計算':>9} {'ランキング全体':>11} {'上位3件':>7}")
+
+    for size in SIZES:
+        snapshot = freeze_campaigns(make_campaigns(size))
+        get_campaign_matrix(snapshot)
+
+        reference = best(lambda: _rank_reference(snapshot, profile))
+        prepare = best(lambda: CampaignMatrix(snapshot))
+        scoring = best(lambda: score_campaigns(get_campaign_matrix(snapshot), profile))
+        ranking = best(lambda: rank_campaigns_for_user(snapshot, profile))
+        top3 = best(lambda: rank_top_k(snapshot, profile, 3))
+
+        print(f"{size:>8,} {reference * 1000:>8.0f}ms {prepare * 1000:>10.0f}ms {scoring * 1000:>9.1f}ms {ranking * 1000:>11.0f}ms {top3 * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+スナップショット形式のベンチマーク
+CampaignCollector のファイル保存・読み込み（JSON / バイナリ）の所要時間とファイルサイズを件数ごとに比較
+
+実行: python benchmarks/bench_snapshot_format.py
+"""
+import sys
+import os
+import io
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.campaign_collector import CampaignCollector
+
+
+SOURCES = {
+    '楽天市場': (['楽天カード'], ['楽天市場']),
+    'Vポイント': (['三井住友カード', '三井住友カード ゴールド'], ['セブンイレブン', 'ローソン', 'マクドナルド']),
+    'dポイント': (['dカード', 'dカード GOLD'], ['ドコモ', 'd払い加盟店', 'ローソン', 'マツモトキヨシ']),
+    'PayPayモール': (['PayPayカード'], ['PayPayモール']),
+}
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 3
+
+
+def make_campaigns(size: int, seed: int = 0):
+    """コレクターの出力と同じ形の合成キャンペーン"""
+    rng = random.Random(seed)
+    base = datetime(2026, 3, 1)
+    campaigns = []
+    for i in range(size):
+        source = rng.choice(list(SOURCES))
+        cards, stores = SOURCES[source]
+        start = base + timedelta(days=rng.randint(0, 30))
+        campaigns.append({
+            'campaign_id': f"bench_{i:016x}",
+            'title': f"{source} ポイント{rng.randint(2, 20)}倍キャンペーン 第{i}弾",
+            'description': f"期間中にエントリーのうえ対象店舗で{rng.randint(1, 10) * 1000:,}円以上のお買い物で還元",
+            'url': f"https://example.jp/campaign/{i}/",
+            'source': source,
+            'start_date': start,
+            'end_date': start + timedelta(days=rng.choice((7, 14, 30)), hours=23, minutes=59, seconds=59),
+            'base_amount': 10000,
+            'return_rate': rng.choice((1, 2, 5, 10, 0.5)),
+            'conditions': {'entry_required': rng.random() < 0.7},
+            'required_cards': cards[:rng.randint(1, len(cards))],
+            'target_stores': stores,
+            'is_dangerous': rng.random() < 0.05,
+            'action_steps': ['1. キャンペーンページでエントリー', '2. 対象の決済方法で支払い'],
+        })
+    return campaigns
+
+
+def measure(collector, campaigns, refreshed_at):
+    """保存・読み込みの最速時間（秒）とファイルサイズ"""
+    save = load = float('inf')
+    loaded = None
+    for _ in range(REPEAT):
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            collector._write_cache_file(campaigns, refreshed_at)
+            save = min(save, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            loaded = collector._load_file_snapshot()
+            load = min(load, time.perf_counter() - started)
+
+    assert len(loaded['campaigns']) == len(campaigns)
+    return save, load, os.path.getsize(collector.cache_file)
+
+
+def main():
+    refreshed_at = {'rakuten': datetime.now()}
+
+    print(f"{'件数':>8} {'形式':>7} {'保存':>9} {'読み込み':>9} {'サイズ':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            campaigns = make_campaigns(size)
+            for snapshot_format, ext in (('json', 'json'), ('binary', 'bin')):
+                collector = CampaignCollector(
+                    cache_file=os.path.join(tmp, f"campaigns_{size}.{ext}"),
+                    store='file',
+                    snapshot_format=snapshot_format
+                )
+                save, load, file_size = measure(collector, campaigns, refreshed_at)
+                print(f"{size:>8} {snapshot_format:>7} {save * 1000:>7.0f}ms {load * 1000:>7.0f}ms {file_size / 1024:>10,.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+ユーザープロフィールの読み込み・保存のベンチマーク
+一時SQLiteに対して UserProfile の読み込み（既存ユーザー）と save() を繰り返し、1回あたりの所要時間を計測
+
+実行: python benchmarks/bench_user_profile.py
+"""
+import sys
+import os
+import io
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USERS = 50
+ITERATIONS = 500
+
+
+def bench(label, func):
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        func(i)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {elapsed / ITERATIONS * 1000:8.2f}ms/回  （{ITERATIONS}回 {elapsed:.2f}秒）")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.sqlite3')}"
+        from app.profiles.user_profile import UserProfile
+
+        with redirect_stdout(io.StringIO()):
+            profiles = [UserProfile(f"bench_user_{i}") for i in range(USERS)]
+
+        print("=" * 60)
+        print(f"UserProfile ベンチマーク（ユーザー{USERS}人）")
+        print("=" * 60)
+
+        bench("読み込み", lambda i: UserProfile(f"bench_user_{i % USERS}"))
+        bench("保存", lambda i: profiles[i % USERS].save())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+行動ログのバッチ書き込みテスト
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.utils.action_logger import ActionLogger, get_recent_actions
+from app.utils.database import UserCampaignAction, dispose_engines, get_session
+
+
+def test_batched_writes():
+    """件数・時間・flush・close で書き込まれ、履歴が新しい順に読めること"""
+    print("=" * 60)
+    print("行動ログ バッチ書き込みテスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            logger = ActionLogger(batch_size=3, flush_interval=0.2)
+            base = datetime(2026, 3, 1, 12, 0)
+            for i in range(7):
+                assert logger.log('log_user', f'camp_{i}', 'viewed', expected_return=i * 100,
+                                  created_at=base + timedelta(minutes=i))
+            assert not logger.log('log_user', 'camp_x', 'unknown')
+
+            assert logger.flush()
+            print(f"統計: {logger.stats}")
+            assert logger.stats['written'] == 7
+            assert logger.stats['batches'] == 3  # 3件・3件・flush で1件
+
+            # 件数に達しなくても flush_interval 経過で書き込まれる
+            logger.log('log_user', 'camp_late', 'clicked', created_at=base + timedelta(hours=1))
+            time.sleep(0.5)
+            assert logger.stats['written'] == 8
+
+            logger.log('other_user', 'camp_0', 'completed', actual_return=500)
+            logger.close()
+            assert logger.stats['written'] == 9
+
+            history = get_recent_actions('log_user', limit=3)
+            assert [a['campaign_id'] for a in history] == ['camp_late', 'camp_6', 'camp_5']
+            assert [a['campaign_id'] for a in get_recent_actions('log_user', action_types=['clicked'])] == ['camp_late']
+
+            session = get_session()
+            try:
+                assert session.query(UserCampaignAction).count() == 9
+                plan = session.execute(text(
+                    "EXPLAIN QUERY PLAN SELECT * FROM user_campaign_actions "
+                    "WHERE line_user_id = 'log_user' ORDER BY created_at DESC LIMIT 50"
+                )).fetchall()
+            finally:
+                session.close()
+            print(f"クエリプラン: {plan}")
+            assert 'ix_user_campaign_actions_user_created' in str(plan)
+        finally:
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ バッチ書き込みOK")
+    print()
+
+
+class _BlockedLogger(ActionLogger):
+    """書き込みが止まっているロガー（DBを使わない）"""
+
+    def __init__(self):
+        super().__init__(batch_size=1, max_queue_size=1)
+        self.release = threading.Event()
+
+    def _write(self, rows):
+        self.release.wait(5)
+        self._count('written', len(rows))
+
+
+def test_flush_and_close_do_not_block_on_full_queue():
+    """キューが満杯のままでも flush・close が timeout で False を返すこと"""
+    logger = _BlockedLogger()
+    assert logger.log('log_user', 'camp_0', 'viewed')  # 書き込み中で止まる
+    time.sleep(0.1)
+    assert logger.log('log_user', 'camp_1', 'viewed')  # キューが満杯に
+
+    started = time.monotonic()
+    assert logger.flush(timeout=0.2) is False
+    assert logger.close(timeout=0.2) is False
+    assert time.monotonic() - started < 1.0
+
+    logger.release.set()
+    assert logger.close(timeout=5) is True
+    assert logger.stats['written'] == 2
+
+
+if __name__ == "__main__":
+    test_batched_writes()
+    test_flush_and_close_do_not_block_on_full_queue()
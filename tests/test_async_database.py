@@ -0,0 +1,76 @@
+"""
+非同期DBアクセスのテスト
+"""
+import sys
+import os
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.campaign_collector import CampaignCollector
+from app.profiles.profile_cache import get_profile_cache
+from app.profiles.user_profile import UserProfile
+from app.utils.async_database import dispose_async_engines, to_async_url
+from app.utils.database import dispose_engines, init_db
+
+
+def test_to_async_url():
+    """同期ドライバのURLを非同期ドライバに読み替えること"""
+    assert to_async_url("sqlite:////app/data/db.sqlite3") == "sqlite+aiosqlite:////app/data/db.sqlite3"
+    assert to_async_url("postgresql://u:p@host:5432/db") == "postgresql+asyncpg://u:p@host:5432/db"
+    assert to_async_url("postgres://u:p@host/db") == "postgresql+asyncpg://u:p@host/db"
+    assert to_async_url("postgresql+psycopg://u:p@host/db") == "postgresql+psycopg://u:p@host/db"
+
+
+def test_async_reads():
+    """ユーザー・キャンペーンを非同期セッションで読み込めること"""
+    print("=" * 60)
+    print("非同期DB読み込みテスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        get_profile_cache().clear()
+        try:
+            init_db()
+            collector = CampaignCollector(cache_file=os.path.join(tmp, 'campaigns_cache.json'), store='db')
+            now = datetime.now()
+            collector.store.save_snapshot([
+                {'campaign_id': 'later', 'title': '後', 'source': '楽天市場', 'end_date': now + timedelta(days=5)},
+                {'campaign_id': 'sooner', 'title': '先', 'source': '楽天市場', 'end_date': now + timedelta(days=1)},
+                {'campaign_id': 'danger', 'title': '地雷', 'source': '楽天市場', 'is_dangerous': True},
+            ], {key: now for key in collector.collectors})
+
+            async def run():
+                try:
+                    created = await UserProfile.get_user_async('async_user')
+                    cached = await UserProfile.get_user_async('async_user')
+                    campaigns = await collector.serve_stale_async()
+                    return created, cached, campaigns
+                finally:
+                    await dispose_async_engines()
+
+            created, cached, campaigns = asyncio.run(run())
+            print(f"キャンペーン: {[c['campaign_id'] for c in campaigns]}")
+
+            assert created.plan == 'free' and cached.plan == 'free'
+            assert UserProfile.get_many(['async_user'])['async_user'].plan == 'free'
+            assert [c['campaign_id'] for c in campaigns] == ['sooner', 'later']
+            assert campaigns == collector.serve_stale()
+        finally:
+            get_profile_cache().clear()
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ 非同期読み込みOK")
+    print()
+
+
+if __name__ == "__main__":
+    test_to_async_url()
+    test_async_reads()
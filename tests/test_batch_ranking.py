@@ -0,0 +1,77 @@
+"""
+バッチランキングのテスト（ユーザーごとの rank_top_k と一致すること）
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.snapshot_cache import freeze_campaigns
+from app.evaluators.batch_ranking import iter_weekly_notifications, rank_users_top_k
+from app.evaluators.personalize import rank_top_k
+from app.notifiers.formatters import format_weekly_notification
+from app.profiles.user_profile import UserProfile
+from app.utils.database import dispose_engines
+from tests.test_scoring import CARDS, STORES, _Profile, make_campaigns
+
+
+def make_profiles(size):
+    """カード・お気に入り店舗の組み合わせを変えたユーザー"""
+    return [
+        _Profile(CARDS[i % 3:i % 3 + i % 4], STORES[i % 5:i % 5 + i % 3])
+        for i in range(size)
+    ]
+
+
+def test_matches_rank_top_k():
+    """ブロック分割・プロセス並列でもユーザーごとの rank_top_k と一致すること"""
+    print("=" * 60)
+    print("バッチランキング一致テスト")
+    print("=" * 60)
+
+    campaigns = freeze_campaigns(make_campaigns(1000, seed=2))
+    profiles = make_profiles(23)
+    now = datetime.now()
+    expected = [rank_top_k(campaigns, profile, 5) for profile in profiles]
+
+    for workers in (1, 2):
+        results = list(rank_users_top_k(campaigns, iter(profiles), k=5, workers=workers, block_size=4, now=now))
+        assert [profile for profile, _ in results] == profiles
+        assert [ranked for _, ranked in results] == expected
+        print(f"✅ workers={workers}: {len(profiles)}人一致")
+
+    assert list(rank_users_top_k(campaigns, [], workers=2)) == []
+    print()
+
+
+def test_weekly_notifications():
+    """有料ユーザー全員の週次通知を生成すること"""
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            for i in range(3):
+                profile = UserProfile(f"weekly_user_{i}")
+                profile.favorite_stores = ['楽天市場']
+                if i != 1:
+                    profile.upgrade_to_paid()
+
+            campaigns = make_campaigns(50)
+            messages = dict(iter_weekly_notifications(campaigns, workers=1))
+            assert list(messages) == ['weekly_user_0', 'weekly_user_2']
+            profile = UserProfile.get_user('weekly_user_0')
+            assert messages['weekly_user_0'] == format_weekly_notification(rank_top_k(campaigns, profile, 5), 'paid')
+            print(messages['weekly_user_0'])
+        finally:
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+
+
+if __name__ == "__main__":
+    test_matches_rank_top_k()
+    test_weekly_notifications()
@@ -0,0 +1,122 @@
+"""
+転置インデックス（候補の絞り込み）のテスト
+"""
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.campaign_collector import drop_expired
+from app.collectors.snapshot_cache import SnapshotSlice, freeze_campaigns
+from app.evaluators.campaign_index import CARD, SOURCE, STORE, CampaignIndex, get_campaign_index
+from app.evaluators.personalize import rank_campaigns_for_user, rank_top_k
+from app.evaluators.scoring import CampaignMatrix, get_campaign_matrix, score_campaigns, top_k_order
+from tests.test_batch_ranking import make_profiles
+from tests.test_scoring import _Profile, make_campaigns
+
+
+def _with_sources(campaigns, seed=0):
+    rng = random.Random(seed)
+    return [dict(campaign, source=rng.choice(('楽天市場', 'PayPay', 'dカード'))) for campaign in campaigns]
+
+
+def test_top_k_matches_full_scoring():
+    """候補だけの計算でも全件計算の上位 k 件と一致すること（残日数の加点が変わる時刻をまたいでも）"""
+    print("=" * 60)
+    print("候補絞り込みテスト")
+    print("=" * 60)
+
+    snapshot = freeze_campaigns(make_campaigns(1000, seed=3))
+    matrix = CampaignMatrix(snapshot)
+    index = CampaignIndex(snapshot)
+    profiles = make_profiles(12) + [_Profile([], []), _Profile(['未登録カード'], ['未登録店舗'])]
+
+    start = datetime.now()
+    for hours in (0, 1, 30, 24 * 5, -24 * 2, 24 * 40):
+        now = start + timedelta(hours=hours)
+        for profile in profiles:
+            scores = score_campaigns(matrix, profile, now)
+            for k in (1, 3, 10, 1000):
+                positions, selected = index.top_k(matrix, profile, k, now)
+                expected = top_k_order(scores, k)
+                assert positions.tolist() == expected.tolist()
+                assert selected.score.tolist() == scores.score[expected].tolist()
+                assert selected.expected_return.tolist() == scores.expected_return[expected].tolist()
+                assert selected.days_remaining.tolist() == scores.days_remaining[expected].tolist()
+                assert selected.has_required_card.tolist() == scores.has_required_card[expected].tolist()
+
+    candidates = index.candidates(['楽天カード'], ['楽天市場'])
+    print(f"✅ {len(profiles)}人 × 6時刻 一致（候補の例: {len(candidates)}/{len(snapshot)}件）")
+
+    # personalize からはスナップショットのときだけインデックスを使う
+    profile = profiles[5]
+    assert get_campaign_index(list(snapshot)) is None
+    assert get_campaign_index(snapshot) is get_campaign_index(snapshot)
+    assert rank_top_k(snapshot, profile, 3) == rank_campaigns_for_user(snapshot, profile)[:3]
+    print()
+
+
+def test_incremental_update():
+    """前回のインデックスから作り直しても、最初から作ったものと同じになること"""
+    campaigns = _with_sources(make_campaigns(300, seed=4))
+    previous = CampaignIndex(freeze_campaigns(campaigns))
+
+    rng = random.Random(5)
+    updated = [dict(campaign) for campaign in campaigns[20:]]  # 削除
+    updated[0]['required_cards'] = ['dカード']  # 変更
+    updated[1]['source'] = 'PayPay' if updated[1]['source'] != 'PayPay' else '楽天市場'
+    added = _with_sources(make_campaigns(10, seed=6), seed=7)
+    updated += [dict(campaign, campaign_id=f'new{i}') for i, campaign in enumerate(added)]  # 追加
+    rng.shuffle(updated)  # 並び順の変更
+    snapshot = freeze_campaigns(updated)
+
+    index = CampaignIndex(snapshot, previous=previous)
+    fresh = CampaignIndex(snapshot)
+    assert index.reused == len(updated) - 12
+    assert index.postings.keys() == fresh.postings.keys()
+    for key, positions in fresh.postings.items():
+        assert index.postings[key].tolist() == positions.tolist()
+
+    # ソース・店舗・カード不要で引ける
+    paypay = index.lookup(SOURCE, ['PayPay'])
+    assert paypay.tolist() == [i for i, c in enumerate(snapshot) if c['source'] == 'PayPay']
+    stores = index.lookup(STORE, ['ローソン', 'Amazon'])
+    assert stores.tolist() == [
+        i for i, c in enumerate(snapshot) if {'ローソン', 'Amazon'} & set(c['target_stores'])
+    ]
+    assert index.lookup(CARD, [None]).tolist() == [i for i, c in enumerate(snapshot) if not c['required_cards']]
+    print(f"✅ 差分更新: {index.reused}/{len(snapshot)}件 付け替え")
+
+
+def test_index_reused_after_expiry():
+    """期限切れを除いたスナップショットでも作り直さず、最初から作ったものと同じになること"""
+    now = datetime.now()
+    campaigns = [dict(c, end_date=now + timedelta(days=i // 10 - 2)) for i, c in enumerate(make_campaigns(200, seed=8))]
+    snapshot = freeze_campaigns(campaigns)
+    full = get_campaign_index(snapshot)
+
+    trimmed = drop_expired(snapshot, now=now)
+    index = get_campaign_index(trimmed)
+    assert len(trimmed) < len(snapshot)
+    assert get_campaign_index(trimmed) is index
+    assert get_campaign_index(SnapshotSlice(snapshot, len(snapshot) - len(trimmed))) is index
+    assert get_campaign_index(snapshot) is full
+
+    fresh = CampaignIndex(tuple(trimmed))
+    assert index.postings.keys() == fresh.postings.keys()
+    for key, positions in fresh.postings.items():
+        assert index.postings[key].tolist() == positions.tolist()
+
+    matrix = get_campaign_matrix(trimmed)
+    for profile in make_profiles(5):
+        positions, _ = index.top_k(matrix, profile, 3, now)
+        assert positions.tolist() == top_k_order(score_campaigns(matrix, profile, now), 3).tolist()
+    assert rank_top_k(trimmed, profile, 3) == rank_campaigns_for_user(list(trimmed), profile)[:3]
+
+
+if __name__ == "__main__":
+    test_top_k_matches_full_scoring()
+    test_incremental_update()
+    test_index_reused_after_expiry()
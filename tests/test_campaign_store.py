@@ -0,0 +1,209 @@
+"""
+キャンペーンID・一括upsertテスト
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.collectors.normalize import make_campaign_id
+from app.utils.database import Base, Campaign, _add_missing_columns
+from app.utils.campaign_store import CampaignStore, upsert_campaigns
+from app.collectors.campaign_collector import CampaignCollector, filter_active
+
+
+def test_campaign_id_is_stable():
+    """IDが内容だけで決まり、表記揺れでは変わらないこと"""
+    url = 'https://event.rakuten.co.jp/campaign/supersale/'
+    first = make_campaign_id('rakuten', '楽天市場', url, '楽天スーパーSALE ポイント10倍')
+    print(f"campaign_id: {first}")
+
+    assert first.startswith('rakuten_')
+    assert len(first.split('_', 1)[1]) == 16
+    assert first == make_campaign_id('rakuten', '楽天市場', url + '?scid=top', '【楽天スーパーSALE】ポイント10倍！')
+    assert first != make_campaign_id('rakuten', '楽天市場', url, '楽天スーパーSALE ポイント5倍')
+    assert first != make_campaign_id('rakuten', '楽天カード', url, '楽天スーパーSALE ポイント10倍')
+
+
+def test_campaign_id_on_listing_url():
+    """個別リンクがなく一覧ページのURLの場合、期間だけが違うキャンペーンは別IDになること"""
+    listing = 'https://point.example.com/campaign/'
+    march = make_campaign_id('vpoint', 'Vポイント', listing, '3月のポイント5倍', listing=True)
+    april = make_campaign_id('vpoint', 'Vポイント', listing, '4月のポイント5倍', listing=True)
+    assert march != april
+    assert march == make_campaign_id('vpoint', 'Vポイント', listing, '【3月】のポイント5倍！', listing=True)
+
+    # 日付表記がタイトルになくても終了日で区別する
+    first = make_campaign_id('vpoint', 'Vポイント', listing, 'ポイント5倍', listing=True, end_date=datetime(2026, 3, 31))
+    second = make_campaign_id('vpoint', 'Vポイント', listing, 'ポイント5倍', listing=True, end_date=datetime(2026, 4, 30))
+    assert first != second
+
+    # 個別リンクがある場合はこれまで通り日付表記の違いを無視する
+    url = 'https://point.example.com/campaign/pt5/'
+    assert make_campaign_id('vpoint', 'Vポイント', url, '3月のポイント5倍') == \
+        make_campaign_id('vpoint', 'Vポイント', url, '4月のポイント5倍')
+
+
+def _session_factory(tmp):
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _session(tmp):
+    return _session_factory(tmp)()
+
+
+def test_bulk_upsert():
+    """同じIDは更新・新しいIDは追加されること"""
+    print("=" * 60)
+    print("一括upsertテスト")
+    print("=" * 60)
+
+    now = datetime.now()
+    campaigns = [
+        {
+            'campaign_id': f'test_{i}',
+            'title': f'キャンペーン{i}',
+            'url': f'https://example.com/{i}',
+            'source': 'テスト',
+            'start_date': now,
+            'end_date': now + timedelta(days=7),
+            'base_amount': 10000,
+            'return_rate': 0.5 if i == 0 else i,
+            'required_cards': ['楽天カード'],
+            'action_steps': ['1. エントリー'],
+        }
+        for i in range(1200)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        session = _session(tmp)
+        assert upsert_campaigns(campaigns, session=session) == 1200
+
+        session.query(Campaign).filter_by(campaign_id='test_1').update({'summary_short': '要約'})
+        session.commit()
+        created_at = session.query(Campaign).filter_by(campaign_id='test_1').one().created_at
+
+        campaigns[1]['title'] = '更新後タイトル'
+        campaigns.append({'campaign_id': 'test_new', 'title': '新規'})
+        assert upsert_campaigns(campaigns[:2] + campaigns[-1:], session=session) == 3
+
+        assert session.query(Campaign).count() == 1201
+        updated = session.query(Campaign).filter_by(campaign_id='test_1').one()
+        assert updated.title == '更新後タイトル'
+        assert updated.summary_short == '要約'  # 収集しない項目は維持
+        assert updated.created_at == created_at
+        assert session.query(Campaign).filter_by(campaign_id='test_0').one().return_rate == 0.5
+        assert session.query(Campaign).filter_by(campaign_id='test_new').one().is_dangerous is False
+        session.close()
+    print("✅ upsert OK")
+    print()
+
+
+def test_add_missing_columns():
+    """旧スキーマのテーブルに新カラムが追加されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'old.sqlite3')}")
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE campaigns (id INTEGER PRIMARY KEY, campaign_id VARCHAR UNIQUE, title VARCHAR)'))
+            conn.execute(text("INSERT INTO campaigns (campaign_id, title) VALUES ('old', '既存')"))
+        Base.metadata.create_all(engine)
+        _add_missing_columns(engine)
+
+        with engine.begin() as conn:
+            columns = {row[1] for row in conn.execute(text('PRAGMA table_info(campaigns)'))}
+            # 既存の行は固定値のデフォルトで埋まる（掲載中の絞り込みから漏れない）
+            row = conn.execute(text("SELECT is_active, is_dangerous, base_amount FROM campaigns")).one()
+            assert tuple(row) == (1, 0, None)
+
+            # デフォルトなしで追加済みの既存DBも修復する
+            conn.execute(text("UPDATE campaigns SET is_active = NULL"))
+        _add_missing_columns(engine)
+        with engine.begin() as conn:
+            assert conn.execute(text("SELECT is_active FROM campaigns")).scalar() == 1
+        engine.dispose()
+    assert {'base_amount', 'return_rate', 'action_steps', 'end_date'} <= columns
+
+
+def _snapshot(now):
+    return [
+        {'campaign_id': 'soon', 'title': '締切間近', 'source': '楽天市場', 'end_date': now + timedelta(days=1)},
+        {'campaign_id': 'later', 'title': '来月まで', 'source': 'dポイント', 'end_date': now + timedelta(days=30)},
+        {'campaign_id': 'open', 'title': '期限なし', 'source': 'dポイント', 'end_date': None},
+        {'campaign_id': 'expired', 'title': '終了済み', 'source': '楽天市場', 'end_date': now - timedelta(days=1)},
+        {'campaign_id': 'danger', 'title': '地雷', 'source': '楽天市場', 'end_date': now + timedelta(days=3),
+         'is_dangerous': True, 'danger_reason': 'テスト'},
+    ]
+
+
+def test_snapshot_store():
+    """掲載中・期限内・地雷でないものだけをSQLで取得できること"""
+    print("=" * 60)
+    print("DBスナップショットテスト")
+    print("=" * 60)
+
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CampaignStore(session_factory=_session_factory(tmp))
+        assert store.load_meta() is None
+
+        version = store.save_snapshot(_snapshot(now), {'rakuten': now})
+        meta = store.load_meta()
+        assert meta['version'] == version
+        assert meta['refreshed_at'] == {'rakuten': now}
+
+        active = store.active_campaigns(now=now)
+        print(f"掲載中: {[c['title'] for c in active]}")
+        assert [c['campaign_id'] for c in active] == ['soon', 'later', 'open']
+        assert [c['campaign_id'] for c in filter_active(_snapshot(now), now=now)] == ['soon', 'later', 'open']
+        assert [c['campaign_id'] for c in store.active_campaigns(now=now, sources=['dポイント'], limit=1)] == ['later']
+        assert len(store.active_campaigns(now=now, include_dangerous=True)) == 4
+
+        # 次のスナップショットに含まれないものは掲載終了
+        assert store.save_snapshot(_snapshot(now)[1:], {'rakuten': now}) == version + 1
+        assert [c['campaign_id'] for c in store.active_campaigns(now=now)] == ['later', 'open']
+        assert len(store.load_snapshot()['campaigns']) == 4
+
+        # 絞り込みはインデックスを使う
+        session = store.session_factory()
+        plan = session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM campaigns "
+            "WHERE is_active = 1 AND is_dangerous = 0 AND end_date >= :now"
+        ), {'now': now}).fetchall()
+        session.close()
+        print(f"クエリプラン: {plan}")
+        assert 'ix_campaigns_active_dangerous_end' in str(plan)
+    print("✅ SQL絞り込みOK")
+    print()
+
+
+def test_collector_imports_file_snapshot():
+    """DBが空ならJSONスナップショットを取り込んで使うこと"""
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'campaigns_cache.json')
+        collector = CampaignCollector(cache_file=cache_file, store='file')
+        collector._write_cache_file(_snapshot(now), {key: now for key in collector.collectors})
+
+        collector = CampaignCollector(cache_file=cache_file, store='db')
+        collector.store = CampaignStore(session_factory=_session_factory(tmp))
+        campaigns = collector.refresh_stale()
+
+        assert collector.last_result is None
+        assert [c['campaign_id'] for c in campaigns] == ['soon', 'later', 'open']
+        assert collector.store.load_meta() is not None
+
+
+if __name__ == "__main__":
+    test_campaign_id_is_stable()
+    test_campaign_id_on_listing_url()
+    test_bulk_upsert()
+    test_add_missing_columns()
+    test_snapshot_store()
+    test_collector_imports_file_snapshot()
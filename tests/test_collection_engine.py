@@ -0,0 +1,69 @@
+"""
+並行収集エンジンテスト
+ネットワークを使わずに、タイムアウトと部分結果の扱いを確認
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.collection_engine import collect_concurrently
+
+
+def _task(title: str, delay: float = 0.0, error: bool = False):
+    """指定秒数後にキャンペーン1件を返す収集処理"""
+    def run():
+        time.sleep(delay)
+        if error:
+            raise RuntimeError(f"{title} failed")
+        return [{'title': title}]
+    return run
+
+
+def test_concurrent_collection():
+    """全URLが並行に実行されること"""
+    print("=" * 60)
+    print("並行収集テスト")
+    print("=" * 60)
+
+    tasks = {
+        'a': [_task('a1', 0.3), _task('a2', 0.3)],
+        'b': [_task('b1', 0.3)],
+    }
+    result = collect_concurrently(tasks, source_timeout=5, deadline=5)
+
+    print(f"所要時間: {result.elapsed:.2f}秒")
+    assert result.completed == ['a', 'b']
+    assert [c['title'] for c in result.campaigns] == ['a1', 'a2', 'b1']
+    assert result.elapsed < 0.8  # 直列なら0.9秒以上
+    print("✅ 並行収集OK")
+    print()
+
+
+def test_source_timeout_partial_results():
+    """遅いソースは打ち切られ、完了したソースだけ返ること"""
+    print("=" * 60)
+    print("タイムアウトテスト")
+    print("=" * 60)
+
+    tasks = {
+        'fast': [_task('fast1', 0.05)],
+        'slow': [_task('slow1', 0.05), _task('slow2', 2.0)],
+        'broken': [_task('broken1', error=True), _task('broken2')],
+    }
+    result = collect_concurrently(tasks, source_timeout=0.3, deadline=1.0)
+
+    print(f"結果: {result.summary()}")
+    assert result.timed_out == ['slow']
+    assert result.completed == ['fast', 'broken']
+    assert [c['title'] for c in result.campaigns] == ['fast1', 'broken2']
+    assert result.errors['broken'] == ['broken1 failed']
+    assert result.elapsed < 1.0
+    print("✅ タイムアウト処理OK")
+    print()
+
+
+if __name__ == "__main__":
+    test_concurrent_collection()
+    test_source_timeout_partial_results()
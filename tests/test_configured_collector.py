@@ -0,0 +1,89 @@
+"""
+設定駆動コレクターテスト
+ネットワークを使わず、設定どおりにページを解析できることを確認
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.configured_collector import ConfiguredCollector, load_configured_collectors
+
+
+PAGE = """
+<html><body>
+<nav><ul><li><a href="/menu">メニュー</a></li></ul></nav>
+<div class="campaign-list"><ul>
+  <li><a href="/campaign/jumbo/"><h3>PayPayジャンボ 最大20%還元</h3></a>
+      <p class="text">期間：2026年3月1日〜2026年3月31日 要エントリー</p></li>
+  <li><a href="https://example.com/card"><h3>PayPayカード 新規入会で5,000ポイント</h3></a>
+      <p class="text">auユーザー限定ではありません</p></li>
+  <li><p>タイトルなし</p></li>
+</ul></div>
+</body></html>
+""".encode('utf-8')
+
+CONFIG = {
+    'name': 'PayPayテスト',
+    'url': 'https://paypay.example.jp/event/',
+    'collector': 'paypay_test',
+    'scrape': {
+        'item_selector': '.campaign-list li',
+        'title_selector': 'h3',
+        'description_selector': '.text',
+        'base_amount': 20000,
+        'points': {'enabled': True, 'min': 1000},
+        'cards': {
+            'rules': [{'keyword': 'PayPayカード', 'card': 'PayPayカード'}],
+            'default': [],
+        },
+        'target_stores': ['コンビニ'],
+        'danger_rules': [{'keywords': ['au', 'ユーザー限定'], 'reason': 'au限定'}],
+    },
+}
+
+
+def test_parse_with_config():
+    """設定のセレクタ・カード対応・地雷判定で解析されること"""
+    print("=" * 60)
+    print("設定駆動コレクターテスト")
+    print("=" * 60)
+
+    collector = ConfiguredCollector(CONFIG)
+    campaigns = collector._parse_page(PAGE, CONFIG['url'])
+
+    for camp in campaigns:
+        print(f"- {camp['title']} / {camp['return_rate']}% / {camp['required_cards']} / 地雷: {camp['is_dangerous']}")
+
+    assert len(campaigns) == 2
+    jumbo, card = campaigns
+
+    assert jumbo['url'] == 'https://paypay.example.jp/campaign/jumbo/'
+    assert jumbo['source'] == 'PayPayテスト'
+    assert jumbo['return_rate'] == 20
+    assert jumbo['end_date'].day == 31
+    assert jumbo['conditions'] == {'entry_required': True}
+    assert jumbo['required_cards'] == []
+    assert jumbo['base_amount'] == 20000
+    assert jumbo['is_dangerous'] is False
+
+    assert card['url'] == 'https://example.com/card'
+    assert card['return_rate'] == 25  # 5,000ポイント / 20,000円
+    assert card['required_cards'] == ['PayPayカード']
+    assert card['is_dangerous'] is True
+    assert card['danger_reason'] == 'au限定'
+    print("✅ 設定どおりに解析OK")
+    print()
+
+
+def test_sources_yml_collectors():
+    """sources.yml から PayPay・au PAY のコレクターが生成されること"""
+    collectors = load_configured_collectors()
+    print(f"汎用コレクター: {list(collectors)}")
+    assert {'paypay', 'paypay_card', 'aupay', 'rakuten_card'} <= set(collectors)
+    assert collectors['aupay'].source_name == 'au PAY'
+
+
+if __name__ == "__main__":
+    test_parse_with_config()
+    test_sources_yml_collectors()
@@ -0,0 +1,50 @@
+"""
+DBエンジン・セッション管理のテスト
+"""
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.utils import database
+from app.utils.database import get_engine, get_session, init_db
+
+
+def test_engine_shared_across_sessions():
+    """セッションごとにエンジンを作らず、SQLiteは WAL で開くこと"""
+    print("=" * 60)
+    print("DBエンジン共有テスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            first, second = get_session(), get_session()
+            try:
+                assert first.get_bind() is second.get_bind() is get_engine()
+                assert init_db() is get_engine()
+
+                journal_mode = first.execute(text("PRAGMA journal_mode")).scalar()
+                busy_timeout = first.execute(text("PRAGMA busy_timeout")).scalar()
+                print(f"journal_mode={journal_mode}, busy_timeout={busy_timeout}")
+                assert journal_mode == 'wal'
+                assert busy_timeout == 5000
+            finally:
+                first.close()
+                second.close()
+        finally:
+            database.dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ エンジン共有・WAL OK")
+    print()
+
+
+if __name__ == "__main__":
+    test_engine_shared_across_sessions()
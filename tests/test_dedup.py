@@ -0,0 +1,110 @@
+"""
+近似重複検出テスト
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.normalize import normalize_title, normalize_url, url_path_tokens
+from app.collectors.dedup import deduplicate, find_duplicate_clusters
+
+
+def test_normalize():
+    """全角/半角・記号・日付の揺れを吸収すること"""
+    assert normalize_title('【楽天スーパーSALE】最大ポイント10倍 3/4(月)20:00〜') == '楽天スーパーsale最大ポイント10倍'
+    assert normalize_title('ｄポイント　スーパーチャンス！') == 'dポイントスーパーチャンス'
+    assert normalize_title('2026年3月1日〜3月31日 エントリーで5,000ポイント') == 'エントリーで5000ポイント'
+    assert normalize_url('https://www.Example.com/sale/?scid=top#a') == 'example.com/sale'
+    assert url_path_tokens('https://event.rakuten.co.jp/campaign/super-sale/index.html') == ['super', 'sale']
+
+
+def test_near_duplicates():
+    """別ドメイン・表記違いの同一キャンペーンだけをまとめること"""
+    print("=" * 60)
+    print("近似重複検出テスト")
+    print("=" * 60)
+
+    campaigns = [
+        {'title': '【楽天スーパーSALE】最大ポイント10倍 3/4(月)20:00〜',
+         'url': 'https://point.rakuten.co.jp/campaign/supersale/', 'source': '楽天市場'},
+        {'title': '楽天カード新規入会で5,000ポイント',
+         'url': 'https://www.rakuten-card.co.jp/campaign/', 'source': '楽天カード'},
+        {'title': '楽天スーパーSALE 最大ポイント10倍！',
+         'url': 'https://event.rakuten.co.jp/supersale/', 'source': '楽天カード'},
+        {'title': '楽天カード新規入会で8,000ポイント',
+         'url': 'https://www.rakuten-card.co.jp/campaign/', 'source': '楽天カード'},
+        {'title': 'ｄポイント　スーパーチャンス', 'url': 'https://d.example.jp/a', 'source': 'dポイント'},
+        {'title': 'dポイントスーパーチャンス', 'url': 'https://d.example.jp/b', 'source': 'dカード'},
+        {'title': '', 'url': 'https://d.example.jp/c', 'source': 'dポイント'},
+    ]
+
+    unique, clusters = deduplicate(campaigns)
+    for cluster in clusters:
+        print(f"- {cluster['kept']['title']} ← {[c['title'] for c in cluster['merged']]}")
+
+    assert [c['title'] for c in unique] == [
+        '【楽天スーパーSALE】最大ポイント10倍 3/4(月)20:00〜',
+        '楽天カード新規入会で5,000ポイント',
+        '楽天カード新規入会で8,000ポイント',  # 数値が違えば別キャンペーン
+        'ｄポイント　スーパーチャンス',
+    ]
+    assert len(clusters) == 2
+    assert clusters[0]['merged'][0]['source'] == '楽天カード'
+    print("✅ 重複統合OK")
+    print()
+
+
+def test_identical_titles_with_different_urls():
+    """正規化タイトルが同じなら、URLのパスが違ってもまとめること"""
+    campaigns = [
+        {'title': 'ポイント10倍', 'url': 'https://a.jp/campaign/spring/sale1'},
+        {'title': 'ポイント10倍', 'url': 'https://b.jp/campaign/autumn/sale2'},
+        {'title': 'ポイント20倍', 'url': 'https://a.jp/campaign/spring/sale1'},
+    ]
+    unique, clusters = deduplicate(campaigns)
+    assert [c['url'] for c in unique] == [
+        'https://a.jp/campaign/spring/sale1',
+        'https://a.jp/campaign/spring/sale1',  # 同じURLでも数値が違えば別キャンペーン
+    ]
+    assert len(clusters) == 1
+
+    # 表記揺れのあるタイトルでも、URLのトークンが違うだけで別扱いにならない
+    campaigns = [
+        {'title': 'dポイントスーパーチャンス', 'url': 'https://a.jp/campaign/spring/super/chance/entry/detail/'},
+        {'title': 'dポイントスーパーチャンス開催', 'url': 'https://b.jp/event/autumn/special/list/guide/info/'},
+    ]
+    assert find_duplicate_clusters(campaigns) == [[0, 1]]
+
+    # タイトルがしきい値にわずかに届かないときは、URLのトークンが共通すれば重複
+    campaigns = [
+        {'title': '楽天カード新規入会特典', 'url': 'https://a.jp/campaign/newmember/'},
+        {'title': '楽天カード 新規入会で特典', 'url': 'https://b.jp/newmember/'},
+        {'title': '楽天カード 新規入会で特典', 'url': 'https://c.jp/other/'},
+    ]
+    assert find_duplicate_clusters(campaigns) == [[0, 1, 2]]
+    assert find_duplicate_clusters([campaigns[0], campaigns[2]]) == []
+
+
+def test_scales_linearly():
+    """数万件でも全ペア比較せずに処理できること"""
+    campaigns = []
+    for i in range(20000):
+        campaigns.append({'title': f'ショップ{i}限定 ポイント{i % 7 + 2}倍キャンペーン', 'url': f'https://a.example.jp/s{i}/'})
+    campaigns.append({'title': '【ショップ42限定】ポイント2倍キャンペーン', 'url': 'https://b.example.jp/s42'})
+
+    started = time.time()
+    clusters = find_duplicate_clusters(campaigns)
+    elapsed = time.time() - started
+    print(f"20,001件: {elapsed:.2f}秒 / クラスタ {clusters}")
+
+    assert clusters == [[42, 20000]]
+    assert elapsed < 20
+
+
+if __name__ == "__main__":
+    test_normalize()
+    test_near_duplicates()
+    test_identical_titles_with_different_urls()
+    test_scales_linearly()
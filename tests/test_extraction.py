@@ -0,0 +1,93 @@
+"""
+キャンペーン情報抽出エンジンテスト
+"""
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.extraction import extract_campaign_facts, estimate_return_rate
+
+
+NOW = datetime(2026, 2, 1, 12, 0)
+
+
+def test_return_rate():
+    """倍率 → パーセント → ポイント数 の優先順"""
+    facts = extract_campaign_facts("楽天スーパーSALE ポイント最大44倍 20%還元", now=NOW)
+    assert facts['multiplier'] == 44
+    assert facts['percent'] == 20
+    assert facts['return_rate'] == 44
+
+    facts = extract_campaign_facts("証券 クレカ積立 0.5%還元", now=NOW)
+    assert facts['return_rate'] == 0.5
+
+    facts = extract_campaign_facts("新規入会で5,000ポイントプレゼント", now=NOW)
+    assert facts['points'] == 5000
+    assert facts['return_rate'] == 5  # ポイント数はデフォルトでは使わない
+    assert estimate_return_rate(facts) == 50
+    assert estimate_return_rate(extract_campaign_facts("500ポイント", now=NOW), min_points=1000) == 5
+
+
+def test_date_range():
+    """「A〜B」の期間表記は開始日・終了日として扱う"""
+    facts = extract_campaign_facts(
+        "ポイント最大44倍 2026年3月4日（水）20:00〜2026年3月11日（水）01:59 要エントリー", now=NOW
+    )
+    assert facts['start_date'] == datetime(2026, 3, 4)
+    assert facts['end_date'] == datetime(2026, 3, 11, 23, 59, 59)
+    assert facts['entry_required'] is True
+
+    # 年をまたぐ月日のみの範囲
+    facts = extract_campaign_facts("12月25日から1月5日まで ポイント2倍", now=datetime(2026, 12, 1))
+    assert facts['start_date'] == datetime(2026, 12, 25)
+    assert facts['end_date'] == datetime(2027, 1, 5, 23, 59, 59)
+
+    facts = extract_campaign_facts("エントリー期間 4/1〜4/30 5%還元", now=NOW)
+    assert facts['start_date'] == datetime(2026, 4, 1)
+    assert facts['end_date'] == datetime(2026, 4, 30, 23, 59, 59)
+
+
+def test_single_end_date():
+    """単独の日付は終了日（過ぎた月日は来年）"""
+    facts = extract_campaign_facts("2026年1月5日更新 期間：3月3日まで", now=NOW)
+    assert facts['start_date'] is None
+    assert facts['end_date'] == datetime(2026, 3, 3, 23, 59, 59)
+
+    facts = extract_campaign_facts("1月10日まで", now=NOW)
+    assert facts['end_date'] == datetime(2027, 1, 10, 23, 59, 59)
+
+    facts = extract_campaign_facts("エントリー後30日間有効", now=NOW)
+    assert facts['end_date'] == datetime(2026, 3, 3, 12, 0)
+
+    facts = extract_campaign_facts("毎日開催", now=NOW)
+    assert facts['end_date'] is None
+    assert facts['entry_required'] is False
+
+    facts = extract_campaign_facts("エントリーから30日間", now=NOW)
+    assert facts['entry_required'] is True
+    assert facts['end_date'] == datetime(2026, 3, 3, 12, 0)
+
+
+def test_rate_text():
+    """還元率はタイトル＋説明文から、期間は要素テキスト全体から読むこと"""
+    element_text = "抽選で100名に1,000ポイント 20%還元 期間：3月3日まで ※他キャンペーンと併用で最大5倍"
+    facts = extract_campaign_facts(element_text, now=NOW, rate_text="20%還元 対象店舗で利用")
+    assert facts['multiplier'] is None
+    assert facts['percent'] == 20
+    assert facts['points'] is None
+    assert facts['return_rate'] == 20
+    assert facts['end_date'] == datetime(2026, 3, 3, 23, 59, 59)
+
+    # タイトル＋説明文に数字がなければデフォルト
+    facts = extract_campaign_facts(element_text, now=NOW, rate_text="春のキャンペーン")
+    assert facts['return_rate'] == 5
+
+
+if __name__ == "__main__":
+    test_return_rate()
+    test_date_range()
+    test_single_end_date()
+    test_rate_text()
+    print("✅ 抽出エンジンテスト完了")
@@ -0,0 +1,74 @@
+"""
+カード・店舗名のビットマスクエンコードのテスト
+"""
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.evaluators import personalize
+from app.evaluators.features import FeatureVocabulary, any_common
+from app.evaluators.scoring import CampaignMatrix
+from tests.test_scoring import _Profile
+
+
+def test_vocabulary_encode():
+    """名前ごとにビットを割り当て、ユーザー側の未登録の名前は無視すること"""
+    vocabulary = FeatureVocabulary()
+    assert vocabulary.encode(['楽天カード', 'dカード', '楽天カード']) == 0b11
+    assert vocabulary.encode(['dカード', '未登録カード'], add=False) == 0b10
+    assert len(vocabulary) == 2 and vocabulary.width() == 1
+
+    for i in range(70):
+        vocabulary.intern(f'店舗{i}')
+    assert vocabulary.width() == 2
+    assert vocabulary.encode(['店舗69']) == 1 << 71
+
+    # width を超えるビットは切り捨て
+    words = vocabulary.encode_rows([['店舗69'], ['楽天カード']], width=1)
+    assert words.tolist() == [[0], [1]]
+
+
+def test_any_common_matches_sets():
+    """64ビットをまたぐ語彙でも、集合の共通部分の有無と一致すること"""
+    print("=" * 60)
+    print("ビットマスク一致判定テスト")
+    print("=" * 60)
+
+    rng = random.Random(0)
+    names = [f'名前{i}' for i in range(150)]
+    campaigns = [rng.sample(names, rng.choice((0, 1, 3))) for _ in range(300)]
+    users = [rng.sample(names, rng.choice((0, 2, 10))) + ['未登録'] for _ in range(20)]
+
+    vocabulary = FeatureVocabulary()
+    campaign_words = vocabulary.encode_rows(campaigns)
+    user_words = vocabulary.encode_rows(users, add=False, width=campaign_words.shape[1])
+    common = any_common(campaign_words, user_words)
+
+    expected = [[bool(set(c) & set(u)) for c in campaigns] for u in users]
+    assert common.tolist() == expected
+    print(f"✅ {len(users)}人 × {len(campaigns)}件（{campaign_words.shape[1]}ワード）一致")
+    print()
+
+
+def test_matrix_masks():
+    """列データの必要カード・対象店舗が1件ずつの判定と同じ結果になること"""
+    campaigns = [
+        {'required_cards': ['楽天カード'], 'target_stores': ['ローソン']},
+        {'required_cards': ['dカード', 'au PAY カード'], 'target_stores': []},
+        {'required_cards': None},
+    ]
+    profile = _Profile(['dカード', '名前なしカード'], ['ローソン', '未登録の店舗'])
+    matrix = CampaignMatrix(campaigns)
+
+    assert matrix.required_cards.has_any.tolist() == [True, True, False]
+    has_card = ~matrix.required_cards.has_any | matrix.required_cards.any_match(['dカード', '名前なしカード'])
+    assert has_card.tolist() == [personalize._has_required_card(c, profile) for c in campaigns]
+    assert matrix.target_stores.any_match(profile.favorite_stores).tolist() == [True, False, False]
+
+
+if __name__ == "__main__":
+    test_vocabulary_encode()
+    test_any_common_matches_sets()
+    test_matrix_masks()
@@ -0,0 +1,146 @@
+"""
+原子的書き込み・プロセス間ロックのテスト
+"""
+import sys
+import os
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors import campaign_collector
+from app.utils import file_io
+from app.utils.file_io import FileLock, atomic_write
+from tests.test_refresh_scheduler import _slow_campaign_collector
+
+
+def test_atomic_write_keeps_old_file_on_error():
+    """書き込み途中の例外では元のファイルが残り、一時ファイルも残らないこと"""
+    print("=" * 60)
+    print("原子的書き込みテスト")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'campaigns_cache.json')
+        with atomic_write(path, encoding='utf-8') as f:
+            json.dump({'version': 1}, f)
+
+        try:
+            with atomic_write(path, encoding='utf-8') as f:
+                f.write('{"version": ')
+                raise RuntimeError("書き込み中断")
+        except RuntimeError:
+            pass
+
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == {'version': 1}
+        assert os.listdir(tmp) == ['campaigns_cache.json']
+    print("✅ 中断時も元の内容を維持")
+    print()
+
+
+def test_atomic_write_keeps_file_mode():
+    """新規ファイルは umask どおり、既存ファイルは元の権限のまま置き換えること（mkstemp の 0600 にならない）"""
+    if not hasattr(os, 'fchmod'):
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'http_cache.json')
+        with atomic_write(path, encoding='utf-8') as f:
+            f.write('{}')
+        assert os.stat(path).st_mode & 0o777 == 0o666 & ~file_io._UMASK
+
+        os.chmod(path, 0o640)
+        with atomic_write(path, encoding='utf-8') as f:
+            f.write('{}')
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+
+def _hold_lock(path, ready, release):
+    with FileLock(path):
+        ready.set()
+        release.wait(5)
+
+
+def test_file_lock_across_processes():
+    """別プロセスが保持中は取得できず、解放後に取得できること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'campaigns_cache.lock')
+        ready, release = multiprocessing.Event(), multiprocessing.Event()
+        holder = multiprocessing.Process(target=_hold_lock, args=(path, ready, release))
+        holder.start()
+        try:
+            assert ready.wait(5)
+            lock = FileLock(path, timeout=0.1)
+            assert not lock.acquire()
+            assert lock.waited
+        finally:
+            release.set()
+            holder.join(5)
+
+        with FileLock(path, timeout=1) as lock:
+            assert not lock.waited
+
+
+def test_refresh_single_flight():
+    """同時に鮮度切れを検知しても収集は1回だけで、待った側はその結果を使うこと"""
+    print("=" * 60)
+    print("single-flight 再収集テスト")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 別ワーカー相当（コレクター・ロックのファイルディスクリプタが別）
+        workers = [_slow_campaign_collector(tmp, delay=0.3) for _ in range(3)]
+        results = [None] * len(workers)
+
+        def refresh(i):
+            results[i] = workers[i][0].refresh_stale()
+
+        threads = [threading.Thread(target=refresh, args=(i,)) for i in range(len(workers))]
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        print(f"所要時間: {time.time() - started:.2f}秒")
+
+        calls = sum(slow.calls for _, slow in workers)
+        print(f"収集回数: {calls}")
+        assert calls == 1
+        assert all([c['title'] for c in result] == ['新着1'] for result in results)
+    print("✅ 収集1回・結果共有OK")
+    print()
+
+
+def test_collect_all_lock_timeout():
+    """他のワーカーの収集待ちがタイムアウトしたら、収集せず現在のスナップショットを返すこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=0)
+        assert [c['title'] for c in collector.collect_all()] == ['新着1']
+
+        ready, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=_hold_lock, args=(collector.lock_file, ready, release))
+        holder.start()
+        original_timeout = campaign_collector.REFRESH_LOCK_TIMEOUT
+        campaign_collector.REFRESH_LOCK_TIMEOUT = 0.1
+        try:
+            assert ready.wait(5)
+            campaigns = collector.collect_all()
+        finally:
+            campaign_collector.REFRESH_LOCK_TIMEOUT = original_timeout
+            release.set()
+            holder.join(5)
+
+        assert slow.calls == 1
+        assert [c['title'] for c in campaigns] == ['新着1']
+
+
+if __name__ == "__main__":
+    test_atomic_write_keeps_old_file_on_error()
+    test_atomic_write_keeps_file_mode()
+    test_file_lock_across_processes()
+    test_refresh_single_flight()
+    test_collect_all_lock_timeout()
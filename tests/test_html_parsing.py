@@ -0,0 +1,52 @@
+"""
+HTMLパース方式テスト
+高速方式（lxml＋SoupStrainer）が従来方式と同じ候補要素を返すことを確認
+"""
+import sys
+import os
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.html_parsing import select_candidates, strainer_for
+
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "pages"
+
+SELECTORS = {
+    'rakuten': '.campaign-item, .event-item, article',
+    'vpoint': '.campaign-list li, .campaign-item, article',
+    'dpoint': '.campaign-item, .campaign-list li, article, .box',
+}
+
+
+def test_strainer_for():
+    """セレクタ先頭要素からフィルタを生成"""
+    strainer = strainer_for('.campaign-list li, article, div.box')
+    assert strainer.names == {'article'}
+    assert strainer.classes == {'campaign-list', 'box'}
+    assert strainer_for('#main .item') is None
+
+
+def test_fast_mode_matches_legacy():
+    """フィクスチャページで両方式の抽出結果が一致すること"""
+    print("=" * 60)
+    print("HTMLパース方式テスト")
+    print("=" * 60)
+
+    for name, selector in SELECTORS.items():
+        content = (FIXTURE_DIR / f"{name}.html").read_bytes()
+        legacy = select_candidates(content, selector, limit=10, mode="legacy")
+        fast = select_candidates(content, selector, limit=10, mode="fast")
+
+        print(f"{name}: {len(fast)}件")
+        assert len(fast) == 10
+        assert [e.get_text(strip=True) for e in fast] == [e.get_text(strip=True) for e in legacy]
+
+    print("✅ 抽出結果一致")
+    print()
+
+
+if __name__ == "__main__":
+    test_strainer_for()
+    test_fast_mode_matches_legacy()
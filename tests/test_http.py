@@ -0,0 +1,197 @@
+"""
+HTTP取得レイヤーテスト
+ローカルHTTPサーバーで条件付きリクエストの挙動を確認
+"""
+import sys
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.http_cache import ResponseCache, fetch_campaigns
+from app.collectors.http_client import HttpClient, TokenBucket
+
+
+PAGE = b"<html><body><article><h2>Test</h2></article></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ETag対応の固定ページ（/no-etag はETagなし）"""
+
+    def do_GET(self):
+        use_etag = self.path != '/no-etag'
+        if use_etag and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if use_etag:
+            self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Keep-Alive対応。/flaky は初回だけ503を返す"""
+    protocol_version = 'HTTP/1.1'
+    flaky_calls = 0
+
+    def do_GET(self):
+        status = 200
+        if self.path == '/flaky':
+            _KeepAliveHandler.flaky_calls += 1
+            if _KeepAliveHandler.flaky_calls == 1:
+                status = 503
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class _DroppingHandler(_KeepAliveHandler):
+    """Keep-Alive を返すが、応答後に接続を切る（次のリクエストは再接続になる）"""
+
+    def do_GET(self):
+        super().do_GET()
+        self.close_connection = True
+
+
+def _start_server(handler=_Handler) -> HTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_conditional_fetch():
+    """304・同一本文のとき解析が省略されること"""
+    print("=" * 60)
+    print("条件付き取得テスト")
+    print("=" * 60)
+
+    server = _start_server()
+    base = f"http://127.0.0.1:{server.server_port}"
+    parse_calls = []
+
+    def parse(content):
+        parse_calls.append(content)
+        return [{'title': 'Test', 'return_rate': 5}]
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(os.path.join(tmp, 'http_cache.json'))
+
+            for path in ['/etag', '/etag', '/no-etag', '/no-etag']:
+                campaigns = fetch_campaigns(base + path, {}, parse, cache=cache)
+                assert campaigns == [{'title': 'Test', 'return_rate': 5}]
+
+            print(f"統計: {cache.stats}")
+            assert len(parse_calls) == 2
+            assert cache.stats == {'not_modified': 1, 'unchanged': 1, 'parsed': 2}
+
+            # ディスクから再読み込みしても304で再利用できる
+            reloaded = ResponseCache(cache.cache_file)
+            fetch_campaigns(base + '/etag', {}, parse, cache=reloaded)
+            assert reloaded.stats['not_modified'] == 1
+
+            # 解析処理のバージョンが変わったら取り直して解析する
+            fetch_campaigns(base + '/etag', {}, parse, cache=reloaded, parser_version='test')
+            assert reloaded.stats['parsed'] == 1
+            assert len(parse_calls) == 3
+
+            # 別の日の解析結果は使わない（開始日・既定の終了日を解析し直す）
+            entry = reloaded.get(base + '/etag')
+            reloaded.store(base + '/etag', dict(entry, parsed_on='2000-01-01'))
+            fetch_campaigns(base + '/etag', {}, parse, cache=reloaded, parser_version='test')
+            assert len(parse_calls) == 4
+
+            # 同じファイルを使う別のキャッシュが保存しても、互いのURLを消さない
+            first = ResponseCache(os.path.join(tmp, 'shared.json'))
+            second = ResponseCache(first.cache_file)
+            first.get('a')
+            second.get('b')
+            first.store('a', {'sha256': 'a'})
+            second.store('b', {'sha256': 'b'})
+            merged = ResponseCache(first.cache_file)
+            assert merged.get('a') and merged.get('b')
+    finally:
+        server.shutdown()
+
+    print("✅ 条件付き取得OK")
+    print()
+
+
+def test_pooled_client_retry_and_reuse():
+    """503はリトライされ、接続はKeep-Aliveで再利用されること"""
+    print("=" * 60)
+    print("共有HTTPクライアントテスト")
+    print("=" * 60)
+
+    server = _start_server(_KeepAliveHandler)
+    base = f"http://127.0.0.1:{server.server_port}"
+    client = HttpClient(backoff_base=0.01, rate_per_host=100, burst_per_host=100)
+
+    try:
+        assert client.get(base + '/flaky', timeout=5).status_code == 200
+        for _ in range(3):
+            assert client.get(base + '/page', timeout=5).status_code == 200
+    finally:
+        client.close()
+        server.shutdown()
+
+    stats = client.stats()
+    print(f"統計: {stats}")
+    assert stats['retries'] == 1
+    assert stats['requests'] == 5
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 4
+    print("✅ リトライ・接続再利用OK")
+    print()
+
+
+def test_dropped_connections_not_counted_as_reused():
+    """サーバーに切られた接続の再接続は再利用として数えないこと"""
+    server = _start_server(_DroppingHandler)
+    base = f"http://127.0.0.1:{server.server_port}"
+    client = HttpClient(rate_per_host=100, burst_per_host=100)
+
+    try:
+        for _ in range(3):
+            assert client.get(base + '/page', timeout=5).status_code == 200
+            time.sleep(0.05)  # サーバー側の切断を待つ
+    finally:
+        client.close()
+        server.shutdown()
+
+    stats = client.stats()
+    print(f"統計: {stats}")
+    assert stats['requests'] == 3
+    assert stats['connections_opened'] == 3
+    assert stats['connections_reused'] == 0
+
+
+def test_token_bucket():
+    """バースト上限を超えると補充レートで待たされること"""
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    print(f"4回取得: {elapsed:.3f}秒")
+    assert 0.08 <= elapsed < 0.5
+
+
+if __name__ == "__main__":
+    test_conditional_fetch()
+    test_pooled_client_retry_and_reuse()
+    test_dropped_connections_not_counted_as_reused()
+    test_token_bucket()
@@ -0,0 +1,142 @@
+"""
+ユーザー×月の還元額集計テスト
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.evaluators.personalize import estimate_missed_amount
+from app.profiles.user_profile import UserProfile
+from app.utils.action_logger import ActionLogger
+from app.utils.async_database import dispose_async_engines
+from app.utils.campaign_store import upsert_campaigns
+from app.utils.database import dispose_engines, get_session
+from app.utils.monthly_savings import (
+    apply_actions, get_monthly_savings, get_monthly_savings_async, month_key, rebuild_monthly_savings
+)
+
+
+def test_monthly_savings_incremental():
+    """行動ログの書き込みと同時に集計され、同じキャンペーンは1回だけ数えること"""
+    print("=" * 60)
+    print("月次還元額集計テスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            upsert_campaigns([
+                {'campaign_id': 'catalog', 'title': 'カタログ', 'base_amount': 20000, 'return_rate': 5},
+            ])
+            march = datetime(2026, 3, 10)
+            april = datetime(2026, 4, 2)
+
+            logger = ActionLogger(batch_size=100)
+            logger.log('saver', 'a', 'viewed', expected_return=1000, created_at=march)
+            logger.log('saver', 'a', 'viewed', expected_return=1000, created_at=march)  # 重複
+            logger.log('saver', 'catalog', 'viewed', created_at=march)  # カタログから 20000 × 5%
+            logger.log('saver', 'a', 'completed', expected_return=1000, actual_return=800, created_at=march)
+            logger.log('saver', 'b', 'viewed', expected_return=300, created_at=april)
+            logger.log('saver', 'c', 'clicked', expected_return=999, created_at=march)  # 集計対象外
+            assert logger.flush()
+
+            # 別バッチでも記録済みのキャンペーンは数えない
+            logger.log('saver', 'catalog', 'viewed', expected_return=5000, created_at=march)
+            logger.close()
+
+            savings = get_monthly_savings('saver', month_key(march))
+            print(f"2026-03: {savings}")
+            assert savings['potential_amount'] == 2000
+            assert savings['viewed_count'] == 2
+            assert savings['completed_amount'] == 1000
+            assert savings['earned_amount'] == 800
+            assert get_monthly_savings('saver', '2026-04')['potential_amount'] == 300
+            assert get_monthly_savings('nobody', '2026-03') is None
+
+            profile = UserProfile('saver')
+            assert estimate_missed_amount(profile, savings) == 1000
+            assert estimate_missed_amount(profile, None) == 5000
+            # 集計がまだなければ今回推薦した分
+            assert estimate_missed_amount(profile, None, [{'expected_return': 700}, {'expected_return': None}]) == 700
+
+            # 作り直しても同じ結果
+            assert rebuild_monthly_savings('2026-03') == 1
+            assert get_monthly_savings('saver', '2026-03') == savings
+
+            async def read_async():
+                try:
+                    return await get_monthly_savings_async('saver', '2026-03')
+                finally:
+                    await dispose_async_engines()
+            assert asyncio.run(read_async()) == savings
+        finally:
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ 月次集計OK")
+    print()
+
+
+def test_count_once_across_writers():
+    """別のワーカー（行動ログ未反映の別トランザクション）が同じ行動を書いても1回だけ数えること"""
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            march = datetime(2026, 3, 10)
+            row = {'line_user_id': 'free_user', 'campaign_id': 'x', 'action_type': 'recommended',
+                   'expected_return': 400, 'actual_return': None, 'created_at': march}
+
+            # 行動ログの行を書かずに集計だけ2回（加算済みの記録で判定する）
+            for _ in range(2):
+                session = get_session()
+                try:
+                    apply_actions(session, [dict(row)])
+                    session.commit()
+                finally:
+                    session.close()
+            savings = get_monthly_savings('free_user', '2026-03')
+            assert savings['potential_amount'] == 400 and savings['viewed_count'] == 1
+
+            # 複数のロガーから同時に書き込んでも1回
+            loggers = [ActionLogger(batch_size=1) for _ in range(4)]
+            threads = [
+                threading.Thread(target=logger.log, args=('free_user', 'y', 'recommended'),
+                                 kwargs={'expected_return': 100, 'created_at': march})
+                for logger in loggers
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            for logger in loggers:
+                logger.close()
+            assert sum(logger.stats['written'] for logger in loggers) == 4
+
+            savings = get_monthly_savings('free_user', '2026-03')
+            print(f"無料ユーザー 2026-03: {savings}")
+            assert savings['potential_amount'] == 500 and savings['viewed_count'] == 2
+            assert estimate_missed_amount(UserProfile('free_user'), savings) == 500
+
+            # 作り直しは行動ログ（y の4行）から
+            assert rebuild_monthly_savings('2026-03') == 1
+            assert get_monthly_savings('free_user', '2026-03')['potential_amount'] == 100
+        finally:
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+
+
+if __name__ == "__main__":
+    test_monthly_savings_incremental()
+    test_count_once_across_writers()
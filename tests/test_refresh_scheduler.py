@@ -0,0 +1,229 @@
+"""
+ソース単位の再収集スケジューラーテスト
+"""
+import sys
+import os
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.refresh_scheduler import RefreshScheduler, RefreshThrottle, parse_frequency, load_check_frequencies
+from app.collectors import campaign_collector
+from app.collectors.campaign_collector import CampaignCollector, build_collectors
+
+
+def test_parse_frequency():
+    """check_frequency の書式"""
+    assert parse_frequency('daily') == timedelta(days=1)
+    assert parse_frequency('hourly') == timedelta(hours=1)
+    assert parse_frequency('6h') == timedelta(hours=6)
+    assert parse_frequency('30m') == timedelta(minutes=30)
+    assert parse_frequency(12) == timedelta(hours=12)
+    assert parse_frequency(None) == timedelta(days=1)
+
+
+def test_sources_config():
+    """sources.yml の collector がすべて登録済みであること"""
+    frequencies = load_check_frequencies()
+    print(f"再収集間隔: {frequencies}")
+    assert set(frequencies) == set(build_collectors())
+
+
+def test_stale_sources():
+    """鮮度切れのソースだけが対象になること"""
+    print("=" * 60)
+    print("鮮度判定テスト")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, 'sources.yml')
+        with open(config, 'w', encoding='utf-8') as f:
+            f.write(
+                "sources:\n"
+                "  - {name: a, collector: a, check_frequency: hourly}\n"
+                "  - {name: b, collector: b, check_frequency: daily}\n"
+                "  - {name: b2, collector: b, check_frequency: 6h}\n"
+            )
+        scheduler = RefreshScheduler(['a', 'b', 'c'], config_file=config)
+
+    now = datetime(2026, 3, 1, 12, 0)
+    refreshed_at = {
+        'a': now - timedelta(hours=2),  # 1時間ごと → 鮮度切れ
+        'b': now - timedelta(hours=3),  # 6時間ごと（短い方を採用） → 新鮮
+    }
+    stale = scheduler.stale_sources(refreshed_at, now=now)
+    print(f"鮮度切れ: {stale}")
+    assert stale == ['a', 'c']
+    print("✅ 鮮度判定OK")
+    print()
+
+
+def test_refresh_stale_uses_fresh_snapshot():
+    """全ソースが新鮮ならスナップショットをそのまま返すこと（収集しない）"""
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'campaigns_cache.json')
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'cached_at': now.isoformat(),
+                'sources': {key: {'refreshed_at': now.isoformat()} for key in build_collectors()},
+                'campaigns': [{
+                    'title': 'キャッシュ済み',
+                    'source': '楽天市場',
+                    'end_date': (now + timedelta(days=3)).isoformat()
+                }]
+            }, f)
+
+        collector = CampaignCollector(cache_file=cache_file, store='file')
+        campaigns = collector.refresh_stale()
+
+    assert collector.last_result is None
+    assert [c['title'] for c in campaigns] == ['キャッシュ済み']
+    assert isinstance(campaigns[0]['end_date'], datetime)
+
+
+class SlowCollector:
+    """収集に時間がかかるテスト用コレクター"""
+    source_name = '低速ソース'
+    urls = ['https://slow.example.com/']
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def _scrape_url(self, url):
+        self.calls += 1
+        time.sleep(self.delay)
+        return [{'title': f'新着{self.calls}', 'source': self.source_name, 'url': url}]
+
+
+def _slow_campaign_collector(tmp, delay):
+    config = os.path.join(tmp, 'sources.yml')
+    with open(config, 'w', encoding='utf-8') as f:
+        f.write("sources:\n  - {name: 低速ソース, collector: slow, check_frequency: hourly}\n")
+    collector = CampaignCollector(cache_file=os.path.join(tmp, 'campaigns_cache.json'), store='file')
+    slow = SlowCollector(delay)
+    collector.collectors = {'slow': slow}
+    collector.scheduler = campaign_collector.RefreshScheduler(['slow'], config_file=config)
+    collector.throttle = RefreshThrottle()
+    return collector, slow
+
+
+def test_serve_stale_refreshes_in_background():
+    """鮮度切れでもスナップショットを即返し、再収集は裏で1本だけ走ること"""
+    print("=" * 60)
+    print("stale-while-revalidate テスト")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=0.5)
+        old = datetime.now() - timedelta(hours=2)
+        collector._save_cache([{'title': '古い', 'source': '低速ソース'}], {'slow': old})
+
+        started = time.time()
+        first = collector.serve_stale()
+        second = collector.serve_stale()
+        elapsed = time.time() - started
+        print(f"応答: {elapsed:.3f}秒")
+
+        assert [c['title'] for c in first] == ['古い']
+        assert [c['title'] for c in second] == ['古い']
+        assert elapsed < 0.3
+
+        campaign_collector.start_background_refresh(collector).join(timeout=5)
+        assert slow.calls == 1
+        assert [c['title'] for c in collector.serve_stale()] == ['新着1']
+    print("✅ 即時応答・再収集1本OK")
+    print()
+
+
+def test_serve_stale_cold_start():
+    """スナップショットがない場合は上限時間まで待つこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=0.2)
+        campaigns = collector.serve_stale(cold_start_wait=5)
+        assert [c['title'] for c in campaigns] == ['新着1']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=1.0)
+        started = time.time()
+        assert collector.serve_stale(cold_start_wait=0.1) == []
+        assert time.time() - started < 0.5
+        campaign_collector.start_background_refresh(collector).join(timeout=5)
+
+
+def test_refresh_throttle():
+    """同じソースは再試行間隔が経つまで起動せず、失敗が続くと間隔を延ばすこと"""
+    print("=" * 60)
+    print("再収集の起動間隔テスト")
+    print("=" * 60)
+
+    throttle = RefreshThrottle(min_interval=timedelta(minutes=5), max_interval=timedelta(minutes=30))
+    now = datetime(2026, 3, 1, 12, 0)
+    assert throttle.claim(['a', 'b'], now=now) == ['a', 'b']
+    assert throttle.claim(['a', 'b'], now=now + timedelta(minutes=1)) == []
+
+    throttle.record(['b'], ['a'])
+    assert throttle.claim(['a', 'b'], now=now + timedelta(minutes=6)) == ['b']  # a は10分待ち
+    assert throttle.claim(['a'], now=now + timedelta(minutes=10)) == ['a']
+
+    for _ in range(5):
+        throttle.record([], ['a'])
+    assert throttle.retry_interval('a') == timedelta(minutes=30)
+    throttle.record(['a'], [])
+    assert throttle.retry_interval('a') == timedelta(minutes=5)
+    print("✅ 再試行間隔OK")
+    print()
+
+
+def test_serve_stale_throttles_failing_source():
+    """取得に失敗し続けるソースで、リクエストごとに再収集を起動しないこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=0)
+
+        def fail(url):
+            slow.calls += 1
+            raise RuntimeError("取得失敗")
+
+        slow._scrape_url = fail
+        old = datetime.now() - timedelta(hours=2)
+        collector._save_cache([{'title': '古い', 'source': '低速ソース'}], {'slow': old})
+
+        for _ in range(3):
+            assert [c['title'] for c in collector.serve_stale()] == ['古い']
+            campaign_collector._refresh_thread.join(timeout=5)
+        assert slow.calls == 1
+        assert collector.throttle.retry_interval('slow') == timedelta(minutes=10)
+
+
+def test_shared_collector():
+    """Webhook 用のコレクターはプロセスで1つだけ作ること"""
+    first = campaign_collector.get_shared_collector()
+    assert campaign_collector.get_shared_collector() is first
+
+    # get_campaigns も共有のコレクターを使う（2回目は鮮度内のスナップショットから返す）
+    with tempfile.TemporaryDirectory() as tmp:
+        collector, slow = _slow_campaign_collector(tmp, delay=0)
+        original = campaign_collector._shared_collector
+        campaign_collector._shared_collector = collector
+        try:
+            assert [c['title'] for c in campaign_collector.get_campaigns()] == ['新着1']
+            assert [c['title'] for c in campaign_collector.get_campaigns()] == ['新着1']
+        finally:
+            campaign_collector._shared_collector = original
+        assert slow.calls == 1
+
+
+if __name__ == "__main__":
+    test_parse_frequency()
+    test_sources_config()
+    test_stale_sources()
+    test_refresh_stale_uses_fresh_snapshot()
+    test_serve_stale_refreshes_in_background()
+    test_serve_stale_cold_start()
+    test_refresh_throttle()
+    test_serve_stale_throttles_failing_source()
+    test_shared_collector()
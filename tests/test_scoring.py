@@ -0,0 +1,152 @@
+"""
+一括スコアリングのテスト（1件ずつの計算と一致すること）
+"""
+import sys
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.dummy_collector import get_dummy_campaigns
+from app.collectors.campaign_collector import drop_expired
+from app.collectors.snapshot_cache import SnapshotSlice, freeze_campaigns
+from app.evaluators import personalize
+from app.evaluators.personalize import rank_campaigns_for_user, rank_top_k
+from app.evaluators.scoring import CampaignMatrix, get_campaign_matrix, score_campaigns, top_k_order
+
+CARDS = ['楽天カード', 'dカード', 'PayPayカード', '三井住友カード', 'au PAY カード']
+STORES = ['楽天市場', 'ローソン', 'セブンイレブン', 'コンビニ', 'スーパー', 'Amazon']
+
+
+class _Profile:
+    """DBを使わないテスト用プロフィール"""
+
+    def __init__(self, cards, favorite_stores):
+        self.cards = [{'name': name} for name in cards]
+        self.favorite_stores = favorite_stores
+
+
+def _rank_reference(campaigns, profile):
+    """1件ずつ計算する従来の実装"""
+    ranked = []
+    for campaign in campaigns:
+        expected_return = personalize._calculate_expected_return(campaign, profile)
+        days_remaining = personalize._calculate_days_remaining(campaign)
+        ranked.append({
+            **campaign,
+            'score': personalize._calculate_campaign_score(campaign, profile),
+            'expected_return': expected_return,
+            'days_remaining': days_remaining,
+            'reason': personalize._generate_reason(campaign, profile, expected_return, days_remaining)
+        })
+    ranked.sort(key=lambda x: x['score'], reverse=True)
+    return ranked
+
+
+def make_campaigns(size, seed=0):
+    """端数・タイムゾーン・文字列日付・地雷・締切不明を含む合成キャンペーン"""
+    rng = random.Random(seed)
+    # 日付の境界をまたがないよう半日ずらす
+    now = datetime.now() + timedelta(hours=12)
+    campaigns = []
+    for i in range(size):
+        end_date = now + timedelta(days=rng.randint(-3, 30))
+        kind = rng.random()
+        if kind < 0.1:
+            end_date = None
+        elif kind < 0.2:
+            end_date = end_date.astimezone(timezone(timedelta(hours=9)))
+        elif kind < 0.3:
+            end_date = end_date.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+        campaign = {
+            'campaign_id': f'c{i}',
+            'title': f'キャンペーン{i}',
+            'end_date': end_date,
+            'return_rate': rng.choice((0.5, 1, 2, 3.3, 5, 10, 20)),
+            'required_cards': rng.sample(CARDS, rng.choice((0, 0, 1, 2))),
+            'target_stores': rng.sample(STORES, rng.choice((0, 1, 2))),
+            'is_dangerous': rng.random() < 0.1,
+        }
+        if rng.random() < 0.8:
+            campaign['base_amount'] = rng.choice((3000, 5000, 10000, 20000, 33333))
+        campaigns.append(campaign)
+    return campaigns
+
+
+def test_matches_reference():
+    """スコア・期待還元額・残日数・理由・順位が従来の実装と一致すること"""
+    print("=" * 60)
+    print("一括スコアリング一致テスト")
+    print("=" * 60)
+
+    campaigns = make_campaigns(2000) + get_dummy_campaigns()
+    profiles = [
+        _Profile([], []),
+        _Profile(['楽天カード'], ['楽天市場']),
+        _Profile(['dカード', 'PayPayカード', '三井住友カード'], ['ローソン', 'コンビニ', 'Amazon']),
+    ]
+    for profile in profiles:
+        expected = _rank_reference(campaigns, profile)
+        actual = rank_campaigns_for_user(campaigns, profile)
+        assert [c['campaign_id'] for c in actual] == [c['campaign_id'] for c in expected]
+        assert actual == expected
+    print(f"✅ {len(campaigns)}件 × {len(profiles)}人 一致")
+    print()
+
+
+def test_matrix_reused_for_snapshot():
+    """スナップショット（タプル）は列データを再利用し、値のない項目はデフォルトで計算すること"""
+    snapshot = freeze_campaigns(make_campaigns(10))
+    assert get_campaign_matrix(snapshot) is get_campaign_matrix(snapshot)
+    assert get_campaign_matrix(list(snapshot)) is not get_campaign_matrix(list(snapshot))
+
+    # 期限切れを除いたスナップショットも作り直さない（全件の列データの先頭を除くだけ）
+    now = datetime.now()
+    campaigns = [dict(c, end_date=now + timedelta(days=i - 2)) for i, c in enumerate(make_campaigns(10))]
+    snapshot = freeze_campaigns(campaigns)
+    full = get_campaign_matrix(snapshot)
+    trimmed = drop_expired(snapshot, now=now)
+    matrix = get_campaign_matrix(trimmed)
+    assert len(matrix) == 8 and matrix.campaigns is trimmed
+    assert get_campaign_matrix(trimmed) is matrix
+    assert get_campaign_matrix(SnapshotSlice(snapshot, 2)) is matrix  # 同じ開始位置なら別オブジェクトでも
+    assert np.shares_memory(matrix.base_return, full.base_return)
+    profile = _Profile(['楽天カード'], ['楽天市場'])
+    assert score_campaigns(matrix, profile, now).score.tolist() == \
+        score_campaigns(CampaignMatrix(list(trimmed)), profile, now).score.tolist()
+    assert get_campaign_matrix(snapshot) is full
+
+    # DBのキャンペーンは値がなくてもキーがある（None）
+    matrix = get_campaign_matrix([{'base_amount': None, 'return_rate': None, 'required_cards': None, 'end_date': None}])
+    scores = score_campaigns(matrix, _Profile([], []))
+    assert scores.expected_return.tolist() == [500]
+    assert scores.days_remaining.tolist() == [999]
+    assert scores.has_required_card.tolist() == [True]
+
+
+def test_top_k_matches_full_ranking():
+    """上位 k 件が全件ランキングの先頭 k 件と一致すること（同点・境界を含む）"""
+    print("=" * 60)
+    print("上位 k 件テスト")
+    print("=" * 60)
+
+    campaigns = make_campaigns(500, seed=1)
+    profile = _Profile(['楽天カード'], ['楽天市場', 'コンビニ'])
+    full = rank_campaigns_for_user(campaigns, profile)
+    for k in (0, 1, 3, 10, 499, 500, 600):
+        assert rank_top_k(campaigns, profile, k) == full[:k]
+
+    # 同点だらけでも元の順が保たれる
+    scores = score_campaigns(get_campaign_matrix([{}] * 5 + [{'return_rate': 50}]), _Profile([], []))
+    assert top_k_order(scores, 3).tolist() == [5, 0, 1]
+    print("✅ k = 0 / 1 / 3 / 10 / 499 / 500 / 600 一致")
+    print()
+
+
+if __name__ == "__main__":
+    test_matches_reference()
+    test_matrix_reused_for_snapshot()
+    test_top_k_matches_full_ranking()
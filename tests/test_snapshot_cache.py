@@ -0,0 +1,141 @@
+"""
+プロセス内スナップショットキャッシュテスト
+"""
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.collectors.snapshot_cache import SnapshotCache, freeze_campaigns, get_snapshot_cache, snapshot_origin
+from app.collectors.campaign_collector import CampaignCollector, drop_expired
+from app.utils.database import Base
+from app.utils.campaign_store import CampaignStore
+
+
+def test_freeze():
+    """共有するキャンペーンは変更できないこと"""
+    frozen = freeze_campaigns([{'title': 'A', 'required_cards': ['楽天カード'], 'conditions': {'entry_required': True}}])
+    camp = frozen[0]
+    assert camp['required_cards'] == ('楽天カード',)
+    assert {**camp, 'score': 1}['title'] == 'A'  # ランキングでのコピーは可能
+
+    for mutate in (
+        lambda: camp.__setitem__('title', 'B'),
+        lambda: camp['conditions'].__setitem__('entry_required', False),
+        lambda: camp['required_cards'].append('dカード'),
+    ):
+        try:
+            mutate()
+            assert False, "変更できてしまう"
+        except (TypeError, AttributeError):
+            pass
+
+
+def test_cache_hit_miss():
+    """キーが同じならヒット、変わったら読み直すこと"""
+    cache = SnapshotCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return ('value', len(loads))
+
+    assert cache.get('slot', 1, loader) == ('value', 1)
+    assert cache.get('slot', 1, loader) == ('value', 1)
+    assert cache.get('slot', 2, loader) == ('value', 2)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['entries'] == 1
+
+
+def test_drop_expired():
+    now = datetime.now()
+    campaigns = (
+        {'end_date': now - timedelta(hours=1)},
+        {'end_date': now + timedelta(hours=1)},
+        {'end_date': None},
+    )
+    assert drop_expired(campaigns, now=now) == campaigns[1:]
+    active = campaigns[1:]
+    assert drop_expired(active, now=now) is active  # 期限切れがなければコピーしない
+
+    # 期限切れの件数が変わるまで同じオブジェクト（元のスナップショットと開始位置を持つ）
+    trimmed = drop_expired(campaigns, now=now)
+    assert drop_expired(campaigns, now=now + timedelta(minutes=1)) is trimmed
+    assert snapshot_origin(trimmed) == (campaigns, 1)
+    later = drop_expired(campaigns, now=now + timedelta(hours=2))
+    assert later is not trimmed and later == campaigns[2:]
+    assert snapshot_origin(later) == (campaigns, 2)
+    assert snapshot_origin(drop_expired(trimmed, now=now + timedelta(hours=2))) == (campaigns, 2)
+
+
+def test_file_snapshot_cached_until_modified():
+    """JSONはmtime・サイズが変わるまで読み直さないこと"""
+    print("=" * 60)
+    print("スナップショットキャッシュテスト（ファイル）")
+    print("=" * 60)
+
+    now = datetime.now()
+    cache = get_snapshot_cache()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, 'campaigns_cache.json')
+        collector = CampaignCollector(cache_file=cache_file, store='file')
+        refreshed_at = {key: now for key in collector.collectors}
+        collector._write_cache_file([
+            {'title': 'A', 'source': '楽天市場', 'end_date': now + timedelta(days=1)},
+            {'title': '地雷', 'source': '楽天市場', 'end_date': now + timedelta(days=1), 'is_dangerous': True},
+        ], refreshed_at)
+
+        before = cache.stats()
+        first = CampaignCollector(cache_file=cache_file, store='file').get_cached_campaigns()
+        second = CampaignCollector(cache_file=cache_file, store='file').get_cached_campaigns()
+        after = cache.stats()
+        print(f"統計: {after}")
+
+        assert [c['title'] for c in first] == ['A']
+        assert second is first  # 同じパース結果を共有
+        assert after['misses'] - before['misses'] == 1
+        assert after['hits'] - before['hits'] == 1
+
+        time.sleep(0.01)
+        collector._write_cache_file([{'title': 'B', 'source': '楽天市場', 'end_date': now + timedelta(days=2)}], refreshed_at)
+        third = CampaignCollector(cache_file=cache_file, store='file').get_cached_campaigns()
+        assert [c['title'] for c in third] == ['B']
+    print("✅ 変更時のみ再読み込みOK")
+    print()
+
+
+def test_db_snapshot_cached_by_version():
+    """DBはスナップショットのバージョンが変わるまで読み直さないこと"""
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}")
+        Base.metadata.create_all(engine)
+        store = CampaignStore(session_factory=sessionmaker(bind=engine))
+
+        collector = CampaignCollector(cache_file=os.path.join(tmp, 'none.json'), store='db')
+        collector.store = store
+        refreshed_at = {key: now for key in collector.collectors}
+        store.save_snapshot([{'campaign_id': 'a', 'title': 'A', 'end_date': now + timedelta(days=1)}], refreshed_at)
+
+        first = collector.get_cached_campaigns()
+        assert collector.get_cached_campaigns() is first
+
+        store.save_snapshot([{'campaign_id': 'b', 'title': 'B', 'end_date': now + timedelta(days=1)}], refreshed_at)
+        assert [c['campaign_id'] for c in collector.get_cached_campaigns()] == ['b']
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    test_freeze()
+    test_cache_hit_miss()
+    test_drop_expired()
+    test_file_snapshot_cached_until_modified()
+    test_db_snapshot_cached_by_version()
@@ -0,0 +1,107 @@
+"""
+バイナリスナップショット形式テスト
+"""
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.collectors.snapshot_format import write_binary_snapshot, read_binary_snapshot, is_binary_snapshot
+from app.collectors.campaign_collector import CampaignCollector
+
+
+NOW = datetime(2026, 3, 1, 12, 30, 15, 123456)
+
+CAMPAIGNS = [
+    {
+        'campaign_id': 'rakuten_0123456789abcdef',
+        'title': '楽天スーパーSALE ポイント10倍',
+        'description': '期間中エントリーで',
+        'url': 'https://event.rakuten.co.jp/supersale/',
+        'source': '楽天市場',
+        'start_date': NOW,
+        'end_date': NOW + timedelta(days=7),
+        'base_amount': 10000,
+        'return_rate': 10,
+        'conditions': {'entry_required': True},
+        'required_cards': ['楽天カード'],
+        'target_stores': ['楽天市場'],
+        'is_dangerous': False,
+        'action_steps': ['1. エントリーページでエントリー', '2. 期間中に楽天市場で買い物'],
+    },
+    {
+        'campaign_id': 'dpoint_fedcba9876543210',
+        'title': 'dカード GOLD 0.5%上乗せ',
+        'source': 'dポイント',
+        'start_date': NOW,
+        'end_date': datetime(2026, 4, 1, tzinfo=timezone.utc),  # タイムゾーン付きは extras
+        'return_rate': 0.5,
+        'conditions': {'entry_required': True},
+        'required_cards': ['dカード GOLD'],
+        'target_stores': [],
+        'is_dangerous': True,
+        'danger_reason': 'ドコモユーザー限定の可能性あり',
+    },
+    {'title': 'タイトルのみ'},
+]
+
+
+def _same(expected, actual):
+    """値がない項目と None は同じとみなして比較"""
+    return all(expected.get(key) == actual.get(key) for key in set(expected) | set(actual))
+
+
+def test_round_trip():
+    """保存した内容をそのまま復元できること"""
+    print("=" * 60)
+    print("バイナリスナップショットテスト")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'campaigns_cache.bin')
+        size = write_binary_snapshot(path, CAMPAIGNS, {'rakuten': NOW}, cached_at=NOW)
+        print(f"サイズ: {size}バイト")
+
+        assert is_binary_snapshot(path)
+        snapshot = read_binary_snapshot(path)
+
+    assert snapshot['cached_at'] == NOW
+    assert snapshot['refreshed_at'] == {'rakuten': NOW}
+    assert len(snapshot['campaigns']) == len(CAMPAIGNS)
+    for expected, actual in zip(CAMPAIGNS, snapshot['campaigns']):
+        assert _same(expected, actual), actual
+    assert isinstance(snapshot['campaigns'][0]['return_rate'], int)
+
+    # 共有している文字列表・extras から復元したリスト・辞書は独立していること
+    first, second = snapshot['campaigns'][:2]
+    first['conditions']['entry_required'] = False
+    first['required_cards'].append('dカード')
+    assert second['conditions'] == {'entry_required': True}
+    assert snapshot['campaigns'][0]['required_cards'] == ['楽天カード', 'dカード']
+    print("✅ 往復変換OK")
+    print()
+
+
+def test_collector_binary_format():
+    """SNAPSHOT_FORMAT=binary で保存し、形式を自動判定して読めること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        binary = CampaignCollector(cache_file=os.path.join(tmp, 'cache.bin'), store='file', snapshot_format='binary')
+        binary._write_cache_file(CAMPAIGNS, {'rakuten': NOW})
+        assert is_binary_snapshot(binary.cache_file)
+
+        # 読み込み側の形式指定に関係なくファイル先頭で判定
+        reader = CampaignCollector(cache_file=binary.cache_file, store='file', snapshot_format='json')
+        snapshot = reader._load_file_snapshot()
+        assert [c['title'] for c in snapshot['campaigns']] == [c['title'] for c in CAMPAIGNS]
+
+        json_collector = CampaignCollector(cache_file=os.path.join(tmp, 'cache.json'), store='file')
+        json_collector._write_cache_file(CAMPAIGNS, {'rakuten': NOW})
+        assert not is_binary_snapshot(json_collector.cache_file)
+        assert len(json_collector._load_file_snapshot()['campaigns']) == len(CAMPAIGNS)
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_collector_binary_format()
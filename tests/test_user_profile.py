@@ -0,0 +1,157 @@
+"""
+ユーザープロフィールキャッシュのテスト
+"""
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app.profiles.profile_cache import ProfileCache, get_profile_cache
+from app.profiles.user_profile import UserProfile
+from app.utils.database import dispose_engines, get_engine
+
+
+def test_profile_cache_lru_and_ttl():
+    """件数上限で古いものから削除され、期限切れは読み直しになること"""
+    cache = ProfileCache(max_size=2, ttl=0.2)
+    cache.put('a', {'plan': 'free'})
+    cache.put('b', {'plan': 'free'})
+    assert cache.get('a') is not None  # a を最近使用に
+    cache.put('c', {'plan': 'paid'})  # b が追い出される
+
+    assert cache.get('b') is None
+    assert cache.get('c') == {'plan': 'paid'}
+    time.sleep(0.25)
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    print(f"統計: {stats}")
+    assert stats['hits'] == 2 and stats['misses'] == 2 and stats['evictions'] == 1
+
+
+def test_put_skips_after_invalidate():
+    """読み込み中に破棄されたユーザーの内容は保存しないこと（古いものの記録が溢れても）"""
+    cache = ProfileCache(max_size=2)
+    generation = cache.generation()
+    cache.invalidate('a')
+    cache.put('a', {'plan': 'free'}, generation)
+    assert cache.get('a') is None
+
+    cache.put('a', {'plan': 'paid'}, cache.generation())
+    assert cache.get('a') == {'plan': 'paid'}
+
+    # 破棄の記録が件数上限で消えても、それより前に読み始めたものは保存しない
+    generation = cache.generation()
+    for user in ('b', 'c', 'd'):
+        cache.invalidate(user)
+    cache.put('b', {'plan': 'free'}, generation)
+    assert cache.get('b') is None
+    cache.put('e', {'plan': 'free'})  # generation なしは従来どおり保存
+    assert cache.get('e') is not None
+
+
+def test_get_user_cached_and_invalidated():
+    """2回目以降はキャッシュから返し、プラン変更で破棄されること"""
+    print("=" * 60)
+    print("プロフィールキャッシュテスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    cache = get_profile_cache()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        cache.clear()
+        try:
+            before = cache.stats()
+            first = UserProfile.get_user('cache_user')
+            second = UserProfile.get_user('cache_user')
+            stats = cache.stats()
+            assert stats['misses'] - before['misses'] == 1
+            assert stats['hits'] - before['hits'] == 1
+
+            # 戻り値は別オブジェクト（変更がキャッシュに漏れない）
+            assert first is not second
+            second.cards.append({'name': '未保存のカード'})
+            assert UserProfile.get_user('cache_user').cards == []
+
+            first.upgrade_to_paid()
+            assert UserProfile.get_user('cache_user').plan == 'paid'
+
+            # 読み込み中に別のリクエストが保存しても、読み込んだ古い内容をキャッシュしない
+            cache.invalidate('cache_user')
+            load = UserProfile._load_from_db
+
+            def load_then_downgrade(profile):
+                load(profile)
+                other = UserProfile.from_record('cache_user', profile.to_record())
+                other.downgrade_to_free()
+
+            UserProfile._load_from_db = load_then_downgrade
+            try:
+                assert UserProfile.get_user('cache_user').plan == 'paid'
+            finally:
+                UserProfile._load_from_db = load
+            assert UserProfile.get_user('cache_user').plan == 'free'
+            print(f"統計: {cache.stats()}")
+        finally:
+            cache.clear()
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ キャッシュ・破棄OK")
+    print()
+
+
+def test_bulk_loading():
+    """get_many・iter_users がチャンクごとに1クエリで読み込むこと"""
+    print("=" * 60)
+    print("一括読み込みテスト")
+    print("=" * 60)
+
+    original_url = os.environ.get('DATABASE_URL')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'test.sqlite3')}"
+        try:
+            for i in range(5):
+                profile = UserProfile(f"bulk_user_{i}")
+                if i % 2 == 0:
+                    profile.upgrade_to_paid()
+
+            statements = []
+            event.listen(get_engine(), 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+            profiles = UserProfile.get_many(['bulk_user_3', 'unknown', 'bulk_user_0', 'bulk_user_1'], chunk_size=2)
+            print(f"get_many: {list(profiles)}（{len(statements)}クエリ）")
+            assert list(profiles) == ['bulk_user_3', 'bulk_user_0', 'bulk_user_1']
+            assert profiles['bulk_user_0'].plan == 'paid'
+            assert len(statements) == 2
+
+            statements.clear()
+            chunks = list(UserProfile.iter_users(plan='paid', chunk_size=2))
+            print(f"iter_users: {[[p.line_user_id for p in chunk] for chunk in chunks]}（{len(statements)}クエリ）")
+            assert [[p.line_user_id for p in chunk] for chunk in chunks] == [
+                ['bulk_user_0', 'bulk_user_2'], ['bulk_user_4']
+            ]
+            assert len(statements) == 2
+            assert sum(len(chunk) for chunk in UserProfile.iter_users(chunk_size=2)) == 5
+        finally:
+            dispose_engines()
+            if original_url is None:
+                os.environ.pop('DATABASE_URL', None)
+            else:
+                os.environ['DATABASE_URL'] = original_url
+    print("✅ 一括読み込みOK")
+    print()
+
+
+if __name__ == "__main__":
+    test_profile_cache_lru_and_ttl()
+    test_put_skips_after_invalidate()
+    test_get_user_cached_and_invalidated()
+    test_bulk_loading()